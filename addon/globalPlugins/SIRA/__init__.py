@@ -17,24 +17,28 @@ All AI-generated code was manually reviewed and tested by the author.
 Created on: 25/02/2025
 """
 
+import importlib
 import os
+import sys
+import threading
+import time
 from functools import partial
 
 import addonHandler
+import config
 import globalPluginHandler
 import globalVars
 import gui
+import ui
 import wx
 from logHandler import log
 from scriptHandler import script
 
+# Imported first: when enabled, it times the imports of the modules below (see profiler.py)
+from .profiler import profilePhase, stopProfiling, writeProfile
 from .configPanel import SIRASystemSettingsPanel
-from .generalMessage import GeneralMessage
-from .main import SIRA
-from .medicalDischarge import MedicalDischarge
-from .messageForTransport import MessageForTransport
-from .model import Section
-from .updateManager import UpdateManager
+from .dialogLifecycle import dialogManager
+from .libLoader import removeVendoredFinder
 from .varsConfig import ADDON_NAME, ADDON_SUMMARY, ADDON_VERSION, initConfiguration
 
 # Initialize translation support
@@ -42,6 +46,42 @@ addonHandler.initTranslation()
 
 GITHUB_REPO = f"EdilbertoFonseca/{ADDON_NAME}"
 
+# Seconds a dialog opened during startup waits for the database to be opened
+INIT_TIMEOUT = 10
+
+# The dialogs are given to displayDialog as "module.Class" and imported when first opened,
+# so their modules, the masked controls and the csv module are not loaded with NVDA.
+DIALOG_LIST = "main.SIRA"
+DIALOG_TRANSPORT = "messageForTransport.MessageForTransport"
+DIALOG_MEDICAL = "medicalDischarge.MedicalDischarge"
+DIALOG_GENERAL = "generalMessage.GeneralMessage"
+
+# (module, object) of the background services, stopped in this order when NVDA exits
+BACKGROUND_SERVICES = (
+	("replica", "replicaSync"),
+	("backup", "snapshotScheduler"),
+	("maintenance", "maintenanceScheduler"),
+	("prewarm", "prewarmer"),
+	("searchIndex", "searchIndexer"),
+)
+
+
+def loadDialogClass(name):
+	"""
+	Imports the module of a dialog and returns its class.
+
+	Args:
+		name (str): "module.Class", the module being relative to this package.
+	"""
+	moduleName, className = name.rsplit(".", 1)
+	start = time.perf_counter()
+	module = importlib.import_module(f".{moduleName}", __name__)
+	elapsed = time.perf_counter() - start
+	# Only the first import takes time; later ones come from sys.modules
+	if elapsed > 0.001:
+		log.debug(f"{ADDON_NAME}: {moduleName} imported in {elapsed * 1000:.0f} ms")
+	return getattr(module, className)
+
 
 # Secure mode decorator
 def disableInSecureMode(decoratedCls):
@@ -57,22 +97,222 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		log.info(f"{ADDON_NAME} {ADDON_VERSION} initializing")
 
 		# Ensure configuration is initialized
-		initConfiguration()
+		with profilePhase("initConfiguration"):
+			initConfiguration()
+
+		self.updateManager = None
+		self._initDone = threading.Event()
+		self._terminated = False
+		# Callbacks waiting for the initialization, and the timer that gives up on them
+		self._waiting = []
+		self._waitTimer = None
+
+		with profilePhase("settings panel registration"):
+			self._registerSettingsPanel()
+		with profilePhase("menu creation"):
+			self._createMenu()
+
+		# The database may be on a slow or unreachable network share, so it is opened
+		# outside NVDA's startup: wx runs this once NVDA is up and in its main loop.
+		wx.CallAfter(self._startDeferredInit)
+
+	# =========================
+	# Deferred initialization
+	# =========================
 
-		# Inicialização tardia (evita efeitos colaterais no import)
+	def _startDeferredInit(self):
+		if not self._terminated:
+			threading.Thread(target=self._deferredInit, name=f"{ADDON_NAME}Init", daemon=True).start()
+
+	def _deferredInit(self):
+		"""
+		Opens the database and starts the background services.
+
+		Their modules are imported here and by the menu items using them, so none is loaded while NVDA starts.
+		"""
+		start = time.perf_counter()
 		try:
-			Section.initDB()
+			with profilePhase("initDB"):
+				from .model import Section
+
+				Section.initDB()
 		except Exception as e:
 			log.error(f"Database initialization failed: {e}")
+		databaseTime = time.perf_counter() - start
+
+		# The dialogs wait for _initDone: it is set even when a service failed to start
+		try:
+			if not self._terminated:
+				with profilePhase("background services"):
+					from .backup import snapshotScheduler
+					from .maintenance import maintenanceScheduler
+					from .prewarm import prewarmer
+
+					self._startReplicaSync()
+					snapshotScheduler.start()
+					maintenanceScheduler.start()
+					prewarmer.start(onFinished=lambda: wx.CallAfter(self._prewarmDialogs))
+
+			with profilePhase("UpdateManager"):
+				# Imported here: urllib is only needed when checking for updates
+				from .updateManager import UpdateManager
+
+				self.updateManager = UpdateManager(
+					repoName=GITHUB_REPO,
+					currentVersion=ADDON_VERSION,
+					addonNameForFile=ADDON_NAME,
+				)
+		except Exception as e:
+			log.error(f"{ADDON_NAME}: starting the background services failed: {e}", exc_info=True)
+		finally:
+			elapsed = time.perf_counter() - start
+			log.info(f"{ADDON_NAME} initialized in {elapsed:.3f} s (database {databaseTime:.3f} s)")
+			if elapsed > INIT_TIMEOUT:
+				log.warning(f"{ADDON_NAME} initialization took longer than {INIT_TIMEOUT} s")
+			writeProfile()
+			self._initDone.set()
+			wx.CallAfter(self._onInitDone)
+
+	def _prewarmDialogs(self):
+		"""Imports the contact list dialog, once the prewarm prepared its contacts (see prewarm.py)."""
+		if self._terminated:
+			return
+		try:
+			loadDialogClass(DIALOG_LIST)
+		except ImportError as e:
+			log.warning(f"{ADDON_NAME}: the contact list was not imported ahead: {e}")
+
+	def _whenInitialized(self, callback):
+		"""
+		Runs a callback once the deferred initialization has ended.
+
+		Until then the callback waits, up to INIT_TIMEOUT seconds, without blocking NVDA.
+		"""
+		if self._initDone.is_set():
+			callback()
+			return
+		if not self._waiting:
+			ui.message(_("Opening the database, please wait..."))
+			self._waitStart = time.perf_counter()
+			self._waitTimer = wx.CallLater(INIT_TIMEOUT * 1000, self._onInitTimeout)
+		self._waiting.append(callback)
+
+	def _onInitDone(self):
+		if self._waitTimer is not None:
+			self._waitTimer.Stop()
+			self._waitTimer = None
+		waiting, self._waiting = self._waiting, []
+		if waiting:
+			log.info(
+				f"{ADDON_NAME}: waited {time.perf_counter() - self._waitStart:.3f} s for the initialization",
+			)
+		for callback in waiting:
+			callback()
+
+	def _onInitTimeout(self):
+		self._waitTimer = None
+		if self._initDone.is_set() or not self._waiting:
+			return
+		self._waiting = []
+		log.warning(f"{ADDON_NAME}: the database is still being opened after {INIT_TIMEOUT} s")
+		ui.message(_("The database is not responding yet. Please try again in a moment."))
+
+	# =========================
+	# Offline replica
+	# =========================
+
+	def _startReplicaSync(self):
+		"""Starts the background replica sync when the offline replica is enabled."""
+		from .model import isReplicaEnabled
+		from .replica import replicaSync
+
+		if not isReplicaEnabled():
+			return
+		conf = config.conf.get(ADDON_NAME, {})
+		replicaSync.start(interval=int(conf.get("replicaSyncInterval", 5)) * 60)
+
+	def _onSyncReplica(self, event):
+		from .model import isReplicaEnabled
+		from .replica import replicaSync
+
+		if not isReplicaEnabled():
+			ui.message(_("The offline replica is disabled in the settings."))
+			return
+		# The scheduler thread performs the sync; the result is reported in the log.
+		self._startReplicaSync()
+		replicaSync.requestSync()
+		ui.message(_("Synchronizing the local replica..."))
+
+	# =========================
+	# Snapshots
+	# =========================
 
-		self.updateManager = UpdateManager(
-			repoName=GITHUB_REPO,
-			currentVersion=ADDON_VERSION,
-			addonNameForFile=ADDON_NAME,
+	def _runInBackground(self, target, successMessage, errorMessage):
+		"""Runs a blocking database task in a thread and announces the outcome."""
+
+		def run():
+			try:
+				target()
+				wx.CallAfter(ui.message, successMessage)
+			except Exception as e:
+				log.error(f"{errorMessage}: {e}", exc_info=True)
+				wx.CallAfter(ui.message, errorMessage)
+
+		threading.Thread(target=run, daemon=True).start()
+
+	def _onCreateSnapshot(self, event):
+		from .backup import createSnapshot
+
+		ui.message(_("Creating snapshot..."))
+		self._runInBackground(
+			lambda: createSnapshot(reason="manual"),
+			_("Snapshot created."),
+			_("It was not possible to create the snapshot."),
 		)
 
-		self._registerSettingsPanel()
-		self._createMenu()
+	def _onRestoreSnapshot(self, event):
+		from .backup import restorableSnapshots, restoreSnapshot
+
+		snapshots = restorableSnapshots()
+		if not snapshots:
+			gui.messageBox(
+				_("No snapshots are available."),
+				_("Restore snapshot"),
+				wx.OK | wx.ICON_INFORMATION,
+			)
+			return
+
+		choices = [
+			(_("{date} ({size} KB, local replica)") if replica else _("{date} ({size} KB)")).format(
+				date=stamp.strftime("%d/%m/%Y %H:%M:%S"),
+				size=size // 1024,
+			)
+			for _path, stamp, size, replica in snapshots
+		]
+		gui.mainFrame.prePopup()
+		dlg = wx.SingleChoiceDialog(
+			gui.mainFrame,
+			_("Choose the snapshot to restore:"),
+			_("Restore snapshot"),
+			choices,
+		)
+		selection = dlg.GetSelection() if dlg.ShowModal() == wx.ID_OK else -1
+		dlg.Destroy()
+		gui.mainFrame.postPopup()
+		if selection == -1:
+			return
+
+		message = _(
+			"The current contacts will be replaced by the snapshot of {date}. Do you wish to continue?",
+		).format(date=choices[selection])
+		if gui.messageBox(message, _("Attention"), wx.YES_NO | wx.ICON_QUESTION) != wx.YES:
+			return
+
+		self._runInBackground(
+			lambda: restoreSnapshot(snapshots[selection][0]),
+			_("Snapshot restored."),
+			_("It was not possible to restore the snapshot."),
+		)
 
 	# =========================
 	# Settings panel
@@ -108,6 +348,18 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
 		self.mainMenu.AppendSeparator()
 
+		self.menuSync = self.mainMenu.Append(
+			wx.ID_ANY,
+			_("S&ynchronize local replica"),
+		)
+		self.menuSnapshot = self.mainMenu.Append(
+			wx.ID_ANY,
+			_("Create a database s&napshot"),
+		)
+		self.menuRestore = self.mainMenu.Append(
+			wx.ID_ANY,
+			_("&Restore a database snapshot..."),
+		)
 		self.menuUpdate = self.mainMenu.Append(
 			wx.ID_ANY,
 			_("Check for &updates..."),
@@ -127,6 +379,9 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		icon.Bind(wx.EVT_MENU, self.script_openTransport, self.menuTransport)
 		icon.Bind(wx.EVT_MENU, self.script_openMedical, self.menuMedical)
 		icon.Bind(wx.EVT_MENU, self.script_openGeneral, self.menuGeneral)
+		icon.Bind(wx.EVT_MENU, self._onSyncReplica, self.menuSync)
+		icon.Bind(wx.EVT_MENU, self._onCreateSnapshot, self.menuSnapshot)
+		icon.Bind(wx.EVT_MENU, self._onRestoreSnapshot, self.menuRestore)
 		icon.Bind(wx.EVT_MENU, self._onCheckUpdates, self.menuUpdate)
 		icon.Bind(wx.EVT_MENU, self._onOpenSettings, self.menuSettings)
 		icon.Bind(wx.EVT_MENU, self._onHelp, self.menuHelp)
@@ -137,6 +392,13 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		)
 
 	def _onCheckUpdates(self, event):
+		self._whenInitialized(self._checkForUpdates)
+
+	def _checkForUpdates(self):
+		if self.updateManager is None:
+			# Its creation failed during the initialization (see the log)
+			ui.message(_("It was not possible to check for updates."))
+			return
 		self.updateManager.checkForUpdates(silent=False)
 
 	def _onOpenSettings(self, event):
@@ -166,7 +428,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		category=ADDON_SUMMARY,
 	)
 	def script_openList(self, gesture):
-		wx.CallAfter(self.displayDialog, SIRA, "dlgSIRA", _("Lists of registered extensions"))
+		wx.CallAfter(self.displayDialog, DIALOG_LIST, "dlgSIRA", _("Lists of registered extensions"))
 
 	@script(
 		gesture="kb:Alt+numpad2",
@@ -176,7 +438,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		category=ADDON_SUMMARY,
 	)
 	def script_openTransport(self, gesture):
-		wx.CallAfter(self.displayDialog, MessageForTransport, "dlgTransport", _("Message for transport"))
+		wx.CallAfter(self.displayDialog, DIALOG_TRANSPORT, "dlgTransport", _("Message for transport"))
 
 	@script(
 		gesture="kb:Alt+numpad3",
@@ -186,7 +448,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		category=ADDON_SUMMARY,
 	)
 	def script_openMedical(self, gesture):
-		wx.CallAfter(self.displayDialog, MedicalDischarge, "dlgMedical", _("Medical discharge register"))
+		wx.CallAfter(self.displayDialog, DIALOG_MEDICAL, "dlgMedical", _("Medical discharge register"))
 
 	@script(
 		gesture="kb:Alt+numpad4",
@@ -196,7 +458,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		category=ADDON_SUMMARY,
 	)
 	def script_openGeneral(self, gesture):
-		wx.CallAfter(self.displayDialog, GeneralMessage, "dlgGeneral", _("General message"))
+		wx.CallAfter(self.displayDialog, DIALOG_GENERAL, "dlgGeneral", _("General message"))
 
 	@script(
 		gesture="kb:Alt+numpad5",
@@ -208,22 +470,40 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 	def script_update(self, gesture):
 		self._onCheckUpdates(None)
 
-	def _onDestroy(self, e: wx.Event, attrName: str) -> None:
-		self.onGenericClosed(e, attrName)
+	@script(
+		description=_(
+			"{addon} - Synchronizes the local replica with the shared database.",
+		).format(addon=ADDON_NAME),
+		category=ADDON_SUMMARY,
+	)
+	def script_syncReplica(self, gesture):
+		self._onSyncReplica(None)
 
 	def displayDialog(self, dialogClass, attrName, *args, **kwargs):
-		# 1. Retrieves what is stored in the attribute
-		dlg = getattr(self, attrName, None)
-
-		# 2. "Life" check:
-		# If None OR if the wx object is no longer valid (window closed)
-		if dlg is None or not dlg:
-			# We create a new instance
-			dlg = dialogClass(gui.mainFrame, *args, **kwargs)
-			setattr(self, attrName, dlg)
-
-			# We bind the attribute cleanup when the window is destroyed
-			dlg.Bind(wx.EVT_WINDOW_DESTROY, partial(self._onDestroy, attrName=attrName))
+		# 0. The dialogs read the database: the first one waits until it is open
+		if not self._initDone.is_set():
+			self._whenInitialized(partial(self.displayDialog, dialogClass, attrName, *args, **kwargs))
+			return
+
+		# 1. The dialog already built, shown or hidden when it was closed (see dialogLifecycle.py)
+		dlg = dialogManager.reuse(attrName)
+
+		# 2. None the first time, after the dialog was destroyed or when it cannot be reused
+		if dlg is None:
+			# The class may be given as "module.Class" (see loadDialogClass)
+			if isinstance(dialogClass, str):
+				try:
+					dialogClass = loadDialogClass(dialogClass)
+				except ImportError as e:
+					log.error(f"Error loading the dialog {dialogClass}: {e}", exc_info=True)
+					ui.message(_("It was not possible to open the dialog."))
+					return
+
+			# We create a new instance, kept by the manager until it is destroyed
+			with profilePhase(f"{dialogClass.__name__} dialog"):
+				dlg = dialogClass(gui.mainFrame, *args, **kwargs)
+			dialogManager.add(attrName, dlg)
+			writeProfile()
 
 		# 3. Display and Focus
 		try:
@@ -240,17 +520,33 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			gui.mainFrame.postPopup()
 		except Exception as e:
 			log.error(f"Error when manipulating window {attrName}: {e}")
-			setattr(self, attrName, None)
+			dialogManager.forget(attrName)
 
-	def onGenericClosed(self, evt: wx.Event, attrName: str) -> None:
-		"""Handles the closure of generic dialogs."""
-		setattr(self, attrName, None)
-		evt.Skip()
+	def _stopServices(self):
+		"""Stops the background services that were started."""
+		for moduleName, serviceName in BACKGROUND_SERVICES:
+			# A module never imported has nothing running, and is not imported just to be stopped
+			module = sys.modules.get(f"{__name__}.{moduleName}")
+			if module is not None:
+				getattr(module, serviceName).stop()
 
 	def terminate(self):
 		"""Terminates the SIRA addon."""
 		super().terminate()
 
+		self._terminated = True
+		if self._waitTimer is not None:
+			self._waitTimer.Stop()
+			self._waitTimer = None
+		self._stopServices()
+		dialogManager.destroyHidden()
+		# Lookups counted in the last few seconds
+		usage = sys.modules.get(f"{__name__}.usage")
+		if usage is not None:
+			usage.flush()
+		removeVendoredFinder()
+		stopProfiling()
+
 		try:
 			gui.settingsDialogs.NVDASettingsDialog.categoryClasses.remove(
 				SIRASystemSettingsPanel,
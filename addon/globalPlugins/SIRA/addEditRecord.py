@@ -17,9 +17,7 @@ All AI-generated code was manually reviewed and tested by the author.
 Created on: 08/01/2025.
 """
 
-import os
 import re
-import sys
 
 import addonHandler
 import config
@@ -28,16 +26,14 @@ import wx
 from logHandler import log
 
 from . import controller as core
-from .varsConfig import ADDON_NAME, ADDON_PATH, EMAIL_REGEX, IS64
+from .libLoader import installVendoredFinder
+from .varsConfig import ADDON_NAME, EMAIL_REGEX
 
-# Add the lib/ folder to sys.path (only once)
-libFolder = "lib64" if IS64 else "lib"
-libPath = os.path.join(ADDON_PATH, libFolder)
-
-if os.path.isdir(libPath) and libPath not in sys.path:
-	sys.path.insert(0, libPath)
+# The libraries of lib/ are imported through a finder (see libLoader.py)
+installVendoredFinder()
 
 try:
+	from masked.combobox import ComboBox
 	from masked.textctrl import TextCtrl
 except ImportError as e:
 	log.error(f"[{ADDON_NAME}] Error when importing internal library 'masked': {e}")
@@ -74,9 +70,12 @@ def validateFields(data):
 # Initialize translation support
 addonHandler.initTranslation()
 
+# Characters of the secretary office and sector fields; longer stored values widen them
+CHOICE_LENGTH = 100
+
 
 class AddEditRecDialog(wx.Dialog):
-	def __init__(self, parent, row=None, title=None, addRecord=True):
+	def __init__(self, parent, row=None, title=None, addRecord=True, onSaved=None):
 		if title is None:
 			title = _("Add")
 
@@ -96,6 +95,8 @@ class AddEditRecDialog(wx.Dialog):
 		self.formatCellPhone = conf.get("formatCellPhone") or "(##) #####-####"
 		self.addRecord = addRecord
 		self.selectedRow = row
+		# Called with the stored record after each add or edit
+		self.onSaved = onSaved
 
 		# Simplification of startup of variables using a conditional expression
 		secretaryOffice = row.secretaryOffice if row else ""
@@ -108,9 +109,11 @@ class AddEditRecDialog(wx.Dialog):
 
 		# Widget Creation
 		self.panel = wx.Panel(self)
+		# {column: (folded values offered, length of the field)} of the fields with choices
+		self.choiceFields = {}
 
 		labelSecretary = wx.StaticText(self.panel, label=_("Secretary: "))
-		self.textSecretaryOffice = wx.TextCtrl(self.panel, value=secretaryOffice, style=wx.TE_PROCESS_ENTER)
+		self.textSecretaryOffice = self.createChoiceBox(secretaryOffice, "secretaryOffice")
 
 		labelLandline = wx.StaticText(self.panel, label=_("Landline: "))
 		self.textLandline = TextCtrl(
@@ -122,7 +125,7 @@ class AddEditRecDialog(wx.Dialog):
 		)
 
 		labelSector = wx.StaticText(self.panel, label=_("Sector: "))
-		self.textSector = wx.TextCtrl(self.panel, value=sector, style=wx.TE_PROCESS_ENTER)
+		self.textSector = self.createChoiceBox(sector, "sector")
 
 		labelResponsible = wx.StaticText(self.panel, label=_("Responsible: "))
 		self.textResponsible = wx.TextCtrl(self.panel, value=responsible, style=wx.TE_PROCESS_ENTER)
@@ -185,6 +188,47 @@ class AddEditRecDialog(wx.Dialog):
 		self.textResponsible.Bind(wx.EVT_TEXT_ENTER, self.onFocusResponsible)
 		self.textEmail.Bind(wx.EVT_TEXT_ENTER, self.onFocusEmail)
 
+	def createChoiceBox(self, value, column):
+		"""
+		Creates a field completed from the values already stored in a column.
+
+		Typing the first letters of a stored value completes it, so the same secretary office
+		or sector is always written the same way; other values can still be typed.
+
+		Args:
+			value (str): Initial value of the field.
+			column (str): Column whose values are offered (see controller.CHOICE_COLUMNS).
+		"""
+		choices = core.getDistinctValues(column)
+		length = max([CHOICE_LENGTH, len(value)] + [len(choice) for choice in choices])
+		try:
+			field = ComboBox(
+				self.panel,
+				value=value,
+				choices=choices,
+				mask="*{%d}" % length,
+				autoSelect=True,
+				choiceRequired=False,
+				compareNoCase=True,
+				useFixedWidthFont=False,
+				style=wx.TE_PROCESS_ENTER,
+			)
+		except ValueError as e:
+			# A stored value the mask does not accept; the field is still usable without choices
+			log.warning(f"[{ADDON_NAME}] Choices of {column} not available: {e}")
+			return wx.TextCtrl(self.panel, value=value, style=wx.TE_PROCESS_ENTER)
+		self.choiceFields[column] = ({choice.lower() for choice in choices}, length)
+		return field
+
+	def addChoices(self, contactDict):
+		"""Offers the secretary office and sector of a saved contact in the next ones."""
+		fields = {"secretaryOffice": self.textSecretaryOffice, "sector": self.textSector}
+		for column, (known, length) in self.choiceFields.items():
+			value = contactDict[column]
+			if value and len(value) <= length and value.lower() not in known:
+				fields[column].Append(value)
+				known.add(value.lower())
+
 	def onFocusSecretary(self, event):
 		self.textLandline.SetFocus()
 
@@ -246,6 +290,7 @@ class AddEditRecDialog(wx.Dialog):
 		success, error = self.saveContactToDB(data)
 
 		if success:
+			self.addChoices(contactDict)
 			message = _("Contact added, want to add a new contact?")
 			caption = _("Success")
 			user_response = gui.messageBox(message, caption, style=wx.ICON_QUESTION | wx.YES_NO)
@@ -267,10 +312,12 @@ class AddEditRecDialog(wx.Dialog):
 			tuple: A boolean indicating success or failure, and an error message in case of failure.
 		"""
 		try:
-			core.addRecord(data)
-			return True, None
+			record = core.addRecord(data)
 		except Exception as e:
 			return False, str(e)
+		if self.onSaved is not None:
+			self.onSaved(record)
+		return True, None
 
 	def focusField(self, fieldName):
 		"""
@@ -300,11 +347,14 @@ class AddEditRecDialog(wx.Dialog):
 			return
 
 		try:
-			core.editRecord(self.selectedRow.id, contactDict)
-			self.showMessage(_("Contact edited!"), _("Success"), wx.ICON_INFORMATION)
-			self.Destroy()
+			record = core.editRecord(self.selectedRow.id, contactDict, source=self.selectedRow.source)
 		except Exception as e:
 			self.showMessage(_("Error editing contact: {}").format(str(e)), _("Error"), wx.ICON_ERROR)
+			return
+		if self.onSaved is not None:
+			self.onSaved(record)
+		self.showMessage(_("Contact edited!"), _("Success"), wx.ICON_INFORMATION)
+		self.Destroy()
 
 	def handleRecord(self, event):
 		"""
@@ -105,7 +105,52 @@ class SIRASystemSettingsPanel(SettingsPanel):
 		self.exportCSV = wx.CheckBox(optionsBox, label=_("Show export CSV button"))
 		self.exportCSV.SetValue(bool(conf.get("exportCSV", True)))
 
-		for cb in (self.removeConfigOnUninstall, self.resetRecords, self.importCSV, self.exportCSV):
+		self.autoSnapshot = wx.CheckBox(optionsBox, label=_("Take automatic database snapshots"))
+		self.autoSnapshot.SetValue(bool(conf.get("autoSnapshot", True)))
+
+		self.snapshotCompress = wx.CheckBox(optionsBox, label=_("Compress database snapshots"))
+		self.snapshotCompress.SetValue(bool(conf.get("snapshotCompress", False)))
+
+		self.idleMaintenance = wx.CheckBox(
+			optionsBox,
+			label=_("Optimize the database while the computer is idle"),
+		)
+		self.idleMaintenance.SetValue(bool(conf.get("idleMaintenance", True)))
+
+		self.liveSearch = wx.CheckBox(optionsBox, label=_("Search while typing in the search field"))
+		self.liveSearch.SetValue(bool(conf.get("liveSearch", True)))
+
+		self.usageBoost = wx.CheckBox(
+			optionsBox,
+			label=_('Rank the contacts used most first in "All fields" searches'),
+		)
+		self.usageBoost.SetValue(bool(conf.get("usageBoost", False)))
+
+		self.prewarm = wx.CheckBox(
+			optionsBox,
+			label=_("Prepare the contact list in the background after NVDA starts"),
+		)
+		self.prewarm.SetValue(bool(conf.get("prewarm", False)))
+
+		self.profiling = wx.CheckBox(
+			optionsBox,
+			label=_("Record the startup times of the add-on (after restarting NVDA)"),
+		)
+		self.profiling.SetValue(bool(conf.get("profiling", False)))
+
+		for cb in (
+			self.removeConfigOnUninstall,
+			self.resetRecords,
+			self.importCSV,
+			self.exportCSV,
+			self.autoSnapshot,
+			self.snapshotCompress,
+			self.idleMaintenance,
+			self.liveSearch,
+			self.usageBoost,
+			self.prewarm,
+			self.profiling,
+		):
 			optionsBoxSizer.Add(cb, 0, wx.ALL, 5)
 		settingsSizerHelper.addItem(optionsBoxSizer)
 
@@ -130,6 +175,20 @@ class SIRASystemSettingsPanel(SettingsPanel):
 		self.changePathBtn.Bind(wx.EVT_BUTTON, self.onSelectDirectory)
 		pathBoxSizer.Add(self.changePathBtn, 0, wx.ALL | wx.CENTER, 5)
 
+		self.offlineReplica = wx.CheckBox(
+			pathBoxSizer.GetStaticBox(),
+			label=_("&Work from a local replica and synchronize in the background"),
+		)
+		self.offlineReplica.SetValue(bool(conf.get("offlineReplica", False)))
+		pathBoxSizer.Add(self.offlineReplica, 0, wx.ALL, 5)
+
+		self.federatedSearch = wx.CheckBox(
+			pathBoxSizer.GetStaticBox(),
+			label=_("Search the primary and the alternate database &together"),
+		)
+		self.federatedSearch.SetValue(bool(conf.get("federatedSearch", False)))
+		pathBoxSizer.Add(self.federatedSearch, 0, wx.ALL, 5)
+
 		settingsSizerHelper.addItem(pathBoxSizer)
 
 	def onSelectDirectory(self, event):
@@ -192,10 +251,31 @@ class SIRASystemSettingsPanel(SettingsPanel):
 		conf["resetRecords"] = self.resetRecords.GetValue()
 		conf["importCSV"] = self.importCSV.GetValue()
 		conf["exportCSV"] = self.exportCSV.GetValue()
+		conf["autoSnapshot"] = self.autoSnapshot.GetValue()
+		conf["snapshotCompress"] = self.snapshotCompress.GetValue()
+		conf["idleMaintenance"] = self.idleMaintenance.GetValue()
+		conf["liveSearch"] = self.liveSearch.GetValue()
+		conf["usageBoost"] = self.usageBoost.GetValue()
+		conf["prewarm"] = self.prewarm.GetValue()
+		conf["profiling"] = self.profiling.GetValue()
+		conf["offlineReplica"] = self.offlineReplica.GetValue()
+		conf["federatedSearch"] = self.federatedSearch.GetValue()
 
 		# Update the selected index before saving
 		self.dbConfig.indexDB = self.pathNameCB.GetSelection()
 		self.dbConfig.saveConfig()
+		# Imported here: the panel is registered while NVDA starts, before the database is opened
+		from .model import db
+		from .replica import replicaSync
+
+		db.reload()
 
 		# Effectively saves to the nvda.ini file
 		config.conf.save()
+
+		# Start or stop the replica sync according to the new setting
+		if conf["offlineReplica"]:
+			replicaSync.start(interval=int(conf.get("replicaSyncInterval", 5)) * 60)
+			replicaSync.requestSync()
+		else:
+			replicaSync.stop()
@@ -0,0 +1,304 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Virtual contact list.
+
+The list control never holds the rows itself: it asks a row source for the text
+of each visible cell (OnGetItemText). A row source is a list already in memory,
+a paged window over the whole table or the keys of search results, so only the
+rows that are shown or read by the screen reader are materialized.
+"""
+
+import abc
+import bisect
+from collections import OrderedDict
+
+import wx
+
+# Rows fetched per query and number of pages kept in memory
+PAGE_SIZE = 100
+MAX_PAGES = 20
+
+
+def listKey(secretaryOffice, source, id):
+	"""Key of a row in the list order (secretary office, database, id), NULL offices first like SQLite."""
+	return (secretaryOffice is not None, secretaryOffice or "", source, id)
+
+
+def sortKey(record):
+	"""List key of a record."""
+	return listKey(record.secretaryOffice, record.source, record.id)
+
+
+class ListRowSource(object):
+	"""
+	Rows already in memory.
+
+	Args:
+		records (list): The records.
+		ordered (bool): The records are sorted by key. Otherwise (ranked results)
+			new records go to the end and edited ones stay where they are.
+		key (callable): Sort key of a record; the list order by default.
+		reverse (bool): The records are sorted by key in descending order.
+	"""
+
+	def __init__(self, records, ordered=True, key=sortKey, reverse=False):
+		super().__init__()
+		self.records = list(records)
+		self.ordered = ordered
+		self.key = key
+		self.reverse = reverse
+
+	def count(self):
+		return len(self.records)
+
+	def get(self, index):
+		if 0 <= index < len(self.records):
+			return self.records[index]
+		return None
+
+	def position(self, record, current=None):
+		"""Returns where a record goes; current is its position before an edit, if any."""
+		if not self.ordered:
+			return len(self.records) if current is None else min(current, len(self.records))
+		keys = [self.key(row) for row in self.records]
+		if self.reverse:
+			keys.reverse()
+			return len(keys) - bisect.bisect_right(keys, self.key(record))
+		return bisect.bisect_left(keys, self.key(record))
+
+	def insert(self, index, record):
+		self.records.insert(index, record)
+
+	def remove(self, index):
+		del self.records[index]
+
+	def allRecords(self):
+		return list(self.records)
+
+
+class _PagedSource(abc.ABC):
+	"""Base of the row sources that read their records one page at a time."""
+
+	def __init__(self, pageSize=PAGE_SIZE, maxPages=MAX_PAGES):
+		super().__init__()
+		self.pageSize = pageSize
+		self.maxPages = maxPages
+		self._pages = OrderedDict()
+
+	@abc.abstractmethod
+	def count(self):
+		"""Returns the number of rows."""
+
+	@abc.abstractmethod
+	def _readPage(self, pageNumber):
+		"""Returns the records of a page, read from the database."""
+
+	def get(self, index):
+		if not 0 <= index < self.count():
+			return None
+		pageNumber, offset = divmod(index, self.pageSize)
+		page = self._pages.get(pageNumber)
+		if page is None:
+			page = self._readPage(pageNumber)
+			self.setPage(pageNumber, page)
+		else:
+			self._pages.move_to_end(pageNumber)
+		return page[offset] if offset < len(page) else None
+
+	def setPage(self, pageNumber, records):
+		"""Stores a page read elsewhere (for instance by a background loader)."""
+		self._pages[pageNumber] = records
+		self._pages.move_to_end(pageNumber)
+		while len(self._pages) > self.maxPages:
+			self._pages.popitem(last=False)
+
+	def invalidate(self, fromIndex=0):
+		"""Drops the cached pages from the one containing fromIndex onwards."""
+		firstPage = fromIndex // self.pageSize
+		for pageNumber in [number for number in self._pages if number >= firstPage]:
+			del self._pages[pageNumber]
+
+
+class PagedRowSource(_PagedSource):
+	"""
+	Window over the whole contact table.
+
+	Args:
+		fetchPage (callable): fetchPage(offset, limit) returning a list of records.
+		total (int): Number of rows in the table.
+		fetchAll (callable): Returns every record (used to save the list as CSV).
+		locate (callable): locate(record) returning the position of a stored record.
+	"""
+
+	def __init__(self, fetchPage, total, fetchAll, locate, pageSize=PAGE_SIZE, maxPages=MAX_PAGES):
+		super().__init__(pageSize, maxPages)
+		self.fetchPage = fetchPage
+		self.total = total
+		self.fetchAll = fetchAll
+		self.locate = locate
+
+	def count(self):
+		return self.total
+
+	def _readPage(self, pageNumber):
+		return self.fetchPage(pageNumber * self.pageSize, self.pageSize)
+
+	def position(self, record, current=None):
+		"""Returns where a record goes; the database already holds it."""
+		return self.locate(record)
+
+	# The database has already been written; the following pages shift by one row
+	# and are read again when shown.
+
+	def insert(self, index, record):
+		self.total += 1
+		self.invalidate(index)
+
+	def remove(self, index):
+		self.total -= 1
+		self.invalidate(index)
+
+	def allRecords(self):
+		return self.fetchAll()
+
+
+class KeyedRowSource(_PagedSource):
+	"""
+	Search results held as list keys (see listKey) and read one page at a time.
+
+	Args:
+		keys (list): Keys of the matching rows, in list order.
+		fetchRecords (callable): fetchRecords(keys) returning a dict from (source, id) to record.
+	"""
+
+	def __init__(self, keys, fetchRecords, pageSize=PAGE_SIZE, maxPages=MAX_PAGES):
+		super().__init__(pageSize, maxPages)
+		self.keys = list(keys)
+		self.fetchRecords = fetchRecords
+
+	def count(self):
+		return len(self.keys)
+
+	def _records(self, keys):
+		found = self.fetchRecords(keys)
+		return [found.get(key[2:]) for key in keys]
+
+	def _readPage(self, pageNumber):
+		start = pageNumber * self.pageSize
+		return self._records(self.keys[start : start + self.pageSize])
+
+	def position(self, record, current=None):
+		return bisect.bisect_left(self.keys, sortKey(record))
+
+	def insert(self, index, record):
+		self.keys.insert(index, sortKey(record))
+		self.invalidate(index)
+
+	def remove(self, index):
+		del self.keys[index]
+		self.invalidate(index)
+
+	def allRecords(self):
+		# Rows removed by someone else in the meantime are left out
+		return [record for record in self._records(self.keys) if record is not None]
+
+
+class VirtualContactList(wx.ListCtrl):
+	"""
+	Report-style list control in virtual mode.
+
+	Args:
+		parent (wx.Window): Parent window.
+		getValues (callable): Returns the tuple of column texts of a record.
+	"""
+
+	def __init__(self, parent, getValues):
+		super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.SUNKEN_BORDER)
+		self.getValues = getValues
+		self.source = ListRowSource([])
+
+	def setSource(self, source):
+		"""Shows the rows of another source."""
+		self.source = source
+		self.SetItemCount(source.count())
+		self.Refresh()
+
+	def _moveSelection(self, index):
+		"""Selects and focuses a row, clamped to the rows shown."""
+		for selected in self.getSelectedIndexes():
+			self.Select(selected, on=0)
+		index = min(index, self.GetItemCount() - 1)
+		if index >= 0:
+			self.Select(index)
+			self.Focus(index)
+
+	def getSelectedIndexes(self):
+		indexes = []
+		index = self.GetFirstSelected()
+		while index != -1:
+			indexes.append(index)
+			index = self.GetNextSelected(index)
+		return indexes
+
+	def _afterChange(self):
+		self.SetItemCount(self.source.count())
+		self.Refresh()
+
+	def insertRecord(self, record):
+		"""
+		Shows a new record at its place in the list.
+
+		The selection stays on the row that was selected, which moves down when
+		the new record goes before it.
+		"""
+		selected = self.GetFirstSelected()
+		index = self.source.position(record)
+		self.source.insert(index, record)
+		self._afterChange()
+		if selected != -1:
+			self._moveSelection(selected + 1 if index <= selected else selected)
+		return index
+
+	def updateRecord(self, index, record):
+		"""Shows the new content of a record, moving it if its place changed; the selection follows it."""
+		self.source.remove(index)
+		newIndex = self.source.position(record, current=index)
+		self.source.insert(newIndex, record)
+		self._afterChange()
+		if newIndex != index:
+			self._moveSelection(newIndex)
+		return newIndex
+
+	def removeRecord(self, index):
+		"""Removes a row; the selection moves to the row that takes its place."""
+		self.source.remove(index)
+		self._afterChange()
+		self._moveSelection(index)
+
+	def getRecord(self, index):
+		"""Returns the record shown at a position, or None."""
+		if index < 0:
+			return None
+		return self.source.get(index)
+
+	def OnGetItemText(self, item, column):
+		record = self.source.get(item)
+		if record is None:
+			return ""
+		return self.getValues(record)[column] or ""
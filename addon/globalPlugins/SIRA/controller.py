@@ -18,33 +18,102 @@ Created on: 08/01/2025.
 """
 
 import os
-import sys
+import string
 
 import addonHandler
 from logHandler import log
 
-from .model import ObjectExtensionRegistrationSystem, Section
+from .federation import federatedQuery
+from .libLoader import installVendoredFinder
+from .model import (
+	SORT_EXPRESSIONS,
+	ObjectExtensionRegistrationSystem,
+	Section,
+	digitsValue,
+	extensionNumber,
+	foldValue,
+	getActiveDatabasePath,
+	getActiveSource,
+	getDatabaseSources,
+	getDatabaseVersion,
+	isFederatedEnabled,
+)
+from .normalization import contactKey
+from .replica import replicaSync
+from .searchIndex import phoneticSearch, rankedSearch, searchIndexer
+from .structuredQuery import isStructuredQuery, structuredSearch
 from .sqlLoader import sql
-from .varsConfig import ADDON_PATH, IS64
 
-# Add the lib/ folder to sys.path (only once)
-libFolder = "lib64" if IS64 else "lib"
-libPath = os.path.join(ADDON_PATH, libFolder)
-
-if os.path.isdir(libPath) and libPath not in sys.path:
-	sys.path.insert(0, libPath)
-
-try:
-	import csv
-except ImportError as e:
-	log.error("Error importing the module: {}".format(str(e)))
-	raise ImportError("The required library is absent: csv.")
+# The libraries of lib/ are imported through a finder (see libLoader.py)
+installVendoredFinder()
 
 # Initialize translation support
 addonHandler.initTranslation()
 
+# Order of the contact list; backed by the index idxContactsSecretaryOffice.
+# Other orders chosen by the user are built by sortClause.
+LIST_ORDER = "secretaryOffice ASC, id ASC"
+
+# Case folding of SQLite's lower() and LIKE: ASCII letters only
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Ids per "IN (...)" lookup, below SQLite's default limit of 999 parameters
+ID_CHUNK = 500
+
+# Columns whose values are offered as choices in the contact form
+CHOICE_COLUMNS = ("secretaryOffice", "sector")
+
+# ((database, its version, page size), rows) of the first page of the list in its own order,
+# the page read whenever the list is opened
+_firstPage = None
+
+# {column: ((database, its version), values)} of getDistinctValues, read again only
+# when the database changes, as every contact form opened reads them
+_distinctValues = {}
+
+
+def sortClause(sort=None, federated=False):
+	"""
+	Returns the ORDER BY clause of a sort of the contact list.
+
+	Args:
+		sort (tuple, optional): (column, ascending). None is the list order.
+		federated (bool): For the tagged rows of a federated query.
+	"""
+	column, ascending = sort or ("secretaryOffice", True)
+	direction = "ASC" if ascending else "DESC"
+	source = f"source {direction}, " if federated else ""
+	return f"{SORT_EXPRESSIONS[column]} {direction}, {source}id {direction}"
+
+
+def recordSortKey(column):
+	"""
+	Returns a key function sorting records in memory by a column, as SORT_EXPRESSIONS does in SQL.
+
+	Empty (NULL) values come first, then the values folded by the Python twins of
+	the SQL expressions (foldValue, digitsValue, extensionNumber), so a column
+	sorts the same in the pages read from the database and in search results;
+	ties are kept in database and id order.
+	"""
+	if column in ("landline", "cell"):
+		fold = digitsValue
+	elif column == "extension":
+		fold = extensionNumber
+	elif column == "secretaryOffice":
+		fold = str
+	else:
+		fold = foldValue
+
+	def key(record):
+		value = getattr(record, column)
+		if value is None:
+			return (False, "", record.source, record.id)
+		return (True, fold(value), record.source, record.id)
+
+	return key
 
-def getAllRecords():
+
+def getAllRecords(sort=None):
 	"""
 	Function that retrieves all data from the database.
 
@@ -52,12 +121,60 @@ def getAllRecords():
 	in the contact table, sorted alphabetically by name. The results are converted
 	into `ObjectContact` objects and returned as a list.
 
+	Args:
+		sort (tuple, optional): (column, ascending) to sort by instead (see sortClause).
+
 	Returns:
 					list: A list of `ObjectContact` objects representing all records in the database.
 	"""
+	if isFederatedEnabled():
+		return convertResults(federatedQuery(orderBy=sortClause(sort, federated=True)))
+
 	with Section() as trans:
-		trans.execute("SELECT * FROM contacts ORDER BY secretaryOffice ASC")
+		trans.execute(f"SELECT * FROM contacts ORDER BY {sortClause(sort)}")
+		results = trans.fetchall()
+	return convertResults(results)
+
+
+def getRecordsPage(offset, limit, sort=None):
+	"""
+	Retrieves one page of the contact list, in the same order as getAllRecords.
+
+	Every sort has an index, so a page is read without sorting the table. The first
+	page in the list order is kept in memory until the database changes.
+
+	Args:
+		offset (int): Position of the first record of the page.
+		limit (int): Maximum number of records to return.
+		sort (tuple, optional): (column, ascending) to sort by instead (see sortClause).
+
+	Returns:
+		list: `ObjectExtensionRegistrationSystem` objects of the page.
+	"""
+	global _firstPage
+	if isFederatedEnabled():
+		# Federated results are cached per database version and order; slicing them is cheap
+		return convertResults(
+			federatedQuery(orderBy=sortClause(sort, federated=True))[offset : offset + limit],
+		)
+
+	path = getActiveDatabasePath()
+	key = None
+	if offset == 0 and sort is None:
+		key = (path, getDatabaseVersion(path), limit)
+		cached = _firstPage
+		if cached is not None and cached[0] == key and key[1] is not None:
+			return convertResults(cached[1])
+
+	with Section(path) as trans:
+		trans.execute(
+			f"SELECT * FROM contacts ORDER BY {sortClause(sort)} LIMIT ? OFFSET ?",
+			(limit, offset),
+		)
 		results = trans.fetchall()
+	if key is not None:
+		# The version was read before the query, so a write in between only makes the next call read again
+		_firstPage = (key, results)
 	return convertResults(results)
 
 
@@ -85,15 +202,69 @@ def convertResults(results):
 			record["extension"],
 			record["cell"],
 			record["email"],
+			record.get("source", ""),
 		)
 		for record in results
 	]
 	return rows
 
 
+def _readRecord(trans, id, source=None):
+	"""Reads one record back after a write, tagged with its database."""
+	trans.execute("SELECT * FROM contacts WHERE id = ?", (id,))
+	record = trans.cursor.fetchone()
+	if record is None:
+		return None
+	record["source"] = source or ""
+	return convertResults([record])[0]
+
+
+def getRecordPosition(record, sort=None):
+	"""
+	Returns the position of a record in the contact list (see getRecordsPage).
+
+	Args:
+		record (ObjectExtensionRegistrationSystem): A record read from the database.
+		sort (tuple, optional): (column, ascending) the list is sorted by.
+
+	Returns:
+		int: Number of records listed before it.
+	"""
+	if isFederatedEnabled():
+		rows = federatedQuery(orderBy=sortClause(sort, federated=True))
+		for index, row in enumerate(rows):
+			if row["id"] == record.id and row["source"] == record.source:
+				return index
+		return len(rows)
+
+	column, ascending = sort or ("secretaryOffice", True)
+	expression = SORT_EXPRESSIONS[column]
+	with Section() as trans:
+		# The value is computed by SQLite, exactly as the list is sorted
+		trans.execute(f"SELECT {expression} AS value FROM contacts WHERE id = ?", (record.id,))
+		row = trans.cursor.fetchone()
+		value = row["value"] if row is not None else None
+		# NULL values come first in ascending order, as in ORDER BY, and last in descending order
+		if ascending and value is None:
+			condition, params = f"{expression} IS NULL AND id < ?", (record.id,)
+		elif ascending:
+			condition = f"{expression} IS NULL OR {expression} < ? OR ({expression} = ? AND id < ?)"
+			params = (value, value, record.id)
+		elif value is None:
+			condition, params = f"{expression} IS NOT NULL OR id > ?", (record.id,)
+		else:
+			condition = f"{expression} > ? OR ({expression} = ? AND id > ?)"
+			params = (value, value, record.id)
+		trans.execute(f"SELECT COUNT(*) AS position FROM contacts WHERE {condition}", params)
+		return trans.cursor.fetchone()["position"]
+
+
 def addRecord(data):
 	"""
 	Insert new records into the database.
+
+	Returns:
+		ObjectExtensionRegistrationSystem: The record as stored, with its new id.
 	"""
 	requiredKeys = [
 		"secretaryOffice",
@@ -129,9 +300,64 @@ def addRecord(data):
 				),
 			)
 			trans.persist()
+			# Indexed now, so an "All fields" search finds the record soon after
+			searchIndexer.request(trans.path or getActiveDatabasePath())
+			# New records always go to the active database
+			record = _readRecord(
+				trans,
+				trans.cursor.lastrowid,
+				getActiveSource() if isFederatedEnabled() else "",
+			)
 	except Exception as e:
 		log.error(_("Error inserting record: {}").format(e))
 		raise
+	replicaSync.notifyLocalChange()
+	return record
+
+
+def phoneticColumn(filterChoice):
+	"""
+	Returns the column searched by sound by a filter option of the search combo box.
+
+	Returns:
+		str: The column name, or None if the option is not a "sounds like" one.
+	"""
+	phoneticMap = {
+		_("Sector (sounds like)"): "sector",
+		_("Responsible (sounds like)"): "responsible",
+	}
+	return phoneticMap.get(filterChoice)
+
+
+def searchColumn(filterChoice):
+	"""
+	Returns the contacts column searched by a filter option of the search combo box.
+
+	Returns:
+		str: The column name, or None for the "All fields" option.
+
+	Raises:
+		ValueError: If the option is unknown.
+	"""
+	if filterChoice == _("All fields"):
+		return None
+	if phoneticColumn(filterChoice) is not None:
+		return phoneticColumn(filterChoice)
+
+	columnMap = {
+		_("Secretary office"): "secretaryOffice",
+		_("Landline"): "landline",
+		_("Sector"): "sector",
+		_("Responsible"): "responsible",
+		_("Extension"): "extension",
+		_("Cell phone"): "cell",
+		_("Email"): "email",
+	}
+
+	# Check if the chosen filter is valid
+	if filterChoice not in columnMap:
+		raise ValueError(f"Invalid filter choice: {filterChoice}")
+	return columnMap[filterChoice]
 
 
 def searchRecords(filterChoice, keyword):
@@ -148,6 +374,11 @@ def searchRecords(filterChoice, keyword):
 														- 'Extension' (extension): filters records by the extension number.
 														- 'Cell Phone' (mobile): filters records by the mobile number of the contact.
 														- 'Email' (email): filters records by the contact email address.
+														- 'All fields': ranked search over every field (see searchIndex.py).
+														- 'Sector (sounds like)' and 'Responsible (sounds like)': words sounding
+														  like the keyword (see normalization.phoneticKey).
+										A keyword with "field:value" terms (see structuredQuery.py) is run as a
+										structured query, whatever the filter.
 
 						Keyword (STR): The keyword to be used in the search. It can be a part of the name, phone number or email, depending on the chosen filter.
 
@@ -155,34 +386,158 @@ def searchRecords(filterChoice, keyword):
 						List: A list of objects `Objectcontact` corresponding to the records found.
 	"""
 
-	queryMap = {
-		_("Secretary office"): "SELECT * FROM contacts WHERE secretaryOffice LIKE ?",
-		_("Landline"): "SELECT * FROM contacts WHERE landline LIKE ?",
-		_("Sector"): "SELECT * FROM contacts WHERE sector LIKE ?",
-		_("Responsible"): "SELECT * FROM contacts WHERE responsible LIKE ?",
-		_("Extension"): "SELECT * FROM contacts WHERE extension LIKE ?",
-		_("Cell phone"): "SELECT * FROM contacts WHERE cell LIKE ?",
-		_("Email"): "SELECT * FROM contacts WHERE email LIKE ?",
-	}
+	if isStructuredQuery(keyword):
+		keys = structuredSearch(keyword)
+		found = getRecordsByKeys(keys)
+		return [found[key[2:]] for key in keys if key[2:] in found]
 
-	# Check if the chosen filter is valid
-	query = queryMap.get(filterChoice, "")
-	if filterChoice not in queryMap.keys():
-		raise ValueError(f"Invalid filter choice: {filterChoice}")
+	column = phoneticColumn(filterChoice)
+	if column is not None:
+		keys = phoneticSearch(column, keyword)
+		found = getRecordsByKeys(keys)
+		return [found[key[2:]] for key in keys if key[2:] in found]
+
+	column = searchColumn(filterChoice)
+	if column is None:
+		# Best matches first, not in list order
+		return convertResults(rankedSearch(keyword))
+
+	if isFederatedEnabled():
+		return convertResults(federatedQuery(f"{column} LIKE ?", ("%" + keyword + "%",)))
 
 	with Section() as trans:
-		trans.execute(query, ("%" + keyword + "%",))
+		trans.execute(
+			f"SELECT * FROM contacts WHERE {column} LIKE ? ORDER BY {LIST_ORDER}",
+			("%" + keyword + "%",),
+		)
 		results = trans.fetchall()
 
 	return convertResults(results)
 
 
-def editRecord(ID, row):
+def getSearchColumn(column):
+	"""
+	Reads one column of every record, in list order, for searching in memory.
+
+	Values are folded like LIKE compares them (SQLite's lower() only folds ASCII
+	letters, as LIKE does), and each row carries its list key (see contactList.listKey).
+
+	Args:
+		column (str): Column name, as returned by searchColumn.
+
+	Returns:
+		list: Tuples (folded value, has secretary office, secretary office, source, id).
+	"""
+	if isFederatedEnabled():
+		return [
+			(
+				(row[column] or "").translate(ASCII_LOWER),
+				row["secretaryOffice"] is not None,
+				row["secretaryOffice"] or "",
+				row["source"],
+				row["id"],
+			)
+			for row in federatedQuery()
+		]
+
+	with Section() as trans:
+		# Plain tuples: building a dictionary per row would dominate on large tables
+		cursor = trans.connect.cursor()
+		cursor.row_factory = None
+		cursor.execute(
+			f"""SELECT IFNULL(lower({column}), ''), secretaryOffice IS NOT NULL, IFNULL(secretaryOffice, ''), '', id
+			FROM contacts ORDER BY {LIST_ORDER}""",
+		)
+		return cursor.fetchall()
+
+
+def getDistinctValues(column):
+	"""
+	Reads the different values of a column, to be offered as choices in the contact form.
+
+	The values are kept until the database changes, so opening another form does not read them again.
+
+	Args:
+		column (str): One of CHOICE_COLUMNS.
+
+	Returns:
+		list: The values of the active database in alphabetical order, without empty ones;
+			an empty list if the database cannot be read.
+	"""
+	if column not in CHOICE_COLUMNS:
+		raise ValueError(f"Column without choices: {column}")
+	path = getActiveDatabasePath()
+	key = (path, getDatabaseVersion(path))
+	cached = _distinctValues.get(column)
+	if cached is not None and cached[0] == key and key[1] is not None:
+		return list(cached[1])
+	try:
+		with Section(path) as trans:
+			trans.execute(
+				f"SELECT DISTINCT {column} FROM contacts WHERE {column} IS NOT NULL AND {column} <> '' ORDER BY {column}",
+			)
+			values = list(
+				dict.fromkeys(row[column].strip() for row in trans.fetchall() if row[column].strip()),
+			)
+	except sql.Error as e:
+		log.error(f"Error reading the values of {column}: {e}")
+		return []
+	# The version was read before the query, so a write in between only makes the next call read again
+	_distinctValues[column] = (key, values)
+	return list(values)
+
+
+def getRecordsByKeys(keys):
+	"""
+	Reads the records of a list of row keys.
+
+	Args:
+		keys (iterable): Tuples whose last two items are the database ("source") and the id.
+
+	Returns:
+		dict: Records by (source, id). Records that no longer exist are missing.
+	"""
+	idsBySource = {}
+	for key in keys:
+		idsBySource.setdefault(key[-2], []).append(key[-1])
+
+	records = {}
+	for source, ids in idsBySource.items():
+		with _sectionFor(source) as trans:
+			for start in range(0, len(ids), ID_CHUNK):
+				chunk = ids[start : start + ID_CHUNK]
+				trans.execute(
+					f"SELECT * FROM contacts WHERE id IN ({', '.join('?' * len(chunk))})",
+					chunk,
+				)
+				rows = trans.fetchall()
+				for row in rows:
+					row["source"] = source
+				for record in convertResults(rows):
+					records[(source, record.id)] = record
+	return records
+
+
+def _sectionFor(source=None):
+	"""
+	Returns a Section on the database a record came from.
+
+	Args:
+		source (str, optional): "primary" or "alternate" for rows of a federated search.
+			Empty or None means the active database.
+	"""
+	if not source:
+		return Section()
+	return Section(getDatabaseSources()[source])
+
+
+def editRecord(ID, row, source=None):
 	"""
 	Function to update records in the database.
 
 	Args:
 					ID (int): The unique identifier of the record that will be updated.
+					source (str, optional): Database of the record in a federated search.
 					row (dict): A dictionary containing the new values for the registration.
 									The expected keys in the dictionary are:
 													- 'secretaryOffice' (str): The new name of the contact secretariat.
@@ -192,9 +547,12 @@ def editRecord(ID, row):
 													- 'extension' (str): The new contact branch number.
 													- 'cell' (str): The new phone number of contact.
 													- 'email' (str): The new contact email address.
+
+	Returns:
+					ObjectExtensionRegistrationSystem: The record as stored, or None if it no longer exists.
 	"""
 
-	with Section() as trans:
+	with _sectionFor(source) as trans:
 		trans.execute(
 			"UPDATE contacts SET secretaryOffice = ?, landline = ?, sector = ?, responsible = ?, extension = ?, cell = ?, email = ? WHERE id = ?",
 			(
@@ -209,25 +567,32 @@ def editRecord(ID, row):
 			),
 		)
 		trans.persist()
+		searchIndexer.request(trans.path or getActiveDatabasePath())
+		record = _readRecord(trans, ID, source)
+	replicaSync.notifyLocalChange()
+	return record
 
 
-def delete(id):
+def delete(id, source=None):
 	"""
 	Function to remove a record from the database with error handling.
 
 	Args:
 		id (int): The unique identifier of the record to be removed.
+		source (str, optional): Database of the record in a federated search.
 	"""
 	try:
-		with Section() as trans:
+		with _sectionFor(source) as trans:
 			if not trans.connected:
 				log.warning("Unable to connect to database to delete record.")
 				return False
 
 			trans.execute("DELETE FROM contacts WHERE id=?", (id,))
 			trans.persist()
+			searchIndexer.request(trans.path or getActiveDatabasePath())
 			log.info(f"Registro com ID {id} deletado com sucesso.")
-			return True
+		replicaSync.notifyLocalChange()
+		return True
 
 	except sql.Error as e:
 		log.error(f"Error deleting record (ID: {id}): {e.__class__.__name__} - {e}")
@@ -237,10 +602,26 @@ def delete(id):
 def resetRecord():
 	"""
 	Delete all records from the database.
+
+	Returns:
+		int: Number of records deleted.
 	"""
 	with Section() as trans:
 		trans.execute("DELETE FROM contacts")
+		deleted = trans.cursor.rowcount
 		trans.persist()
+	replicaSync.notifyLocalChange()
+	return deleted
+
+
+def _loadCsv():
+	"""Imports the csv module of lib/ on first use; only imports and exports need it."""
+	try:
+		import csv
+	except ImportError as e:
+		log.error("Error importing the module: {}".format(str(e)))
+		raise ImportError("The required library is absent: csv.")
+	return csv
 
 
 def importCsvToDb(myPath):
@@ -260,6 +641,7 @@ def importCsvToDb(myPath):
 			f"The file at {myPath} does not exist or is not a valid path.",
 		)
 
+	csv = _loadCsv()
 	with Section() as trans:
 		try:
 			with open(myPath, "r", encoding="UTF-8") as file:
@@ -318,9 +700,90 @@ def importCsvToDb(myPath):
 		except (FileNotFoundError, csv.Error, UnicodeDecodeError) as e:
 			log.error(f"Error importing data: {str(e)}")
 			raise
+	replicaSync.notifyLocalChange()
+
+
+def mergeFromDatabase(myPath, dryRun=False):
+	"""
+	Merges the contacts of another SIRA database into the active one.
+
+	The other file is attached to the same connection and deduplicated with
+	set-based SQL over a normalized key (secretary office, landline, sector and
+	extension, ignoring accents, case and phone punctuation): rows whose key already
+	exists, or repeat an earlier row of the same file, are skipped. All new rows
+	are inserted in a single transaction.
+
+	Args:
+		myPath (str): Path to the SIRA database (.db) to merge from.
+		dryRun (bool): When True nothing is written; the rows that would be added are returned.
+
+	Returns:
+		list or int: In dry-run mode, the `ObjectExtensionRegistrationSystem` objects that
+			would be added; otherwise the number of rows inserted.
+
+	Raises:
+		FileNotFoundError: If the file does not exist.
+		ValueError: If the file is the active database or is not a SIRA database.
+	"""
+	if not isinstance(myPath, str) or not os.path.isfile(myPath):
+		raise FileNotFoundError(
+			f"The file at {myPath} does not exist or is not a valid path.",
+		)
+	activePath = getActiveDatabasePath()
+	if os.path.isfile(activePath) and os.path.samefile(myPath, activePath):
+		raise ValueError(_("It is not possible to merge a database into itself."))
+
+	columns = "secretaryOffice, landline, sector, responsible, extension, cell, email"
+	with Section() as trans:
+		trans.connect.create_function("contactKey", 4, contactKey, deterministic=True)
+		trans.execute("ATTACH DATABASE ? AS source", (myPath,))
+		try:
+			trans.execute("SELECT name FROM source.sqlite_master WHERE type = 'table' AND name = 'contacts'")
+			if not trans.fetchall():
+				raise ValueError(_("The selected file is not a SIRA database."))
+
+			trans.execute(
+				"""CREATE TEMP TABLE mergeExisting AS
+				SELECT DISTINCT contactKey(secretaryOffice, landline, sector, extension) AS key
+				FROM main.contacts""",
+			)
+			trans.execute("CREATE INDEX temp.idxMergeExisting ON mergeExisting(key)")
+			trans.execute(
+				"""CREATE TEMP TABLE mergeNew AS
+				SELECT MIN(id) AS id FROM (
+					SELECT id, contactKey(secretaryOffice, landline, sector, extension) AS key
+					FROM source.contacts
+				)
+				WHERE key NOT IN (SELECT key FROM mergeExisting)
+				GROUP BY key""",
+			)
+			selectNew = f"""SELECT {columns} FROM source.contacts
+				WHERE id IN (SELECT id FROM mergeNew) ORDER BY id"""
+
+			if dryRun:
+				trans.execute(f"SELECT NULL AS id, {columns} FROM ({selectNew})")
+				return convertResults(trans.fetchall())
+
+			trans.execute("BEGIN IMMEDIATE")
+			try:
+				trans.execute(f"INSERT INTO main.contacts ({columns}) {selectNew}")
+				inserted = trans.cursor.rowcount
+				trans.persist()
+			except Exception:
+				trans.connect.rollback()
+				raise
+		finally:
+			trans.execute("DROP TABLE IF EXISTS temp.mergeExisting")
+			trans.execute("DROP TABLE IF EXISTS temp.mergeNew")
+			trans.execute("DETACH DATABASE source")
+
+	log.info(f"Merged {inserted} contacts from {myPath}")
+	replicaSync.notifyLocalChange()
+	return inserted
 
 
 def exportDBToCsv(myPath):
+	csv = _loadCsv()
 	try:
 		with Section() as trans:
 			trans.execute("SELECT * FROM contacts")
@@ -350,15 +813,21 @@ def exportDBToCsv(myPath):
 		raise
 
 
-def countRecords():
+def countRecords(allDatabases=False):
 	"""
 	It counts the total number of records in the database safely.
 
+	Args:
+		allDatabases (bool): Count the rows of both databases when federated search is enabled.
+
 	Returns:
 		INT: The total number of records.
 		None: In case of error when accessing the database.
 	"""
 	try:
+		if allDatabases and isFederatedEnabled():
+			return len(federatedQuery())
+
 		with Section() as trans:
 			if not trans.connected:
 				return None
@@ -393,6 +862,7 @@ def saveCsv(filteredItem, myPath):
 
 	# Check if Filtered Item is a list
 	if isinstance(filteredItem, list):
+		csv = _loadCsv()
 		# Mapping between CSV columns and object attributes
 		columnToAttribute = {
 			"Secretaria": "secretaryOffice",
@@ -461,9 +931,8 @@ def findDuplicateRecords():
 			sqlFetchDuplicates = f"SELECT * FROM contacts WHERE id IN ({placeholders})"
 			trans.execute(sqlFetchDuplicates, allDuplicateIds)
 
-			duplicateRecords = [
-				ObjectExtensionRegistrationSystem(**record) for record in trans.cursor.fetchall()
-			]
+			# convertResults ignores the sync metadata columns
+			duplicateRecords = convertResults(trans.cursor.fetchall())
 
 			return duplicateRecords
 
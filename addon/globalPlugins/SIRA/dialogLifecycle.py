@@ -0,0 +1,174 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Reuse of the dialogs opened by the add-on's gestures.
+
+The dialogs opened through GlobalPlugin.displayDialog are hidden when closed
+instead of destroyed. The next gesture shows the same window again after its
+resetDialog method has put it back in the state of a new one, so no sizer,
+label or masked control is built again.
+
+Hidden dialogs keep their native windows, which are what they cost: together
+they may hold at most MAX_HIDDEN_WINDOWS windows (a dialog and each of its
+controls), the dialogs closed the longest ago being destroyed first. A dialog
+left hidden for IDLE_TIMEOUT seconds is destroyed too.
+"""
+
+import time
+from functools import partial
+
+import wx
+from logHandler import log
+
+# Native windows (dialogs and their controls) kept by the hidden dialogs
+MAX_HIDDEN_WINDOWS = 300
+
+# Seconds a dialog stays hidden before being destroyed (20 minutes)
+IDLE_TIMEOUT = 20 * 60
+
+
+def countWindows(window):
+	"""Returns the number of native windows of a window, its own included."""
+	return 1 + sum(countWindows(child) for child in window.GetChildren())
+
+
+class DialogManager(object):
+	"""Keeps the dialogs of the add-on by name, hidden between two uses."""
+
+	def __init__(self):
+		super().__init__()
+		# {name: dialog}, shown or hidden
+		self._dialogs = {}
+		# {name: (time.monotonic() when hidden, windows)}, oldest first
+		self._hidden = {}
+		self._timer = None
+
+	def add(self, name, dlg):
+		"""Keeps a new dialog, to be hidden when closed (see closeDialog)."""
+		self._dialogs[name] = dlg
+		dlg.Bind(wx.EVT_WINDOW_DESTROY, partial(self._onDestroy, name=name))
+
+	def reuse(self, name):
+		"""
+		Returns the dialog kept under a name, ready to be shown.
+
+		A hidden dialog is put back in its initial state first.
+
+		Returns:
+			wx.Dialog: The dialog, or None when there is none or it must be built again.
+		"""
+		dlg = self._dialogs.get(name)
+		if dlg is None or not dlg:
+			self._forget(name)
+			return None
+		if self._hidden.pop(name, None) is None:
+			# Still shown
+			return dlg
+		try:
+			reset = dlg.resetDialog()
+		except Exception as e:
+			log.error(f"Error resetting the dialog {name}: {e}", exc_info=True)
+			reset = False
+		if not reset:
+			self._destroy(name)
+			return None
+		return dlg
+
+	def hide(self, dlg):
+		"""
+		Hides a dialog closed by the user.
+
+		Returns:
+			bool: False when the dialog is not kept here and must be destroyed.
+		"""
+		name = next((name for name, kept in self._dialogs.items() if kept is dlg), None)
+		if name is None or not hasattr(dlg, "resetDialog"):
+			return False
+		dlg.Hide()
+		self._hidden.pop(name, None)
+		self._hidden[name] = (time.monotonic(), countWindows(dlg))
+		self._trim()
+		self._scheduleEviction()
+		return True
+
+	def forget(self, name):
+		"""Stops keeping a dialog, without destroying it."""
+		self._forget(name)
+
+	def destroyHidden(self):
+		"""Destroys the hidden dialogs and stops keeping the others (when the add-on ends)."""
+		if self._timer is not None:
+			self._timer.Stop()
+			self._timer = None
+		for name in list(self._hidden):
+			self._destroy(name)
+		self._dialogs.clear()
+
+	def _forget(self, name):
+		self._dialogs.pop(name, None)
+		self._hidden.pop(name, None)
+
+	def _destroy(self, name):
+		dlg = self._dialogs.get(name)
+		self._forget(name)
+		if dlg:
+			dlg.Destroy()
+
+	def _trim(self):
+		"""Destroys the dialogs hidden the longest ago while they hold too many windows."""
+		windows = sum(count for hiddenAt, count in self._hidden.values())
+		while windows > MAX_HIDDEN_WINDOWS and self._hidden:
+			name = next(iter(self._hidden))
+			windows -= self._hidden[name][1]
+			log.debug(f"Dialog {name} destroyed: hidden dialogs above {MAX_HIDDEN_WINDOWS} windows")
+			self._destroy(name)
+
+	def _scheduleEviction(self):
+		if self._timer is not None or not self._hidden:
+			return
+		oldest = min(hiddenAt for hiddenAt, count in self._hidden.values())
+		delay = max(0, oldest + IDLE_TIMEOUT - time.monotonic())
+		self._timer = wx.CallLater(int(delay * 1000) + 1, self._evictIdle)
+
+	def _evictIdle(self):
+		self._timer = None
+		now = time.monotonic()
+		for name, (hiddenAt, count) in list(self._hidden.items()):
+			if now - hiddenAt >= IDLE_TIMEOUT:
+				log.debug(f"Dialog {name} destroyed after {IDLE_TIMEOUT} s hidden")
+				self._destroy(name)
+		self._scheduleEviction()
+
+	def _onDestroy(self, event, name):
+		if self._dialogs.get(name) is event.GetEventObject():
+			self._forget(name)
+		event.Skip()
+
+
+dialogManager = DialogManager()
+
+
+def closeDialog(dlg):
+	"""
+	Closes a dialog: hides it when it is kept by the dialogManager, destroys it otherwise.
+
+	Args:
+		dlg (wx.Dialog): The dialog closed by the user.
+	"""
+	if not dialogManager.hide(dlg):
+		dlg.Destroy()
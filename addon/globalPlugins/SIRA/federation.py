@@ -0,0 +1,122 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Federated queries over the primary and the alternate database.
+
+Both files are opened on a single connection (the alternate one through
+ATTACH DATABASE) and queried with UNION ALL, each row tagged with the
+database it came from. Every file keeps its own schema and indexes, which
+are created by Section.initDB the first time it takes part in a search.
+"""
+
+import threading
+from collections import OrderedDict
+
+from logHandler import log
+
+from .model import Section, getDatabaseSources, getDatabaseVersion
+from .sqlLoader import sql
+
+# Columns selected from each side; an explicit list keeps UNION ALL valid even
+# when the two files are at different schema versions.
+CONTACT_COLUMNS = "id, secretaryOffice, landline, sector, responsible, extension, cell, email"
+
+# Maximum number of result lists kept in memory
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_cacheLock = threading.Lock()
+_initialized = set()
+
+
+def ensureSchema(path):
+	"""Creates the schema (and indexes) of a database once per session."""
+	if path in _initialized:
+		return
+	Section.initDB(path)
+	_initialized.add(path)
+
+
+def _cacheGet(key):
+	with _cacheLock:
+		results = _cache.get(key)
+		if results is not None:
+			_cache.move_to_end(key)
+		return results
+
+
+def _cachePut(key, results):
+	with _cacheLock:
+		_cache[key] = results
+		_cache.move_to_end(key)
+		while len(_cache) > CACHE_SIZE:
+			_cache.popitem(last=False)
+
+
+def clearCache():
+	"""Drops all cached federated results."""
+	with _cacheLock:
+		_cache.clear()
+
+
+def federatedQuery(where="", params=(), orderBy="secretaryOffice ASC, source ASC, id ASC"):
+	"""
+	Runs a query over both databases and returns the tagged rows.
+
+	Results are cached and reused for as long as neither database file changes.
+	If the alternate database cannot be opened, only the primary one is queried.
+
+	Args:
+		where (str): Optional WHERE clause (without the keyword) applied to each side.
+		params (tuple): Parameters of the WHERE clause, for a single side.
+		orderBy (str): ORDER BY clause of the combined result.
+
+	Returns:
+		list: Dictionaries with the contact columns plus "source".
+	"""
+	sources = getDatabaseSources()
+	versions = tuple((name, path, getDatabaseVersion(path)) for name, path in sources.items())
+	key = (where, tuple(params), orderBy, versions)
+	cached = _cacheGet(key)
+	if cached is not None:
+		return cached
+
+	condition = f" WHERE {where}" if where else ""
+	primaryQuery = f"SELECT {CONTACT_COLUMNS}, 'primary' AS source FROM main.contacts{condition}"
+	alternateQuery = f"SELECT {CONTACT_COLUMNS}, 'alternate' AS source FROM alt.contacts{condition}"
+
+	ensureSchema(sources["primary"])
+	with Section(sources["primary"]) as trans:
+		try:
+			ensureSchema(sources["alternate"])
+			trans.execute("ATTACH DATABASE ? AS alt", (sources["alternate"],))
+		except (sql.Error, OSError) as e:
+			log.warning(f"Alternate database unavailable, searching the primary only: {e}")
+			trans.execute(f"{primaryQuery} ORDER BY {orderBy}", params)
+			return trans.fetchall()
+
+		# Ordered outside the compound query, so orderBy may use expressions
+		trans.execute(
+			f"SELECT * FROM ({primaryQuery} UNION ALL {alternateQuery}) ORDER BY {orderBy}",
+			tuple(params) * 2,
+		)
+		results = trans.fetchall()
+		trans.execute("DETACH DATABASE alt")
+
+	_cachePut(key, results)
+	return results
@@ -11,10 +11,75 @@ https://www.gnu.org/licenses/gpl-2.0.html
 Created on: 21/02/2025
 """
 
+from functools import lru_cache
+
 import wx
 import winsound
 
 
+class CompiledMask(object):
+	"""
+	Máscara pré-processada, compartilhada pelos campos que usam a mesma máscara.
+
+	As tabelas next_editable e previous_editable dão, para cada posição, o
+	índice editável seguinte (>= pos) e o anterior (< pos), ou None, sem
+	percorrer a máscara a cada tecla.
+	"""
+
+	def __init__(self, mask, mask_char, placeholder_char):
+		self.mask = mask
+		self.placeholder_char = placeholder_char
+		self.editable = tuple(i for i, c in enumerate(mask) if c == mask_char)
+		self.placeholder = ''.join(placeholder_char if c == mask_char else c for c in mask)
+
+		length = len(mask)
+		next_editable = [None] * (length + 1)
+		following = None
+		for i in range(length - 1, -1, -1):
+			if mask[i] == mask_char:
+				following = i
+			next_editable[i] = following
+		self.next_editable = tuple(next_editable)
+
+		previous_editable = [None] * (length + 1)
+		preceding = None
+		for i in range(length + 1):
+			previous_editable[i] = preceding
+			if i < length and mask[i] == mask_char:
+				preceding = i
+		self.previous_editable = tuple(previous_editable)
+
+	def next_pos(self, pos):
+		"""Índice editável >= pos, ou None."""
+		return self.next_editable[pos] if 0 <= pos < len(self.next_editable) else None
+
+	def previous_pos(self, pos):
+		"""Índice editável < pos, ou None."""
+		if pos <= 0:
+			return None
+		return self.previous_editable[min(pos, len(self.previous_editable) - 1)]
+
+	def clean(self, value):
+		"""Retorna só os dígitos das posições editáveis de value."""
+		return ''.join(value[i] for i in self.editable if i < len(value) and value[i].isdigit())
+
+	def apply(self, digits):
+		"""Aplica a máscara na string só de dígitos."""
+		formatted = list(self.placeholder)
+		for i, digit in zip(self.editable, digits):
+			formatted[i] = digit
+		return ''.join(formatted)
+
+	def is_complete(self, value):
+		return self.placeholder_char not in value
+
+
+@lru_cache(maxsize=32)
+def compile_mask(mask, mask_char, placeholder_char):
+	"""Retorna a CompiledMask de uma máscara (calculada uma única vez por máscara)."""
+	return CompiledMask(mask, mask_char, placeholder_char)
+
+
 class MaskedTextCtrl(wx.TextCtrl):
 	MASK_CHAR = 'X'
 	PLACEHOLDER_CHAR = '_'
@@ -22,6 +87,7 @@ class MaskedTextCtrl(wx.TextCtrl):
 	def __init__(self, parent, mask, *args, **kwargs):
 		super().__init__(parent, *args, **kwargs)
 		self.mask = mask
+		self._compiled = compile_mask(mask, self.MASK_CHAR, self.PLACEHOLDER_CHAR)
 		self._is_updating = False
 		self.Bind(wx.EVT_CHAR, self.on_char)
 		self.Bind(wx.EVT_TEXT, self.on_text)
@@ -30,15 +96,12 @@ class MaskedTextCtrl(wx.TextCtrl):
 	def _init_value(self):
 		"""Inicializa o campo com o placeholder da máscara."""
 		placeholder = self._generate_placeholder()
-		self.SetValue(placeholder)
+		self.ChangeValue(placeholder)
 		self.SetInsertionPoint(0)
 
 	def _generate_placeholder(self):
 		"""Gera uma string do tamanho da máscara com placeholders."""
-		return ''.join(
-			self.PLACEHOLDER_CHAR if c == self.MASK_CHAR else c
-			for c in self.mask
-		)
+		return self._compiled.placeholder
 
 	def on_char(self, event):
 		key_code = event.GetKeyCode()
@@ -63,7 +126,7 @@ class MaskedTextCtrl(wx.TextCtrl):
 
 			if key_code == wx.WXK_DELETE:
 				# Delete: apaga o caractere na posição atual se for editável
-				if pos < length and self.mask[pos] == self.MASK_CHAR:
+				if pos < length and self._compiled.next_pos(pos) == pos:
 					self._replace_char(pos, self.PLACEHOLDER_CHAR)
 					self.SetInsertionPoint(pos)
 				return
@@ -95,71 +158,59 @@ class MaskedTextCtrl(wx.TextCtrl):
 		self.SetInsertionPoint(next_pos + 1)
 
 	def on_text(self, event):
+		# Só chega aqui em mudanças externas (SetValue, Clear, colar): as teclas
+		# tratadas em on_char atualizam o valor com ChangeValue, sem evento de texto.
 		if self._is_updating:
 			return
 		# Previne edição direta do valor, só aceita via on_char
 		# Reaplica o valor para evitar colar texto errado
 		self._is_updating = True
 		try:
-			value = self.GetValue()
-			clean_value = self.get_clean_value()
-
-			# Reconstrói o texto com máscara e clean_value
-			new_value = self._apply_mask(clean_value)
-			if value != new_value:
-				self.SetValue(new_value)
+			if self._set_masked_value(self.GetValue()):
 				# Ajusta cursor para o próximo lugar editável
 				next_pos = self._find_next_editable_pos(self.GetInsertionPoint())
 				if next_pos is None:
-					next_pos = len(new_value)
+					next_pos = len(self.mask)
 				self.SetInsertionPoint(next_pos)
-
-			# Beep quando campo completo (sem placeholders)
-			if self.PLACEHOLDER_CHAR not in new_value:
-				winsound.MessageBeep()
 		finally:
 			self._is_updating = False
 
 		event.Skip()
 
+	def _set_masked_value(self, value):
+		"""
+		Mostra value com a máscara reaplicada, numa única atualização e sem evento de texto.
+
+		Retorna True se o texto do campo mudou.
+		"""
+		new_value = self._compiled.apply(self._compiled.clean(value))
+		changed = new_value != self.GetValue()
+		if changed:
+			self.ChangeValue(new_value)
+
+		# Beep quando campo completo (sem placeholders)
+		if self._compiled.is_complete(new_value):
+			winsound.MessageBeep()
+		return changed
+
 	def _replace_char(self, pos, char):
 		"""Substitui caractere na posição pos por char."""
-		value = list(self.GetValue())
+		value = self.GetValue()
 		if 0 <= pos < len(value):
-			value[pos] = char
-			self.SetValue(''.join(value))
+			self._set_masked_value(value[:pos] + char + value[pos + 1:])
 
 	def _find_next_editable_pos(self, pos):
 		"""Encontra próximo índice editável (onde mask é MASK_CHAR) >= pos."""
-		for i in range(pos, len(self.mask)):
-			if self.mask[i] == self.MASK_CHAR:
-				return i
-		return None
+		return self._compiled.next_pos(pos)
 
 	def _find_previous_editable_pos(self, pos):
 		"""Encontra o índice editável anterior < pos."""
-		for i in range(pos - 1, -1, -1):
-			if self.mask[i] == self.MASK_CHAR:
-				return i
-		return None
+		return self._compiled.previous_pos(pos)
 
 	def _apply_mask(self, digits):
 		"""Aplica máscara na string só de dígitos."""
-		formatted = []
-		digit_index = 0
-		for char in self.mask:
-			if char == self.MASK_CHAR:
-				if digit_index < len(digits):
-					formatted.append(digits[digit_index])
-					digit_index += 1
-				else:
-					formatted.append(self.PLACEHOLDER_CHAR)
-			else:
-				formatted.append(char)
-		return ''.join(formatted)
+		return self._compiled.apply(digits)
 
 	def get_clean_value(self):
 		"""Retorna o valor do campo só com dígitos."""
-		return ''.join(
-			c for c, m in zip(self.GetValue(), self.mask) if m == self.MASK_CHAR and c.isdigit()
-		)
+		return self._compiled.clean(self.GetValue())
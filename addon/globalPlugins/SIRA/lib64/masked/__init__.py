@@ -17,11 +17,48 @@ __doc__     = """\
 package providing "masked edit" controls, allowing characters within a data entry control to remain fixed, and providing fine-grain control over allowed user input.
 """
 
-# import relevant external symbols into package namespace:
-from .maskededit import *
-from .textctrl   import BaseMaskedTextCtrl, PreMaskedTextCtrl, TextCtrl
-from .combobox   import BaseMaskedComboBox, PreMaskedComboBox, ComboBox, MaskedComboBoxSelectEvent
-from .numctrl    import NumCtrl, wxEVT_COMMAND_MASKED_NUMBER_UPDATED, EVT_NUM, NumberUpdatedEvent
-from .timectrl   import TimeCtrl, wxEVT_TIMEVAL_UPDATED, EVT_TIMEUPDATE, TimeUpdatedEvent
-from .ipaddrctrl import IpAddrCtrl
-from .ctrl       import Ctrl, controlTypes, TEXT, COMBO, IPADDR, TIME, NUMBER
+# Names of the package and the module defining them. SIRA only uses TextCtrl (and
+# ComboBox), so a module is imported when one of its names is first used, instead
+# of importing every control with the package; other names come from maskededit.
+_SUBMODULES = {
+    "BaseMaskedTextCtrl": "textctrl",
+    "PreMaskedTextCtrl": "textctrl",
+    "TextCtrl": "textctrl",
+    "BaseMaskedComboBox": "combobox",
+    "PreMaskedComboBox": "combobox",
+    "ComboBox": "combobox",
+    "MaskedComboBoxSelectEvent": "combobox",
+    "NumCtrl": "numctrl",
+    "wxEVT_COMMAND_MASKED_NUMBER_UPDATED": "numctrl",
+    "EVT_NUM": "numctrl",
+    "NumberUpdatedEvent": "numctrl",
+    "TimeCtrl": "timectrl",
+    "wxEVT_TIMEVAL_UPDATED": "timectrl",
+    "EVT_TIMEUPDATE": "timectrl",
+    "TimeUpdatedEvent": "timectrl",
+    "IpAddrCtrl": "ipaddrctrl",
+    "Ctrl": "ctrl",
+    "controlTypes": "ctrl",
+    "TEXT": "ctrl",
+    "COMBO": "ctrl",
+    "IPADDR": "ctrl",
+    "TIME": "ctrl",
+    "NUMBER": "ctrl",
+}
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    import importlib
+    module = importlib.import_module("." + _SUBMODULES.get(name, "maskededit"), __name__)
+    try:
+        value = getattr(module, name)
+    except AttributeError:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name)) from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
@@ -22,7 +22,7 @@ function.  See maskededit module overview for how to configure the control.
 """
 
 import  wx
-from wx.lib.masked import *
+from .maskededit import *
 
 # jmg 12/9/03 - when we cut ties with Py 2.2 and earlier, this would
 # be a good place to implement the 2.3 logger class
@@ -491,7 +491,7 @@ class BaseMaskedComboBox( wx.ComboBox, MaskedEditMixin):
                 raise ValueError('%s: "%s" is not a valid value for the control as specified.' % (str(self._index), choice))
 
             if not self._ctrl_constraints._choices:
-                self._ctrl_constraints._compareChoices = []
+                self._ctrl_constraints._compareChoices = ChoiceList()
                 self._ctrl_constraints._choices = []
                 self._hasList = True
 
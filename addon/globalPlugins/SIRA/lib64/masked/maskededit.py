@@ -814,11 +814,13 @@ Accessor Functions
     set of options, while not requiring derived classes to be so general.
 """
 
+import  bisect
 import  copy
 import  difflib
 import  re
 import  string
 import  sys
+import  threading
 
 import  wx
 
@@ -1297,6 +1299,171 @@ autoformats.sort()
 
 ## ---------- ---------- ---------- ---------- ---------- ---------- ----------
 
+## ---------- ---------- ---------- ---------- ---------- ---------- ----------
+## Process-wide cache of parsed masks (SIRA).
+##
+## Parsing a mask and working out its fields depends only on the mask, so
+## every control created with the same mask reuses the result.  The cached
+## strings, dictionaries and tuples are shared read-only: controls replace
+## them, never modify them, when they are reconfigured.  Each control still
+## gets its own Field instances, copied from a cached prototype.
+
+_MASK_CACHE_SIZE = 256
+_maskCache = {}
+_fieldPrototypes = {}
+_cacheLock = threading.Lock()
+
+
+def _cached(key, compute):
+    """Returns the cached value for key, computing and storing it if absent."""
+    try:
+        return _maskCache[key]
+    except KeyError:
+        pass
+    value = compute()
+    with _cacheLock:
+        if len(_maskCache) >= _MASK_CACHE_SIZE:
+            _maskCache.clear()
+        _maskCache[key] = value
+    return value
+
+
+def _expandMask(mask):
+    """Expands the c{n} syntax of a mask ("#{3}" becomes "###")."""
+    # regular expression for parsing c{n} syntax:
+    rex = re.compile('([' + "".join(maskchars) + r'])\{(\d+)\}')
+    s = mask
+    match = rex.search(s)
+    while match:    # found an(other) occurrence
+        maskchr = s[match.start(1):match.end(1)]            # char to be repeated
+        repcount = int(s[match.start(2):match.end(2)])      # the number of times
+        replacement = "".join( maskchr * repcount)  # the resulting substr
+        s = s[:match.start(1)] + replacement + s[match.end(2)+1:]   #account for trailing '}'
+        match = rex.search(s)                               # look for another such entry in mask
+    return s
+
+
+def _parseMask(s):
+    """
+    Returns the mask without escapes and '|' separators, a dictionary of booleans
+    indexed by position telling whether it is a mask char, and the tuple of
+    positions of explicit field boundaries.
+    """
+    # Now, go build up a dictionary of booleans, indexed by position,
+    # indicating whether or not a given position is masked or not.
+    # Also, strip out any '|' chars, adjusting the mask as necessary,
+    # marking the appropriate positions for field boundaries:
+    ismasked = {}
+    explicit_field_boundaries = []
+    s = list(s)
+    i = 0
+    while i < len(s):
+        if s[i] == '\\':            # if escaped character:
+            ismasked[i] = False     #     mark position as not a mask char
+            if i+1 < len(s):        #     if another char follows...
+                del s[i]            #         elide the '\'
+                if s[i] == '\\':    #         if next char also a '\', char is a literal '\'
+                    del s[i]        #             elide the 2nd '\' as well
+            i += 1                  # increment to next char
+        elif s[i] == '|':
+            del s[i]                    #         elide the '|'
+            explicit_field_boundaries.append(i)
+                                        # keep index where it is:
+        else:                       # else if special char, mark position accordingly
+            ismasked[i] = s[i] in maskchars
+            i += 1                      # increment to next char
+    return ''.join(s), ismasked, tuple(explicit_field_boundaries)
+
+
+def _newField(**kwargs):
+    """
+    Returns a new Field; fields with the same parameters are copied from a
+    cached prototype instead of being validated again.
+    """
+    try:
+        key = tuple(sorted(kwargs.items()))
+        hash(key)
+    except TypeError:
+        return Field(**kwargs)
+    prototype = _fieldPrototypes.get(key)
+    if prototype is None:
+        prototype = Field(**kwargs)
+        with _cacheLock:
+            if len(_fieldPrototypes) >= _MASK_CACHE_SIZE:
+                _fieldPrototypes.clear()
+            _fieldPrototypes[key] = prototype
+    return prototype._Copy()
+
+
+## ---------- ---------- ---------- ---------- ---------- ---------- ----------
+## Prefix index of choice lists (SIRA).
+##
+## Auto-complete used to look a typed value up with "in" and .index(), then
+## scan the choices one by one for those it is a prefix of, on every key.
+## The compare strings of a choice list are now kept in a ChoiceList, which
+## keeps them in sorted order as well, so the choices starting with a value
+## are found by bisection.
+
+def _listMutator(name):
+    method = getattr(list, name)
+
+    def mutator(self, *args):
+        self._index = None
+        return method(self, *args)
+
+    mutator.__name__ = name
+    mutator.__doc__ = method.__doc__
+    return mutator
+
+
+class ChoiceList(list):
+    """
+    List of the compare strings of a choice list (see Field._compareChoices),
+    with an index used by auto-complete.  The index is built when first
+    needed and dropped whenever the list changes.
+    """
+    def __init__(self, *args):
+        list.__init__(self, *args)
+        self._index = None
+
+    def _getIndex(self):
+        """
+        Returns ({choice: first position}, sorted choices, their positions).
+        """
+        index = self._index
+        if index is None:
+            first = {}
+            for position, choice in enumerate(self):
+                first.setdefault(choice, position)
+            ordered = sorted((choice, position) for position, choice in enumerate(self))
+            index = (first, [item[0] for item in ordered], [item[1] for item in ordered])
+            self._index = index
+        return index
+
+    def __contains__(self, value):
+        return value in self._getIndex()[0]
+
+    def firstIndex(self, value):
+        """Returns the first position of value in the list, or None."""
+        return self._getIndex()[0].get(value)
+
+    def prefixMatches(self, prefix):
+        """Returns the positions of the choices starting with prefix, in sorted order of the choices."""
+        first, keys, positions = self._getIndex()
+        start = end = bisect.bisect_left(keys, prefix)
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+        return positions[start:end]
+
+    def copy(self):
+        return ChoiceList(self)
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse',
+              '__setitem__', '__delitem__', '__iadd__', '__imul__'):
+    setattr(ChoiceList, _name, _listMutator(_name))
+del _name
+
+
 class Field:
     """
     This class manages the individual fields in a masked edit control.
@@ -1371,6 +1538,19 @@ class Field:
 ####        dbg(indent=0)
 
 
+    def _Copy(self):
+        """
+        Returns an independent copy of this field (SIRA: see _newField).
+        """
+        field = Field.__new__(Field)
+        state = field.__dict__
+        state.update(self.__dict__)
+        for key, value in self.__dict__.items():
+            if isinstance(value, (list, dict)):
+                state[key] = value.copy()
+        return field
+
+
     def _SetParameters(self, **kwargs):
         """
         This function can be used to set individual or multiple parameters for
@@ -1460,10 +1640,10 @@ class Field:
         # Now go do validation, semantic and inter-dependency parameter processing:
         if 'choices' in kwargs or 'compareNoCase' in kwargs or 'choiceRequired' in kwargs: # (set/changed)
 
-            self._compareChoices = [choice.strip() for choice in self._choices]
+            self._compareChoices = ChoiceList(choice.strip() for choice in self._choices)
 
             if self._compareNoCase and self._choices:
-                self._compareChoices = [item.lower() for item in self._compareChoices]
+                self._compareChoices = ChoiceList(item.lower() for item in self._compareChoices)
 
             if 'choices' in kwargs:
                 self._autoCompleteIndex = -1
@@ -1852,7 +2032,7 @@ class MaskedEditMixin:
                 kwargs[key] = copy.copy(value)
 
         # Create a "field" that holds global parameters for control constraints
-        self._ctrl_constraints = self._fields[-1] = Field(index=-1)
+        self._ctrl_constraints = self._fields[-1] = _newField(index=-1)
         self.SetCtrlParameters(**kwargs)
 
 
@@ -2275,16 +2455,7 @@ class MaskedEditMixin:
         a mask character or not.
         """
 ##        dbg('_processMask: mask', mask, indent=1)
-        # regular expression for parsing c{n} syntax:
-        rex = re.compile('([' + "".join(maskchars) + r'])\{(\d+)\}')
-        s = mask
-        match = rex.search(s)
-        while match:    # found an(other) occurrence
-            maskchr = s[match.start(1):match.end(1)]            # char to be repeated
-            repcount = int(s[match.start(2):match.end(2)])      # the number of times
-            replacement = "".join( maskchr * repcount)  # the resulting substr
-            s = s[:match.start(1)] + replacement + s[match.end(2)+1:]   #account for trailing '}'
-            match = rex.search(s)                               # look for another such entry in mask
+        s = _cached(("expand", mask), lambda: _expandMask(mask))
 
         self._decimalChar = self._ctrl_constraints._decimalChar
         self._shiftDecimalChar = self._ctrl_constraints._shiftDecimalChar
@@ -2309,35 +2480,8 @@ class MaskedEditMixin:
                 self._ctrl_constraints._defaultValue += ' '
 
 
-        # Now, go build up a dictionary of booleans, indexed by position,
-        # indicating whether or not a given position is masked or not.
-        # Also, strip out any '|' chars, adjusting the mask as necessary,
-        # marking the appropriate positions for field boundaries:
-        ismasked = {}
-        explicit_field_boundaries = []
-        s = list(s)
-        i = 0
-        while i < len(s):
-            if s[i] == '\\':            # if escaped character:
-                ismasked[i] = False     #     mark position as not a mask char
-                if i+1 < len(s):        #     if another char follows...
-                    del s[i]            #         elide the '\'
-                    if s[i] == '\\':    #         if next char also a '\', char is a literal '\'
-                        del s[i]        #             elide the 2nd '\' as well
-                i += 1                  # increment to next char
-            elif s[i] == '|':
-                del s[i]                    #         elide the '|'
-                explicit_field_boundaries.append(i)
-                                            # keep index where it is:
-            else:                       # else if special char, mark position accordingly
-                ismasked[i] = s[i] in maskchars
-####                dbg('ismasked[%d]:' % i, ismasked[i], ''.join(s))
-                i += 1                      # increment to next char
-####        dbg('ismasked:', ismasked)
-        s = ''.join(s)
-##        dbg('new mask: "%s"' % s, indent=0)
-
-        return s, ismasked, explicit_field_boundaries
+        # Mask without escapes, positions of mask chars and field boundaries; shared read-only:
+        return _cached(("parse", s), lambda: _parseMask(s))
 
 
     def _calcFieldExtents(self):
@@ -2350,9 +2494,8 @@ class MaskedEditMixin:
         if self._mask:
 
             ## Create dictionary of positions,characters in mask
-            self.maskdict = {}
-            for charnum in range( len( self._mask)):
-                self.maskdict[charnum] = self._mask[charnum:charnum+1]
+            mask = self._mask
+            self.maskdict = _cached(("maskdict", mask), lambda: {charnum: mask[charnum:charnum+1] for charnum in range(len(mask))})
 
             # For the current mask, create an ordered list of field extents
             # and a dictionary of positions that map to field indices:
@@ -2409,53 +2552,25 @@ class MaskedEditMixin:
                 for i in range(len(self._mask)+1):
                     self._lookupField[i] = 0
             else:
-                # generic control; parse mask to figure out where the fields are:
-                field_index = 0
-                pos = 0
-                i = self._findNextEntry(pos,adjustInsert=False)  # go to 1st entry point:
-                if i < len(self._mask):   # no editable chars!
-                    for j in range(pos, i+1):
-                        self._lookupField[j] = field_index
-                    pos = i       # figure out field for 1st editable space:
-
-                while i <= len(self._mask):
-####                    dbg('searching: outer field loop: i = ', i)
-                    if self._isMaskChar(i):
-####                        dbg('1st char is mask char; recording edit_start=', i)
-                        edit_start = i
-                        # Skip to end of editable part of current field:
-                        while i < len(self._mask) and self._isMaskChar(i):
-                            self._lookupField[i] = field_index
-                            i += 1
-                            if i in self._explicit_field_boundaries:
-                                break
-####                        dbg('edit_end =', i)
-                        edit_end = i
-                        self._lookupField[i] = field_index
-####                        dbg('%d in self._fields?' % field_index, field_index in self._fields)
-                        if field_index not in self._fields:
-                            kwargs = Field.valid_params.copy()
-                            kwargs['index'] = field_index
-                            kwargs['extent'] = (edit_start, edit_end)
-                            kwargs['mask'] = self._mask[edit_start:edit_end]
-                            self._fields[field_index] = Field(**kwargs)
-                        else:
-                            self._fields[field_index]._SetParameters(
-                                                                index=field_index,
-                                                                extent=(edit_start, edit_end),
-                                                                mask=self._mask[edit_start:edit_end],
-                            )
-                    pos = i
-                    i = self._findNextEntry(pos, adjustInsert=False)  # go to next field:
-####                    dbg('next entry:', i)
-                    if i > pos:
-                        for j in range(pos, i+1):
-                            self._lookupField[j] = field_index
-                    if i >= len(self._mask):
-                        break           # if past end, we're done
+                # generic control; parse mask to figure out where the fields are
+                # (SIRA: the layout only depends on the mask, so it is cached):
+                self._lookupField, extents = _cached(
+                    ("layout", self._mask, tuple(self._ismasked.values()), self._explicit_field_boundaries),
+                    self._calcFieldLayout,
+                )
+                for field_index, edit_start, edit_end in extents:
+                    if field_index not in self._fields:
+                        self._fields[field_index] = _newField(
+                            index=field_index,
+                            extent=(edit_start, edit_end),
+                            mask=self._mask[edit_start:edit_end],
+                        )
                     else:
-                        field_index += 1
-####                        dbg('next field:', field_index)
+                        self._fields[field_index]._SetParameters(
+                                                            index=field_index,
+                                                            extent=(edit_start, edit_end),
+                                                            mask=self._mask[edit_start:edit_end],
+                        )
 
         indices = sorted(self._fields)
 
@@ -2474,6 +2589,46 @@ class MaskedEditMixin:
 
 
 
+    def _calcFieldLayout(self):
+        """
+        Subroutine for _calcFieldExtents: finds the fields of a generic mask.
+        Returns the dictionary mapping each position to its field index and the
+        list of (field index, edit start, edit end) of the fields.
+        """
+        lookupField = {}
+        extents = []
+        field_index = 0
+        pos = 0
+        i = self._findNextEntry(pos,adjustInsert=False)  # go to 1st entry point:
+        if i < len(self._mask):   # no editable chars!
+            for j in range(pos, i+1):
+                lookupField[j] = field_index
+            pos = i       # figure out field for 1st editable space:
+
+        while i <= len(self._mask):
+            if self._isMaskChar(i):
+                edit_start = i
+                # Skip to end of editable part of current field:
+                while i < len(self._mask) and self._isMaskChar(i):
+                    lookupField[i] = field_index
+                    i += 1
+                    if i in self._explicit_field_boundaries:
+                        break
+                edit_end = i
+                lookupField[i] = field_index
+                extents.append((field_index, edit_start, edit_end))
+            pos = i
+            i = self._findNextEntry(pos, adjustInsert=False)  # go to next field:
+            if i > pos:
+                for j in range(pos, i+1):
+                    lookupField[j] = field_index
+            if i >= len(self._mask):
+                break           # if past end, we're done
+            else:
+                field_index += 1
+        return lookupField, extents
+
+
     def _calcTemplate(self, reset_fillchar, reset_default):
         """
         Subroutine for processing current fillchars and default values for
@@ -4255,24 +4410,29 @@ class MaskedEditMixin:
         If no match found, it will return None.
         The function returns a 2-tuple, with the 2nd element being a boolean
         that indicates if partial match was necessary.
+        (SIRA: the choices are looked up in the index of a ChoiceList.)
         """
 ##        dbg('autoComplete(direction=', direction, 'choices=',choices, 'value=',value,'compareNoCase?', compareNoCase, 'current_index:', current_index, indent=1)
         if value is None:
 ##            dbg('nothing to match against', indent=0)
             return (None, False)
 
+        if not isinstance(choices, ChoiceList):
+            choices = ChoiceList(choices)
+
         partial_match = False
 
         if compareNoCase:
             value = value.lower()
 
         last_index = len(choices) - 1
-        if value in choices:
+        exact_index = choices.firstIndex(value)
+        if exact_index is not None:
 ##            dbg('"%s" in', choices)
             if current_index is not None and choices[current_index] == value:
                 index = current_index
             else:
-                index = choices.index(value)
+                index = exact_index
 
 ##            dbg('matched "%s" (%d)' % (choices[index], index))
             if direction == -1:
@@ -4289,28 +4449,20 @@ class MaskedEditMixin:
             value = value.strip()
 ##            dbg('no match; try to auto-complete:')
             match = None
-##            dbg('searching for "%s"' % value)
-            if current_index is None:
-                indices = range(len(choices))
-                if direction == -1:
-                    indices.reverse()
-            else:
-                if direction == 1:
-                    indices = range(current_index +1, len(choices)) + range(current_index+1)
-##                    dbg('range(current_index+1 (%d), len(choices) (%d)) + range(%d):' % (current_index+1, len(choices), current_index+1), indices)
+            if choices:
+                # The search goes around the list from the position after the
+                # current one (from an end of the list when there is none), in
+                # the given direction; the first choice found starting with the
+                # value is the match.
+                if current_index is None or current_index < 0:
+                    start = 0 if direction == 1 else last_index
                 else:
-                    indices = range(current_index-1, -1, -1) + range(len(choices)-1, current_index-1, -1)
-##                    dbg('range(current_index-1 (%d), -1) + range(len(choices)-1 (%d)), current_index-1 (%d):' % (current_index-1, len(choices)-1, current_index-1), indices)
-####            dbg('indices:', indices)
-            for index in indices:
-                choice = choices[index]
-                if choice.find(value, 0) == 0:
-##                    dbg('match found:', choice)
-                    match = index
-                    break
-                else:
-##                    dbg('choice: "%s" - no match' % choice)
-                    pass
+                    start = (current_index + direction) % len(choices)
+                distance = None
+                for index in choices.prefixMatches(value):
+                    steps = (index - start) * direction % len(choices)
+                    if distance is None or steps < distance:
+                        match, distance = index, steps
             if match is not None:
 ##                dbg('matched', match)
                 pass
@@ -23,7 +23,7 @@ function.  See maskededit module overview for how to configure the control.
 """
 
 import  wx
-from wx.lib.masked import *
+from .maskededit import *
 
 # jmg 12/9/03 - when we cut ties with Py 2.2 and earlier, this would
 # be a good place to implement the 2.3 logger class
@@ -0,0 +1,95 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Imports of the libraries shipped in lib/ (32-bit NVDA) and lib64/ (64-bit NVDA).
+
+Instead of adding the folder to sys.path, which would put it ahead of every
+module search made by NVDA and the other add-ons, a finder placed at the end of
+sys.meta_path answers for the VENDORED_MODULES only. They are found there when
+nothing else provides them, so they never shadow a module of NVDA, and are
+loaded when first imported. Submodules ("masked.textctrl") are found through
+the __path__ of their package as usual.
+"""
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import threading
+
+from .varsConfig import ADDON_PATH, IS64
+
+# Top-level names served from the lib folder. sqlite311 is the SQLite driver of the
+# 32-bit folder and sqlite3 the one of lib64; tools is used by the 32-bit masked package.
+VENDORED_MODULES = ("csv", "masked", "maskedTextCtrl", "sqlite311", "sqlite3", "tools")
+
+LIB_PATH = os.path.join(ADDON_PATH, "lib64" if IS64 else "lib")
+
+
+class VendoredFinder(object):
+	"""Meta path finder for the VENDORED_MODULES of a folder."""
+
+	def __init__(self, path, names):
+		super().__init__()
+		self.path = path
+		self.names = frozenset(names)
+		# {name: (origin, submodule search locations) or None when absent}
+		self._locations = {}
+		self._lock = threading.Lock()
+
+	def _location(self, name):
+		with self._lock:
+			if name not in self._locations:
+				spec = importlib.machinery.PathFinder.find_spec(name, [self.path])
+				self._locations[name] = (
+					None if spec is None else (spec.origin, spec.submodule_search_locations)
+				)
+			return self._locations[name]
+
+	def find_spec(self, fullname, path=None, target=None):
+		# Only top-level imports; submodules are looked up in their package's __path__
+		if path is not None or fullname not in self.names:
+			return None
+		location = self._location(fullname)
+		if location is None:
+			return None
+		origin, locations = location
+		# A new spec per import, so a module removed from sys.modules can be loaded again
+		return importlib.util.spec_from_file_location(fullname, origin, submodule_search_locations=locations)
+
+	def invalidate_caches(self):
+		with self._lock:
+			self._locations.clear()
+
+
+_finder = None
+
+
+def installVendoredFinder():
+	"""Makes the libraries of lib/ importable; calling it again does nothing."""
+	global _finder
+	if _finder is None:
+		_finder = VendoredFinder(LIB_PATH, VENDORED_MODULES)
+	if _finder not in sys.meta_path:
+		sys.meta_path.append(_finder)
+
+
+def removeVendoredFinder():
+	"""Removes the finder when the add-on is unloaded (modules already imported stay)."""
+	if _finder in sys.meta_path:
+		sys.meta_path.remove(_finder)
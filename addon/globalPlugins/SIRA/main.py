@@ -18,6 +18,8 @@ Created on: 30/11/2022.
 """
 
 import os
+import threading
+import time
 
 import addonHandler
 import config
@@ -25,15 +27,36 @@ import gui
 import ui
 import wx
 from gui import guiHelper
+from logHandler import log
 
 from . import controller as core
+from . import usage
 from .addEditRecord import AddEditRecDialog
+from .backup import createSnapshot
+from .contactList import ListRowSource, PagedRowSource, VirtualContactList
+from .dialogLifecycle import closeDialog
+from .model import getActiveDatabasePath, isFederatedEnabled
+from .profiler import profilePhase, writeProfile
+from .search import IncrementalSearch, sortedRowSource
+from .suggestions import suggestCorrection
 from .varsConfig import ADDON_NAME
 from .manageDuplicatesDialog import ManageDuplicatesDialog
 
 # Initializes the translation
 addonHandler.initTranslation()
 
+# Pages read in the background right after the first one
+PREFETCH_PAGES = 2
+
+# "Loading" is only announced when the first rows take longer than this (ms)
+LOADING_ANNOUNCE_DELAY = 300
+
+# Pause in typing after which the search field is searched (ms)
+SEARCH_DEBOUNCE = 250
+
+# Columns of the contact list that can be sorted, by position
+SORT_COLUMNS = ("secretaryOffice", "landline", "sector", "responsible", "extension", "cell", "email")
+
 
 class SIRA(wx.Dialog):
 	_instance = None
@@ -51,15 +74,11 @@ class SIRA(wx.Dialog):
 
 		# Title of Extension Registration System dialog.
 		self.title = title
+		openedAt = time.perf_counter()
 
 		WIDTH = 800
 		HEIGHT = 400
 
-		try:
-			self.contactResults = core.getAllRecords()
-		except EOFError:
-			self.contactResults = []
-
 		super(SIRA, self).__init__(
 			parent,
 			title=title,
@@ -71,10 +90,17 @@ class SIRA(wx.Dialog):
 
 		# Creating the screen objects.
 		panel = wx.Panel(self)
-		self.contactList = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.SUNKEN_BORDER)
+		self.contactList = VirtualContactList(panel, self.columnValues)
 		self._create_columns()
 		self.contactList.Bind(wx.EVT_CHAR_HOOK, self.whenPressingLetters)
-		self._itemMap = {}
+		self.contactList.Bind(wx.EVT_LIST_COL_CLICK, self.onColumnClick)
+
+		# The rows are read in a background thread (see loadRecords)
+		self._loadGeneration = 0
+		self._loading = False
+		# (column, ascending) chosen by the user; None is the list order
+		self.sort = None
+		self.rowSource = ListRowSource([])
 		self.initialize_contact_list()
 		self.contactList.SetFocus()
 
@@ -96,11 +122,20 @@ class SIRA(wx.Dialog):
 			_("Extension"),
 			_("Cell phone"),
 			_("Email"),
+			_("All fields"),
+			_("Sector (sounds like)"),
+			_("Responsible (sounds like)"),
 		]
 		self.comboboxOptions = wx.ComboBox(panel, value=_("Secretary office"), choices=listOfOptions)
 
 		self.search = wx.SearchCtrl(panel, -1, size=(250, 25))
+		self.liveSearch = IncrementalSearch()
+		self._searchTimer = None
+		self._searchStartedAt = 0.0
 		self.buttonSearch = wx.Button(panel, label=_("&Search"))
+		self.buttonFrequent = wx.Button(panel, label=_("Fre&quent contacts"))
+		# Record whose lookup was already counted since it was selected
+		self._countedRecord = None
 
 		# Selection event
 		self.contactList.Bind(wx.EVT_LIST_ITEM_SELECTED, self.onSelectLine)
@@ -112,6 +147,7 @@ class SIRA(wx.Dialog):
 		self.buttonSaveResearch = wx.Button(panel, wx.ID_SAVE, label=_("&Save the research"))
 		self.buttonRefresh = wx.Button(panel, -1, label=_("Refres&h"))
 		self.buttonImport = wx.Button(panel, -1, label=_("&Import csv..."))
+		self.buttonMerge = wx.Button(panel, -1, label=_("Mer&ge database..."))
 		self.buttonExport = wx.Button(panel, -1, label=_("E&xport csv..."))
 		self.buttonResetRecords = wx.Button(panel, -1, label=_("&Delete all records."))
 		self.buttonExit = wx.Button(panel, wx.ID_CANCEL, label=_("Exi&t"))
@@ -128,6 +164,7 @@ class SIRA(wx.Dialog):
 		searchSizer.Add(self.comboboxOptions, 0, wx.ALL, 5)
 		searchSizer.Add(self.search, 1, wx.ALL, 5)
 		searchSizer.Add(self.buttonSearch, 0, wx.ALL, 5)
+		searchSizer.Add(self.buttonFrequent, 0, wx.ALL, 5)
 
 		buttonSizer.Add(self.buttonEdit, 0, wx.ALL | wx.EXPAND, 5)
 		buttonSizer.Add(self.buttonDelete, 0, wx.ALL | wx.EXPAND, 5)
@@ -135,6 +172,7 @@ class SIRA(wx.Dialog):
 		buttonSizer.Add(self.buttonSaveResearch, 0, wx.ALL | wx.EXPAND, 5)
 		buttonSizer.Add(self.buttonRefresh, 0, wx.ALL | wx.EXPAND, 5)
 		buttonSizer.Add(self.buttonImport, 0, wx.ALL | wx.EXPAND, 5)
+		buttonSizer.Add(self.buttonMerge, 0, wx.ALL | wx.EXPAND, 5)
 		buttonSizer.Add(self.buttonExport, 0, wx.ALL | wx.EXPAND, 5)
 		buttonSizer.Add(self.buttonResetRecords, 0, wx.ALL | wx.EXPAND, 5)
 		buttonSizer.Add(self.buttonExit, 0, wx.ALL | wx.EXPAND, 5)
@@ -148,6 +186,10 @@ class SIRA(wx.Dialog):
 
 		# Binding events to buttons.
 		self.buttonSearch.Bind(wx.EVT_BUTTON, self.onSearch, self.buttonSearch)
+		self.buttonFrequent.Bind(wx.EVT_BUTTON, self.onFrequent, self.buttonFrequent)
+		self.search.Bind(wx.EVT_TEXT, self.onSearchText)
+		self.search.Bind(wx.EVT_SET_FOCUS, self.onSearchFocus)
+		self.comboboxOptions.Bind(wx.EVT_COMBOBOX, self.onSearchText)
 		self.buttonEdit.Bind(wx.EVT_BUTTON, self.onEdit, self.buttonEdit)
 		self.buttonNew.Bind(wx.EVT_BUTTON, self.onNew, self.buttonNew)
 		self.buttonDelete.Bind(wx.EVT_BUTTON, self.onDelete, self.buttonDelete)
@@ -155,10 +197,14 @@ class SIRA(wx.Dialog):
 		self.buttonSaveResearch.Bind(wx.EVT_BUTTON, self.onSaveResearchResults, self.buttonSaveResearch)
 		self.buttonRefresh.Bind(wx.EVT_BUTTON, self.onToUpdate, self.buttonRefresh)
 		self.buttonImport.Bind(wx.EVT_BUTTON, self.onToImport, self.buttonImport)
+		self.buttonMerge.Bind(wx.EVT_BUTTON, self.onMerge, self.buttonMerge)
 		self.buttonExport.Bind(wx.EVT_BUTTON, self.onToExport, self.buttonExport)
 		self.buttonResetRecords.Bind(wx.EVT_BUTTON, self.onReset, self.buttonResetRecords)
 		self.buttonExit.Bind(wx.EVT_BUTTON, self.onClose, self.buttonExit)
 
+		self.loadRecords(openedAt)
+		threading.Thread(target=self._loadFrequent, name="SIRAFrequentContacts", daemon=True).start()
+
 	def _create_columns(self):
 		columns = [
 			(_("Secretary office"), 150),
@@ -170,44 +216,140 @@ class SIRA(wx.Dialog):
 			(_("Email"), 300),
 		]
 
+		# In a federated search each row shows the database it came from
+		self.showSource = isFederatedEnabled()
+		if self.showSource:
+			columns.append((_("Database"), 100))
+
 		for i, (label, width) in enumerate(columns):
 			self.contactList.InsertColumn(i, label)
 			self.contactList.SetColumnWidth(i, width)
 
-	def initialize_contact_list(self):
-		self.contactList.DeleteAllItems()
+	def allRecordsSource(self):
+		"""Returns a paged row source over every record of the database, in the order chosen."""
+		sort = self.sort
+		return PagedRowSource(
+			lambda offset, limit: core.getRecordsPage(offset, limit, sort),
+			core.countRecords(allDatabases=True) or 0,
+			lambda: core.getAllRecords(sort),
+			lambda record: core.getRecordPosition(record, sort),
+		)
 
-		self._itemMap = {}
+	def loadRecords(self, startedAt=None):
+		"""
+		Reads all records in a background thread and shows them when ready.
 
-		for record in self.contactResults:
-			index = self.contactList.InsertItem(
-				self.contactList.GetItemCount(),
-				record.secretaryOffice,
-			)
+		The row count and the first page are read first and shown at once; the
+		next pages are read ahead afterwards. Loads started earlier are dropped.
 
-			record_values = (
-				record.landline,
-				record.sector,
-				record.responsible,
-				record.extension,
-				record.cell,
-				record.email,
-			)
+		Args:
+			startedAt (float, optional): time.perf_counter() value the latency is measured from.
+		"""
+		if startedAt is None:
+			startedAt = time.perf_counter()
+		self._loadGeneration += 1
+		self._loading = True
+		generation = self._loadGeneration
+		wx.CallLater(LOADING_ANNOUNCE_DELAY, self._announceLoading, generation)
+		threading.Thread(
+			target=self._loadInBackground,
+			args=(generation, startedAt),
+			name="SIRALoadContacts",
+			daemon=True,
+		).start()
+
+	def _cancelLoad(self):
+		"""Drops any background load still running, so it won't replace the rows shown."""
+		self._loadGeneration += 1
+		self._loading = False
+
+	def _isCurrentLoad(self, generation):
+		# The dialog may have been closed while the thread was reading
+		return bool(self) and generation == self._loadGeneration
+
+	def _announceLoading(self, generation):
+		if self._isCurrentLoad(generation) and self._loading:
+			ui.message(_("Loading contacts..."))
+
+	def _loadInBackground(self, generation, startedAt):
+		try:
+			source = self.allRecordsSource()
+			firstPage = source.fetchPage(0, source.pageSize)
+		except Exception as e:
+			log.error(f"Error loading contacts: {e}", exc_info=True)
+			wx.CallAfter(self._onLoadFailed, generation)
+			return
+		wx.CallAfter(self._onFirstPage, generation, source, firstPage, startedAt)
+
+		lastPage = (source.count() - 1) // source.pageSize
+		for pageNumber in range(1, min(PREFETCH_PAGES, lastPage) + 1):
+			try:
+				page = source.fetchPage(pageNumber * source.pageSize, source.pageSize)
+			except Exception as e:
+				# The list reads the page itself when it is shown
+				log.debug(f"Contacts read-ahead stopped: {e}")
+				return
+			wx.CallAfter(self._onPage, generation, source, pageNumber, page)
+
+	def _onFirstPage(self, generation, source, firstPage, startedAt):
+		if not self._isCurrentLoad(generation):
+			return
+		self._loading = False
+		source.setPage(0, firstPage)
+		self.rowSource = source
+		self.initialize_contact_list()
+		log.info(
+			f"{source.count()} contacts listed, first row shown "
+			f"{(time.perf_counter() - startedAt) * 1000:.0f} ms after the request",
+		)
+
+	def _onPage(self, generation, source, pageNumber, page):
+		if self._isCurrentLoad(generation):
+			source.setPage(pageNumber, page)
+
+	def _onLoadFailed(self, generation):
+		if not self._isCurrentLoad(generation):
+			return
+		self._loading = False
+		ui.message(_("Unable to load the contacts."))
+
+	def columnValues(self, record):
+		"""Returns the texts shown in the list columns for a record."""
+		values = (
+			record.secretaryOffice,
+			record.landline,
+			record.sector,
+			record.responsible,
+			record.extension,
+			record.cell,
+			record.email,
+		)
+		if self.showSource:
+			values += (self.sourceLabel(record.source),)
+		return values
 
-			for colIndex, value in enumerate(record_values, start=1):
-				self.contactList.SetItem(index, colIndex, value)
+	def initialize_contact_list(self):
+		self.contactList.setSource(self.rowSource)
 
-			self._itemMap[index] = record
+	def sourceLabel(self, source):
+		"""Returns the display name of the database a record came from."""
+		labels = {
+			"primary": _("Primary"),
+			"alternate": _("Alternate"),
+		}
+		return labels.get(source, "")
 
 	def onNew(self, event):
 		"""Add a new record to the agenda."""
-		dlg = AddEditRecDialog(gui.mainFrame)
+		with profilePhase("AddEditRecDialog dialog"):
+			dlg = AddEditRecDialog(gui.mainFrame, onSaved=self.onRecordAdded)
+		writeProfile()
 		gui.mainFrame.prePopup
 		dlg.CentreOnScreen()
 		dlg.ShowModal()
 		dlg.Destroy()
 		gui.mainFrame.postPopup
-		self._refresh_and_focus()
+		self.contactList.SetFocus()
 
 	def onEdit(self, event):
 		"""Edit a selected record."""
@@ -215,18 +357,42 @@ class SIRA(wx.Dialog):
 		if selectedRow is None:
 			self.showMessage(_("No records selected!"), _("Error"))
 			return
-		dlg = AddEditRecDialog(
-			gui.mainFrame,
-			selectedRow,
-			title=_("To edit"),
-			addRecord=False,
-		)
+		index = self.contactList.GetFirstSelected()
+		with profilePhase("AddEditRecDialog dialog"):
+			dlg = AddEditRecDialog(
+				gui.mainFrame,
+				selectedRow,
+				title=_("To edit"),
+				addRecord=False,
+				onSaved=lambda record: self.onRecordEdited(index, record),
+			)
+		writeProfile()
 		gui.mainFrame.prePopup
 		dlg.CentreOnScreen()
 		dlg.ShowModal()
 		dlg.Destroy()
 		gui.mainFrame.postPopup
-		self._refresh_and_focus()
+		self.contactList.SetFocus()
+
+	def onRecordAdded(self, record):
+		"""Shows a record added in the edit dialog at its place, without reloading the list."""
+		if self._loading or record is None:
+			self.loadRecords()
+			return
+		self.contactList.insertRecord(record)
+
+	def onRecordEdited(self, index, record):
+		"""Shows the new content of an edited record, without reloading the list."""
+		if self._loading:
+			self.loadRecords()
+			return
+		if record is None:
+			# Removed by someone else in the meantime
+			self.contactList.removeRecord(index)
+		else:
+			self.contactList.updateRecord(index, record)
+			usage.recordChanged(record)
+		self.onSelectLine(None)
 
 	def onDelete(self, event):
 		"""
@@ -243,15 +409,24 @@ class SIRA(wx.Dialog):
 		message = _("Do you want to delete the selected record?")
 		caption = _("Attention")
 
+		index = self.contactList.GetFirstSelected()
 		user_response = gui.messageBox(message, caption, style=wx.ICON_QUESTION | wx.YES_NO)
 		if user_response == wx.YES:
 			try:
-				core.delete(selectedRow.id)
-				self.showMessage(_("Record deleted!"), _("Success"))
-				self._refresh_and_focus()
+				deleted = core.delete(selectedRow.id, source=selectedRow.source)
 			except Exception as e:
 				self.showMessage(_("Error deleting record: {}").format(str(e)), _("Error"))
 				return
+			if not deleted:
+				self.showMessage(_("Unable to delete the record. Check the logs."), _("Error"))
+				return
+			usage.recordRemoved(selectedRow)
+			if self._loading:
+				self.loadRecords()
+			else:
+				self.contactList.removeRecord(index)
+				self.onSelectLine(None)
+			self.showMessage(_("Record deleted!"), _("Success"))
 		self.contactList.SetFocus()
 
 	def onSearch(self, event):
@@ -265,29 +440,156 @@ class SIRA(wx.Dialog):
 			self.search.SetFocus()
 			return
 
+		# A search typed earlier must not replace these results
+		self._stopLiveSearch()
+
 		# Try to search based on filter and keyword option
 		try:
-			# Call the search function in the core module, passing the filter and keyword option
-			self.contactResults = core.searchRecords(filterChoice, keyword)
+			# Call the search function, reusing the results of the search-as-you-type when possible
+			results = self.liveSearch.run(filterChoice, keyword, self.sort)
 
 			# Check if there were any results returned by the search
-			if not self.contactResults:
-				# If there are no results, displays an informative message
-				self.showMessage(_("No contacts found matching the search criteria."))
-				self.search.SetFocus()
+			if not results.count():
+				# If there are no results, look for a misspelled word before telling the user
+				self._offerCorrection(filterChoice, keyword)
 			else:
 				# Otherwise, update the contact list in the graphical interface
+				self._cancelLoad()
+				self.rowSource = results
 				self.initialize_contact_list()
 
-				# Clear the search field after searching
-				self.search.Clear()
+				# Clear the search field after searching (without searching again)
+				self.search.ChangeValue("")
 
 				# Sets focus back to the contact list for easier navigation
 				self.contactList.SetFocus()
+				notice = self._indexNotice(filterChoice, keyword)
+				if notice:
+					ui.message(notice)
 		except Exception as e:
 			# Display an error message if an exception occurs during the search
 			self.showMessage("{}".format(e))
 
+	def _indexNotice(self, filterChoice, keyword):
+		"""Returns the notice of a search whose results may miss contacts not indexed yet, or ""."""
+		if not self.liveSearch.isIndexBehind(filterChoice, keyword):
+			return ""
+		return _("The search index is still being updated; recent changes may be missing.")
+
+	def _offerCorrection(self, filterChoice, keyword):
+		"""Looks for a corrected spelling of a search that found nothing, in the background."""
+		# A contact just added may only be missing because it is not indexed yet
+		notice = self._indexNotice(filterChoice, keyword)
+
+		def run():
+			try:
+				correction = suggestCorrection(core.searchColumn(filterChoice), keyword)
+			except Exception as e:
+				log.debug(f"No spelling suggestion for {keyword!r}: {e}")
+				correction = None
+			wx.CallAfter(self._onCorrection, correction, notice)
+
+		threading.Thread(target=run, name="SIRASuggest", daemon=True).start()
+
+	def _onCorrection(self, correction, notice=""):
+		if not self:
+			return
+		if correction is None:
+			message = _("No contacts found matching the search criteria.")
+			self.showMessage(f"{message} {notice}" if notice else message)
+			self.search.SetFocus()
+			return
+		message = _("No contacts found matching the search criteria. Did you mean {correction}?").format(
+			correction=correction,
+		)
+		user_response = gui.messageBox(message, _("Attention"), style=wx.ICON_QUESTION | wx.YES_NO)
+		if user_response == wx.YES:
+			# Search again with the correction, as if it had been typed
+			self.search.ChangeValue(correction)
+			self.onSearch(None)
+		else:
+			self.search.SetFocus()
+
+	def _loadFrequent(self):
+		try:
+			usage.loadFrequent(core.getRecordsByKeys)
+		except Exception as e:
+			log.warning(f"Frequent contacts not loaded: {e}")
+
+	def onFrequent(self, event):
+		"""Shows the contacts looked up most often, most used first."""
+		records = usage.frequentContacts()
+		if records is None:
+			# Still being read in the background; it is a single small query
+			self._loadFrequent()
+			records = usage.frequentContacts() or []
+		if not records:
+			self.showMessage(_("No contact has been looked up yet."))
+			return
+		self._stopLiveSearch()
+		self._cancelLoad()
+		self.rowSource = sortedRowSource(ListRowSource(records, ordered=False), self.sort)
+		self.initialize_contact_list()
+		self.contactList.SetFocus()
+		ui.message(_("{count} frequent contacts").format(count=len(records)))
+
+	def onSearchFocus(self, event):
+		"""Reads the searched column ahead, so the first keystroke is answered quickly."""
+		event.Skip()
+		if config.conf.get(ADDON_NAME, {}).get("liveSearch", True):
+			self.liveSearch.prepare(self.comboboxOptions.GetValue())
+
+	def onSearchText(self, event):
+		"""Searches once the user pauses typing in the search field."""
+		event.Skip()
+		if not config.conf.get(ADDON_NAME, {}).get("liveSearch", True):
+			return
+		if self._searchTimer is not None:
+			self._searchTimer.Stop()
+		self._searchStartedAt = time.perf_counter()
+		self._searchTimer = wx.CallLater(SEARCH_DEBOUNCE, self._runLiveSearch)
+
+	def _stopLiveSearch(self):
+		if self._searchTimer is not None:
+			self._searchTimer.Stop()
+			self._searchTimer = None
+		self.liveSearch.cancel()
+
+	def _runLiveSearch(self):
+		self._searchTimer = None
+		if not self:
+			return
+		keyword = self.search.GetValue()
+		if not keyword.strip():
+			self.liveSearch.cancel()
+			# Back to the whole list once the field is cleared
+			if not self._loading and not isinstance(self.rowSource, PagedRowSource):
+				self.loadRecords()
+			return
+		# Sorted in the search thread like the rows shown, so they match the sort indicator
+		self.liveSearch.request(self.comboboxOptions.GetValue(), keyword, self._onLiveResults, self.sort)
+
+	def _onLiveResults(self, results, error, seconds):
+		if not self:
+			return
+		if error is not None:
+			ui.message(_("Search error: {}").format(error))
+			return
+		self._cancelLoad()
+		self.rowSource = results
+		self.initialize_contact_list()
+		count = results.count()
+		log.debug(
+			f"Live search: {count} results, query {seconds * 1000:.1f} ms, "
+			f"{(time.perf_counter() - self._searchStartedAt) * 1000:.0f} ms after the last keystroke",
+		)
+		if count:
+			message = _("{count} contacts found").format(count=count)
+		else:
+			message = _("No contacts found")
+		notice = self._indexNotice(self.comboboxOptions.GetValue(), self.search.GetValue())
+		ui.message(f"{message}. {notice}" if notice else message)
+
 	def onToImport(self, event):
 		"""Import csv file to the List of extensions."""
 		dlg = wx.FileDialog(
@@ -314,6 +616,45 @@ class SIRA(wx.Dialog):
 		dlg.Destroy()
 		self.contactList.SetFocus()
 
+	def onMerge(self, event):
+		"""Merge the contacts of another SIRA database into the List of extensions."""
+		dlg = wx.FileDialog(
+			self,
+			_("Merge database"),
+			os.getcwd(),
+			"",
+			_("Database files (*.db)|*.db"),
+			wx.FD_OPEN,
+		)
+		if dlg.ShowModal() == wx.ID_OK:
+			mypath = dlg.GetPath()
+			try:
+				# Dry run first, so the user knows what will be added
+				newRecords = core.mergeFromDatabase(mypath, dryRun=True)
+				if not newRecords:
+					self.showMessage(_("The selected database has no new contacts."), _("Attention"))
+				else:
+					message = _("{count} new contacts will be added. Do you wish to continue?").format(
+						count=len(newRecords),
+					)
+					user_response = gui.messageBox(
+						message,
+						_("Attention"),
+						style=wx.ICON_QUESTION | wx.YES_NO,
+					)
+					if user_response == wx.YES:
+						inserted = core.mergeFromDatabase(mypath)
+						self.showMessage(
+							_("{count} contacts merged successfully!").format(count=inserted),
+							_("Success"),
+						)
+						self._refresh_and_focus()
+			except Exception as e:
+				# Translators: Message displayed to the user in case of errors when merging a database
+				self.showMessage(_("It was not possible to merge the database! {}").format(e), _("Attention"))
+		dlg.Destroy()
+		self.contactList.SetFocus()
+
 	def onToExport(self, event):
 		"""Export the List of extensions to csv."""
 		dlg = wx.FileDialog(
@@ -369,16 +710,50 @@ class SIRA(wx.Dialog):
 
 		user_response = gui.messageBox(message, caption, style=wx.ICON_QUESTION | wx.YES_NO)
 		if user_response == wx.YES:
-			try:
-				core.resetRecord()
-				self.showMessage(_("Agenda deleted!"), _("Success"))
-				self._refresh_and_focus()
-			except Exception as e:
-				self.showMessage(_("Error deleting records: {}").format(str(e)), _("Error"))
-				return
+			# The snapshot reads the whole database: it is taken outside the GUI thread
+			threading.Thread(target=self._resetRecords, name="SIRAReset", daemon=True).start()
+			return
 
-		# 4. Refreshes the list and sets focus, encapsulating repeated calls.
-		self._refresh_and_focus()
+		# 4. Sets the focus back to the list.
+		self.contactList.SetFocus()
+
+	def _resetRecords(self):
+		"""Erases the records in a background thread, once a snapshot of them was taken."""
+		try:
+			# Keep a way back: the reset can be undone from the restore menu. The snapshot is
+			# of the database resetRecord empties: the local replica when it is in use
+			createSnapshot(reason="reset", databasePath=getActiveDatabasePath())
+		except Exception as e:
+			log.error(f"Snapshot before the reset failed: {e}", exc_info=True)
+			wx.CallAfter(
+				self.showMessage,
+				_("The agenda was not erased, as it was not possible to save a copy of it first: {}").format(
+					e,
+				),
+				_("Error"),
+			)
+			return
+		try:
+			core.resetRecord()
+			usage.reset()
+		except Exception as e:
+			wx.CallAfter(self.showMessage, _("Error deleting records: {}").format(str(e)), _("Error"))
+			return
+		wx.CallAfter(self._onRecordsReset)
+
+	def _onRecordsReset(self):
+		if not self:
+			return
+		if self.showSource:
+			# The alternate database keeps its records
+			self.loadRecords()
+		else:
+			self._cancelLoad()
+			self.rowSource = ListRowSource([])
+			self.initialize_contact_list()
+		self.visualizationField.SetValue("")
+		self.showMessage(_("Agenda deleted!"), _("Success"))
+		self.contactList.SetFocus()
 
 	def set_config(self):
 		"""
@@ -386,12 +761,12 @@ class SIRA(wx.Dialog):
 		"""
 		conf = config.conf.get(ADDON_NAME, {})
 
-		if not conf.get("resetRecords", True):
-			self.buttonResetRecords.Disable()
+		self.buttonResetRecords.Enable(bool(conf.get("resetRecords", True)))
 
-		if not conf.get("importCSV", True) or not conf.get("exportCSV", True):
-			self.buttonExport.Disable()
-			self.buttonImport.Disable()
+		csvEnabled = bool(conf.get("importCSV", True) and conf.get("exportCSV", True))
+		self.buttonExport.Enable(csvEnabled)
+		self.buttonImport.Enable(csvEnabled)
+		self.buttonMerge.Enable(csvEnabled)
 
 	def onFindDuplicates(self, event):
 		"""
@@ -401,7 +776,9 @@ class SIRA(wx.Dialog):
 
 		if duplicates:
 			# Abre o novo diálogo para o usuário gerenciar as duplicatas
-			dlg = ManageDuplicatesDialog(self, duplicates)
+			with profilePhase("ManageDuplicatesDialog dialog"):
+				dlg = ManageDuplicatesDialog(self, duplicates)
+			writeProfile()
 			gui.mainFrame.prePopup()
 			dlg.CentreOnScreen()
 			dlg.ShowModal()
@@ -431,8 +808,8 @@ class SIRA(wx.Dialog):
 					with details about the problem.
 		"""
 
-		# We extracted the item using the Getobject method
-		filtered_item = self.contactResults
+		# The records currently listed (search results or the whole agenda)
+		filtered_item = self.rowSource.allRecords()
 
 		# Check if the item was found
 		if not filtered_item:
@@ -515,17 +892,44 @@ class SIRA(wx.Dialog):
 		Args:
 			event (wx.Event): Event triggered by the cancel button.
 		"""
-		self.Destroy()
+		self._stopLiveSearch()
+		self._cancelLoad()
+		# Write the lookups counted so far without waiting for the timer
+		threading.Thread(target=usage.flush, name="SIRAUsageFlush", daemon=True).start()
+		closeDialog(self)
+
+	def resetDialog(self):
+		"""
+		Puts the dialog back in the state of a new one when it is shown again (see dialogLifecycle.py).
+
+		Returns:
+			bool: False when the settings changed the columns and the dialog must be built again.
+		"""
+		if self.showSource != isFederatedEnabled():
+			return False
+		openedAt = time.perf_counter()
+		self.search.ChangeValue("")
+		self.comboboxOptions.ChangeValue(_("Secretary office"))
+		self.visualizationField.SetValue("")
+		self._countedRecord = None
+		if self.sort is not None:
+			self.sort = None
+			self.contactList.RemoveSortIndicator()
+		self.set_config()
+		# The contacts may have changed while the dialog was hidden
+		self.loadRecords(openedAt)
+		self.contactList.SetFocus()
+		threading.Thread(target=self._loadFrequent, name="SIRAFrequentContacts", daemon=True).start()
+		return True
 
 	def get_selected_record(self):
 		idx = self.contactList.GetFirstSelected()
 		if idx == -1:
 			return None
-		return self._itemMap.get(idx)
+		return self.contactList.getRecord(idx)
 
 	def show_all_records(self):
-		self.contactResults = core.getAllRecords()
-		self.initialize_contact_list()
+		self.loadRecords()
 
 	def _refresh_and_focus(self):
 		"""
@@ -542,20 +946,55 @@ class SIRA(wx.Dialog):
 
 	def onSelectLine(self, event):
 		# Check if there is a line selected in the list
-		selected_idx = self.contactList.GetFirstSelected()
-		if selected_idx == -1:
+		record = self.get_selected_record()
+		if record is None:
 			return
 
 		data = [
-			f"{self.contactList.GetColumn(i).GetText()}: {self.contactList.GetItem(selected_idx, i).GetText()}"
-			for i in range(self.contactList.GetColumnCount())
+			f"{self.contactList.GetColumn(i).GetText()}: {value}"
+			for i, value in enumerate(self.columnValues(record))
 		]
 		lineComplete = " | ".join(data)
 		self.visualizationField.SetValue(lineComplete)
+		self._countedRecord = None
+
+	def onColumnClick(self, event):
+		self.sortBy(event.GetColumn())
+
+	def sortBy(self, columnIndex):
+		"""
+		Sorts the rows shown by a column; sorting again by the same column reverses the order.
+
+		The whole list is sorted by the database, one page at a time; search
+		results are sorted in memory.
+		"""
+		if not 0 <= columnIndex < len(SORT_COLUMNS):
+			ui.message(_("This column cannot be sorted"))
+			return
+		column = SORT_COLUMNS[columnIndex]
+		ascending = not (self.sort is not None and self.sort[0] == column and self.sort[1])
+		self.sort = (column, ascending)
+		label = self.contactList.GetColumn(columnIndex).GetText()
+		if ascending:
+			ui.message(_("Sorted by {column}, ascending").format(column=label))
+		else:
+			ui.message(_("Sorted by {column}, descending").format(column=label))
+		self.contactList.ShowSortIndicator(columnIndex, ascending)
+
+		if self._loading or isinstance(self.rowSource, PagedRowSource):
+			self.loadRecords()
+			return
+		self.rowSource = sortedRowSource(self.rowSource, self.sort)
+		self.initialize_contact_list()
 
 	def whenPressingLetters(self, event):
 		code = event.GetKeyCode()
 
+		# Control+1 to Control+7 sort by the column of that number; the database column is not sortable
+		if event.ControlDown() and ord("1") <= code < ord("1") + len(SORT_COLUMNS):
+			self.sortBy(code - ord("1"))
+			return
+
 		if code >= 256:
 			event.Skip()
 			return
@@ -576,19 +1015,26 @@ class SIRA(wx.Dialog):
 			"P": 5,  # Cell phone
 			"E": 6,  # Email
 		}
+		if self.showSource:
+			map["D"] = 7  # Database
 
 		if key not in map:
 			event.Skip()
 			return
 
-		idx = self.contactList.GetFirstSelected()
-		if idx == -1:
+		record = self.get_selected_record()
+		if record is None:
 			event.Skip()
 			return
 
 		column = map[key]
 
-		text = self.contactList.GetItemText(idx, column)
+		text = self.columnValues(record)[column]
+
+		# Reading a field of a contact is a lookup; counted once per selection
+		if self._countedRecord is not record:
+			self._countedRecord = record
+			usage.recordAccess(record)
 
 		if text:
 			ui.message(text)
@@ -598,4 +1044,6 @@ class SIRA(wx.Dialog):
 	def _onInternalDestroy(self, evt):
 		# Limpa a instância do Singleton para que o próximo __new__ crie uma nova
 		SIRA._instance = None
+		# Write the lookups counted so far without waiting for the timer
+		threading.Thread(target=usage.flush, name="SIRAUsageFlush", daemon=True).start()
 		evt.Skip()
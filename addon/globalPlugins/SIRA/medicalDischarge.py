@@ -19,7 +19,6 @@ Created on: 19/03/2026Created on: 07/02/2025
 
 import os
 import re
-import sys
 from datetime import datetime
 
 import addonHandler
@@ -27,14 +26,12 @@ import gui
 import wx
 from logHandler import log
 
-from .varsConfig import ADDON_NAME, ADDON_PATH, IS64, MASK_PHONE
+from .dialogLifecycle import closeDialog
+from .libLoader import installVendoredFinder
+from .varsConfig import ADDON_NAME, MASK_PHONE
 
-# Add the lib/ folder to sys.path (only once)
-libFolder = "lib64" if IS64 else "lib"
-libPath = os.path.join(ADDON_PATH, libFolder)
-
-if os.path.isdir(libPath) and libPath not in sys.path:
-	sys.path.insert(0, libPath)
+# The libraries of lib/ are imported through a finder (see libLoader.py)
+installVendoredFinder()
 
 try:
 	from maskedTextCtrl import MaskedTextCtrl
@@ -543,6 +540,16 @@ Contato: {variables["contatoDoResponsavelPelaAlta"]}
 
 		gui.messageBox(message, caption, style)
 
+	def resetDialog(self):
+		"""
+		Empties the form when the dialog is shown again (see dialogLifecycle.py).
+
+		Returns:
+			bool: Always True; the form is reused as it is.
+		"""
+		self.onClean(None)
+		return True
+
 	def onCancel(self, event):
 		"""
 		Manipula o evento de cancelamento da janela.
@@ -553,7 +560,7 @@ Contato: {variables["contatoDoResponsavelPelaAlta"]}
 		Comportamento:
 						Fecha a janela atual ao ser chamado.
 		"""
-		self.Destroy()
+		closeDialog(self)
 
 	def onPasteAndClean(self, event):
 		# Check if it is Ctrl+V
@@ -19,7 +19,6 @@ Created on: 07/02/2025
 
 import os
 import re
-import sys
 from datetime import datetime
 
 import addonHandler
@@ -27,14 +26,12 @@ import gui
 import wx
 from logHandler import log
 
-from .varsConfig import ADDON_NAME, ADDON_PATH, IS64, MASK_DATE, MASK_PHONE, MASK_TIME
+from .dialogLifecycle import closeDialog
+from .libLoader import installVendoredFinder
+from .varsConfig import ADDON_NAME, MASK_DATE, MASK_PHONE, MASK_TIME
 
-# Add the lib/ folder to sys.path (only once)
-libFolder = "lib64" if IS64 else "lib"
-libPath = os.path.join(ADDON_PATH, libFolder)
-
-if os.path.isdir(libPath) and libPath not in sys.path:
-	sys.path.insert(0, libPath)
+# The libraries of lib/ are imported through a finder (see libLoader.py)
+installVendoredFinder()
 
 try:
 	from maskedTextCtrl import MaskedTextCtrl
@@ -46,6 +43,9 @@ except ImportError as e:
 # Initializes the translation
 addonHandler.initTranslation()
 
+# Subject filled in when the dialog is opened
+DEFAULT_SUBJECT = "Recado para o transporte"
+
 
 class MessageForTransport(wx.Dialog):
 	"""
@@ -120,7 +120,7 @@ class MessageForTransport(wx.Dialog):
 
 		# Assunto
 		self.labelSubject = wx.StaticText(panel, label=_("Subject: "))
-		self.textSubject = wx.TextCtrl(panel, value="Recado para o transporte", size=(300, -1))
+		self.textSubject = wx.TextCtrl(panel, value=DEFAULT_SUBJECT, size=(300, -1))
 		view_fields_box.Add(
 			self.textSubject,
 			flag=wx.EXPAND | wx.LEFT | wx.RIGHT,
@@ -420,6 +420,17 @@ class MessageForTransport(wx.Dialog):
 
 		gui.messageBox(message, caption, style)
 
+	def resetDialog(self):
+		"""
+		Empties the form when the dialog is shown again (see dialogLifecycle.py).
+
+		Returns:
+			bool: Always True; the form is reused as it is.
+		"""
+		self.onClean(None)
+		self.textSubject.SetValue(DEFAULT_SUBJECT)
+		return True
+
 	def onCancel(self, event):
 		"""
 		Manipula o evento de cancelamento da janela.
@@ -430,7 +441,7 @@ class MessageForTransport(wx.Dialog):
 		Comportamento:
 				Fecha a janela atual ao ser chamado.
 		"""
-		self.Destroy()
+		closeDialog(self)
 
 	def onPasteAndClean(self, event):
 		# Check if it is Ctrl+V
@@ -17,12 +17,18 @@ All AI-generated code was manually reviewed and tested by the author.
 Created on: 08/01/2025.
 """
 
+import hashlib
 import os
+import re
+import struct
 
+import config
 import globalVars
 
 from .dbConfig import DatabaseConfig
+from .normalization import phoneticKeys
 from .sqlLoader import sql
+from .varsConfig import ADDON_NAME
 
 # 1. First we define where the data lives
 # We force conversion to string to avoid Optional[str]
@@ -45,6 +51,117 @@ base_dir = os.path.dirname(str(DEFAULT_DB_PATH))
 db = DatabaseConfig(DEFAULT_DB_PATH)
 db.loadConfig()
 
+# 3. Local replicas live next to the default database, one file per shared database
+REPLICA_DIR = os.path.join(ADDON_DATA_DIR, "replicas")
+
+# Seconds to wait for a lock held by another NVDA instance before failing
+CONNECT_TIMEOUT = 10.0
+
+# Current unix time (with fractions of a second) as an SQL expression.
+# julianday() is used instead of unixepoch() to support older SQLite builds.
+SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+def isReplicaEnabled():
+	"""Returns True when reads and writes should be served by the local replica."""
+	conf = config.conf.get(ADDON_NAME, {})
+	return bool(conf.get("offlineReplica", False))
+
+
+def databaseKey(path):
+	"""
+	Returns a short key identifying a database file, used to name the files kept for it.
+
+	Args:
+		path (str): Path of the database.
+	"""
+	key = os.path.normcase(os.path.abspath(str(path)))
+	return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def getReplicaPath(remotePath):
+	"""
+	Returns the path of the local replica for a shared database.
+
+	Each shared database gets its own replica file, so switching between the
+	primary and the alternate database never mixes their contents.
+
+	Args:
+		remotePath (str): Path of the shared (primary or alternate) database.
+
+	Returns:
+		str: Path of the replica file inside the SIRA data directory.
+	"""
+	return os.path.join(REPLICA_DIR, f"replica-{databaseKey(remotePath)}.db")
+
+
+def getActiveDatabasePath():
+	"""
+	Returns the path that Section connects to by default.
+
+	When the offline replica is enabled this is the local replica of the
+	configured database; otherwise it is the configured database itself.
+	"""
+	remotePath = db.getCurrentDatabasePath()
+	if isReplicaEnabled():
+		return getReplicaPath(remotePath)
+	return remotePath
+
+
+def isFederatedEnabled():
+	"""Returns True when searches should span the primary and the alternate database."""
+	conf = config.conf.get(ADDON_NAME, {})
+	return bool(conf.get("federatedSearch", False)) and bool(db.altDatabase.strip())
+
+
+def getDatabaseSources():
+	"""
+	Returns the databases taking part in a federated search.
+
+	The currently selected database is opened through getActiveDatabasePath(),
+	so it honours the offline replica; the other one is opened directly.
+
+	Returns:
+		dict: {"primary": path, "alternate": path}
+	"""
+	paths = {"primary": db.firstDatabase, "alternate": db.altDatabase}
+	paths[getActiveSource()] = getActiveDatabasePath()
+	return paths
+
+
+def getActiveSource():
+	"""Returns the source of the selected database in a federated search: "primary" or "alternate"."""
+	return "primary" if db.indexDB == 0 else "alternate"
+
+
+def getDatabaseVersion(path):
+	"""
+	Returns a cheap value that changes whenever the database file is modified.
+
+	Combines the SQLite file change counter (header offset 24, incremented on
+	every committed write in rollback-journal mode) with the file size and
+	modification time, plus those of the WAL file when one exists.
+
+	Args:
+		path (str): Database file.
+
+	Returns:
+		tuple: Opaque version value, or None when the file cannot be read.
+	"""
+	try:
+		with open(path, "rb") as file:
+			header = file.read(28)
+		stat = os.stat(path)
+	except OSError:
+		return None
+	counter = struct.unpack(">I", header[24:28])[0] if len(header) == 28 else 0
+	version = (counter, stat.st_size, stat.st_mtime_ns)
+	walPath = path + "-wal"
+	if os.path.exists(walPath):
+		walStat = os.stat(walPath)
+		version += (walStat.st_size, walStat.st_mtime_ns)
+	return version
+
 
 class ObjectExtensionRegistrationSystem(object):
 	def __init__(
@@ -57,6 +174,7 @@ class ObjectExtensionRegistrationSystem(object):
 		extension="",
 		cell="",
 		email="",
+		source="",
 	):
 		"""
 		Initializes a new contact with the provided details.
@@ -70,6 +188,7 @@ class ObjectExtensionRegistrationSystem(object):
 			extension (str): Sector extension.
 			cell (str): Contact's cell phone number.
 			email (str): Contact email address.
+			source (str): Database the contact came from in a federated search ("primary" or "alternate").
 		"""
 		super().__init__()  # calls the init of the parent class (silences linters and maintains compatibility)
 		self.id = id
@@ -80,6 +199,7 @@ class ObjectExtensionRegistrationSystem(object):
 		self.extension = extension
 		self.cell = cell
 		self.email = email
+		self.source = source
 
 	def __repr__(self):
 		"""
@@ -104,16 +224,24 @@ class Section:
 	cursor = None
 	connected = False
 
+	def __init__(self, path=None):
+		"""
+		Args:
+			path (str, optional): Database to open. Defaults to the active database
+				(the local replica when enabled, otherwise the configured database).
+		"""
+		self.path = path
+
 	def __enter__(self):
 		"""Método de entrada para o gerenciador de contexto."""
-		db_path = db.getCurrentDatabasePath()
+		db_path = self.path or getActiveDatabasePath()
 
 		# Garantir que a pasta do arquivo existe
 		db_dir = os.path.dirname(db_path)
 		if db_dir and not os.path.exists(db_dir):
 			os.makedirs(db_dir)
 
-		self.connect = sql.connect(db_path)
+		self.connect = sql.connect(db_path, timeout=CONNECT_TIMEOUT)
 		self.connect.row_factory = self.dict_factory
 		self.cursor = self.connect.cursor()
 		self.connected = True
@@ -165,9 +293,9 @@ class Section:
 		return False
 
 	@classmethod
-	def initDB(cls):
+	def initDB(cls, path=None):
 		"""Checks the existence of the database and creates the contact table if it does not exist."""
-		with cls() as trans:
+		with cls(path) as trans:
 			sqlCommand = """CREATE TABLE IF NOT EXISTS contacts(
 				id INTEGER PRIMARY KEY,
 				secretaryOffice TEXT,
@@ -179,3 +307,357 @@ class Section:
 				email TEXT)"""
 			trans.execute(sqlCommand)
 			trans.persist()
+			migrateSchema(trans)
+
+
+def _columnNames(trans, table):
+	"""Returns the set of column names of a table."""
+	trans.execute(f"PRAGMA table_info({table})")
+	return {row["name"] for row in trans.fetchall()}
+
+
+def _migrateSyncMetadata(trans):
+	"""
+	Schema version 1: per-row versions and tombstones used by the replica sync.
+
+	- uid identifies a contact across databases (ids are local to each file);
+	- version is bumped on every content change;
+	- changeSeq is a per-database, strictly increasing change counter used for delta sync;
+	- tombstones remember deleted rows so that deletions can be propagated.
+
+	Everything is maintained by triggers, so writers that know nothing about
+	synchronization (older add-on versions, CSV import) keep the metadata correct.
+	"""
+	columns = _columnNames(trans, "contacts")
+	for name, definition in (
+		("uid", "TEXT"),
+		("version", "INTEGER NOT NULL DEFAULT 1"),
+		("modifiedAt", "REAL"),
+		("changeSeq", "INTEGER NOT NULL DEFAULT 0"),
+	):
+		if name not in columns:
+			trans.execute(f"ALTER TABLE contacts ADD COLUMN {name} {definition}")
+
+	trans.execute(
+		"""CREATE TABLE IF NOT EXISTS syncMeta(
+			id INTEGER PRIMARY KEY CHECK (id = 1),
+			changeSeq INTEGER NOT NULL)""",
+	)
+	trans.execute("INSERT OR IGNORE INTO syncMeta (id, changeSeq) VALUES (1, 0)")
+	trans.execute(
+		"""CREATE TABLE IF NOT EXISTS tombstones(
+			uid TEXT PRIMARY KEY,
+			version INTEGER NOT NULL,
+			deletedAt REAL,
+			changeSeq INTEGER NOT NULL DEFAULT 0)""",
+	)
+
+	# Existing rows get an identity and a change number
+	trans.execute(
+		f"""UPDATE contacts SET
+			uid = lower(hex(randomblob(16))),
+			modifiedAt = COALESCE(modifiedAt, {SQL_NOW})
+		WHERE uid IS NULL""",
+	)
+	trans.execute("UPDATE syncMeta SET changeSeq = (SELECT COALESCE(MAX(id), 0) FROM contacts) WHERE id = 1")
+	trans.execute("UPDATE contacts SET changeSeq = id")
+
+	trans.execute("CREATE UNIQUE INDEX IF NOT EXISTS idxContactsUid ON contacts(uid)")
+	trans.execute("CREATE INDEX IF NOT EXISTS idxContactsChangeSeq ON contacts(changeSeq)")
+	trans.execute("CREATE INDEX IF NOT EXISTS idxTombstonesChangeSeq ON tombstones(changeSeq)")
+
+	nextSeq = "(SELECT changeSeq FROM syncMeta WHERE id = 1)"
+	trans.execute(
+		f"""CREATE TRIGGER IF NOT EXISTS contactsAfterInsert AFTER INSERT ON contacts
+		BEGIN
+			UPDATE syncMeta SET changeSeq = changeSeq + 1 WHERE id = 1;
+			UPDATE contacts SET
+				uid = COALESCE(NEW.uid, lower(hex(randomblob(16)))),
+				modifiedAt = COALESCE(NEW.modifiedAt, {SQL_NOW}),
+				changeSeq = {nextSeq}
+			WHERE id = NEW.id;
+			DELETE FROM tombstones WHERE uid = NEW.uid;
+		END""",
+	)
+	trans.execute(
+		f"""CREATE TRIGGER IF NOT EXISTS contactsAfterUpdate
+		AFTER UPDATE OF secretaryOffice, landline, sector, responsible, extension, cell, email, version
+		ON contacts
+		WHEN NEW.secretaryOffice IS NOT OLD.secretaryOffice
+			OR NEW.landline IS NOT OLD.landline
+			OR NEW.sector IS NOT OLD.sector
+			OR NEW.responsible IS NOT OLD.responsible
+			OR NEW.extension IS NOT OLD.extension
+			OR NEW.cell IS NOT OLD.cell
+			OR NEW.email IS NOT OLD.email
+			OR NEW.version IS NOT OLD.version
+		BEGIN
+			UPDATE syncMeta SET changeSeq = changeSeq + 1 WHERE id = 1;
+			UPDATE contacts SET
+				version = CASE WHEN NEW.version = OLD.version THEN OLD.version + 1 ELSE NEW.version END,
+				modifiedAt = CASE
+					WHEN NEW.version = OLD.version OR NEW.modifiedAt IS OLD.modifiedAt THEN {SQL_NOW}
+					ELSE NEW.modifiedAt
+				END,
+				changeSeq = {nextSeq}
+			WHERE id = NEW.id;
+		END""",
+	)
+	trans.execute(
+		f"""CREATE TRIGGER IF NOT EXISTS contactsAfterDelete AFTER DELETE ON contacts
+		WHEN OLD.uid IS NOT NULL
+		BEGIN
+			UPDATE syncMeta SET changeSeq = changeSeq + 1 WHERE id = 1;
+			INSERT OR REPLACE INTO tombstones (uid, version, deletedAt, changeSeq)
+			VALUES (OLD.uid, OLD.version + 1, {SQL_NOW}, {nextSeq});
+		END""",
+	)
+
+
+def _migrateListOrderIndex(trans):
+	"""
+	Schema version 2: index matching the list order, so a page of the contact
+	list is read with LIMIT/OFFSET without sorting the whole table.
+	"""
+	trans.execute("CREATE INDEX IF NOT EXISTS idxContactsSecretaryOffice ON contacts(secretaryOffice, id)")
+
+
+def _migrateSearchTokens(trans):
+	"""
+	Schema version 3: token index of the "All fields" search.
+
+	The tokens are written by searchIndex.updateSearchIndex, which catches up with
+	the contacts changed (changeSeq) and deleted (tombstones) since its last run,
+	so the table is filled on first use and after writes made by any other program.
+	searchDocs maps the uid of each indexed contact to its id, to find the tokens
+	of a deleted contact from its tombstone.
+	"""
+	trans.execute(
+		"""CREATE TABLE IF NOT EXISTS searchTokens(
+			token TEXT NOT NULL,
+			contactId INTEGER NOT NULL,
+			field TEXT NOT NULL,
+			PRIMARY KEY (token, contactId, field)) WITHOUT ROWID""",
+	)
+	trans.execute("CREATE INDEX IF NOT EXISTS idxSearchTokensContact ON searchTokens(contactId)")
+	trans.execute(
+		"""CREATE TABLE IF NOT EXISTS searchDocs(
+			uid TEXT PRIMARY KEY,
+			contactId INTEGER NOT NULL) WITHOUT ROWID""",
+	)
+	trans.execute(
+		"""CREATE TABLE IF NOT EXISTS searchIndexState(
+			id INTEGER PRIMARY KEY CHECK (id = 1),
+			changeSeq INTEGER NOT NULL)""",
+	)
+	trans.execute("INSERT OR IGNORE INTO searchIndexState (id, changeSeq) VALUES (1, -1)")
+
+
+# Punctuation removed by sqlDigits
+_PHONE_PUNCTUATION = (" ", "-", "(", ")", ".", "/", "+")
+_PHONE_PUNCTUATION_TABLE = str.maketrans("", "", "".join(_PHONE_PUNCTUATION))
+_LEADING_INTEGER = re.compile(r"[0-9]+")
+
+
+def sqlDigits(column):
+	"""Returns an SQL expression with a column stripped of the usual phone punctuation."""
+	expression = column
+	for char in _PHONE_PUNCTUATION:
+		expression = f"replace({expression}, '{char}', '')"
+	return expression
+
+
+def digitsValue(value):
+	"""Returns a value as sqlDigits does in SQL."""
+	return value.translate(_PHONE_PUNCTUATION_TABLE)
+
+
+# Numeric value of an extension; queries must use this exact expression to use its index
+SQL_EXTENSION_NUMBER = f"CAST({sqlDigits('extension')} AS INTEGER)"
+
+
+def extensionNumber(value):
+	"""Returns the numeric value of an extension as SQL_EXTENSION_NUMBER does: its leading digits, or 0."""
+	match = _LEADING_INTEGER.match(digitsValue(value))
+	return int(match.group()) if match else 0
+
+
+def _migrateExtensionNumberIndex(trans):
+	"""
+	Schema version 4: index on the numeric value of the extension, for range
+	queries such as "ext:2100..2199".
+
+	An expression index rather than a column: it is kept up to date by SQLite
+	itself, whichever program writes the contact.
+	"""
+	trans.execute(
+		f"CREATE INDEX IF NOT EXISTS idxContactsExtensionNumber ON contacts({SQL_EXTENSION_NUMBER})",
+	)
+
+
+# Fields whose words are indexed by sound
+PHONETIC_FIELDS = ("sector", "responsible")
+
+
+def _migratePhoneticKeys(trans):
+	"""
+	Schema version 5: phonetic keys (normalization.phoneticKey) of the words of
+	the sector and responsible fields, for the "sounds like" searches.
+
+	Filled here for the existing contacts; from then on searchIndex.updateSearchIndex
+	keeps them with the tokens.
+	"""
+	trans.execute(
+		"""CREATE TABLE IF NOT EXISTS phoneticKeys(
+			key TEXT NOT NULL,
+			contactId INTEGER NOT NULL,
+			field TEXT NOT NULL,
+			PRIMARY KEY (key, contactId, field)) WITHOUT ROWID""",
+	)
+	trans.execute(f"SELECT id, {', '.join(PHONETIC_FIELDS)} FROM contacts")
+	rows = trans.fetchall()
+	trans.executemany(
+		"INSERT OR IGNORE INTO phoneticKeys (key, contactId, field) VALUES (?, ?, ?)",
+		sorted(
+			{
+				(key, row["id"], field)
+				for row in rows
+				for field in PHONETIC_FIELDS
+				for key in phoneticKeys(row[field])
+			},
+		),
+	)
+	# Built after the rows are in, in a single pass
+	trans.execute("CREATE INDEX IF NOT EXISTS idxPhoneticKeysContact ON phoneticKeys(contactId)")
+
+
+def _migrateContactUsage(trans):
+	"""
+	Schema version 6: how often and how recently each contact was looked up
+	(see usage.py).
+
+	score is a decayed access count as of lastAccess. The rows of deleted
+	contacts are removed by a trigger, whichever program deletes them.
+	"""
+	trans.execute(
+		"""CREATE TABLE IF NOT EXISTS contactUsage(
+			contactId INTEGER PRIMARY KEY,
+			score REAL NOT NULL,
+			lastAccess REAL NOT NULL,
+			accessCount INTEGER NOT NULL)""",
+	)
+	trans.execute(
+		"""CREATE TRIGGER IF NOT EXISTS contactsUsageAfterDelete AFTER DELETE ON contacts
+		BEGIN
+			DELETE FROM contactUsage WHERE contactId = OLD.id;
+		END""",
+	)
+
+
+# Accented letters of Portuguese and their base letter. Each one is a nested
+# replace() in the expression, and SQLite's parser only accepts so many levels.
+_FOLDED_LETTERS = {
+	"a": "áàâãÁÀÂÃ",
+	"e": "éêÉÊ",
+	"i": "íÍ",
+	"o": "óôõÓÔÕ",
+	"u": "úÚ",
+	"c": "çÇ",
+}
+
+
+# The accented letters of _FOLDED_LETTERS and the ASCII capitals, as sqlFold folds them
+_FOLD_TABLE = str.maketrans(
+	{
+		**{letter: base for base, letters in _FOLDED_LETTERS.items() for letter in letters},
+		**{chr(code): chr(code + 32) for code in range(ord("A"), ord("Z") + 1)},
+	},
+)
+
+
+def foldValue(value):
+	"""Returns a value as sqlFold does in SQL, so records sort in memory as in the database."""
+	return value.translate(_FOLD_TABLE)
+
+
+def sqlFold(column):
+	"""
+	Returns an SQL expression comparing a text column without accents or case.
+
+	Built from replace() and lower() only, so an index on it can be maintained by
+	any program writing the database, unlike a custom collation or function.
+	"""
+	expression = column
+	for base, letters in _FOLDED_LETTERS.items():
+		for letter in letters:
+			expression = f"replace({expression}, '{letter}', '{base}')"
+	return f"lower({expression})"
+
+
+# Sort order of each column of the contact list, each backed by an index:
+# text without accents or case, phone numbers by their digits and the
+# extension by its numeric value. The secretary office keeps the list order.
+SORT_EXPRESSIONS = {
+	"secretaryOffice": "secretaryOffice",
+	"landline": sqlDigits("landline"),
+	"sector": sqlFold("sector"),
+	"responsible": sqlFold("responsible"),
+	"extension": SQL_EXTENSION_NUMBER,
+	"cell": sqlDigits("cell"),
+	"email": sqlFold("email"),
+}
+
+
+def _migrateSortIndexes(trans):
+	"""
+	Schema version 7: indexes on the sort expressions of the columns (see
+	SORT_EXPRESSIONS) not indexed yet, so the contact list can be sorted and
+	paged by any column without sorting the whole table.
+	"""
+	for column in ("landline", "sector", "responsible", "cell", "email"):
+		trans.execute(
+			f"CREATE INDEX IF NOT EXISTS idxContactsSort{column[0].upper()}{column[1:]} "
+			f"ON contacts({SORT_EXPRESSIONS[column]})",
+		)
+
+
+# Ordered list of schema migrations; the position + 1 is the resulting PRAGMA user_version.
+SCHEMA_MIGRATIONS = [
+	_migrateSyncMetadata,
+	_migrateListOrderIndex,
+	_migrateSearchTokens,
+	_migrateExtensionNumberIndex,
+	_migratePhoneticKeys,
+	_migrateContactUsage,
+	_migrateSortIndexes,
+]
+
+SCHEMA_VERSION = len(SCHEMA_MIGRATIONS)
+
+
+def migrateSchema(trans):
+	"""
+	Brings the database schema up to SCHEMA_VERSION.
+
+	The version is kept in PRAGMA user_version. Each step runs in an immediate
+	transaction and re-reads the version, so two NVDA instances opening the same
+	shared database at the same time do not apply a migration twice.
+
+	Args:
+		trans (Section): An open section on the database to migrate.
+	"""
+	trans.execute("PRAGMA user_version")
+	if trans.cursor.fetchone()["user_version"] >= SCHEMA_VERSION:
+		return
+
+	trans.execute("BEGIN IMMEDIATE")
+	try:
+		trans.execute("PRAGMA user_version")
+		currentVersion = trans.cursor.fetchone()["user_version"]
+		for version in range(currentVersion, SCHEMA_VERSION):
+			SCHEMA_MIGRATIONS[version](trans)
+		trans.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+		trans.persist()
+	except Exception:
+		trans.connect.rollback()
+		raise
@@ -0,0 +1,145 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+_NON_DIGITS = re.compile(r"\D+")
+_SPACES = re.compile(r"\s+")
+_WORDS = re.compile(r"\w+")
+_NON_LETTERS = re.compile(r"[^a-z]+")
+
+# Spelling rules of the phonetic key, applied in order to an accent-free, lower case word
+_PHONETIC_RULES = [
+	(re.compile(pattern), replacement)
+	for pattern, replacement in (
+		(r"ph", "f"),
+		(r"th", "t"),
+		(r"[cs]h", "x"),
+		(r"lh", "l"),
+		(r"nh", "n"),
+		(r"[sx]c(?=[eiy])", "s"),
+		(r"c(?=[eiy])", "s"),
+		(r"qu(?=[eiy])", "k"),
+		(r"ck|c|q", "k"),
+		(r"g(?=[eiy])", "j"),
+		(r"gu(?=[eiy])", "g"),
+		(r"z", "s"),
+		(r"w", "v"),
+		(r"h", ""),
+		(r"ao$", "an"),
+		(r"m$", "n"),
+		# Unstressed e and o sound like i and u; y is a vowel
+		(r"[ey]", "i"),
+		(r"o", "u"),
+		(r"(.)\1+", r"\1"),
+	)
+]
+
+# Separator used when several normalized fields are joined into one key
+KEY_SEPARATOR = "\x1f"
+
+
+@lru_cache(maxsize=65536)
+def normalizeText(value):
+	"""
+	Returns a comparison form of a text: without accents, case folded and with
+	single spaces, so that "Farmácia  Central" and "farmacia central" are equal.
+
+	Args:
+		value (str): Text to normalize. None is treated as an empty string.
+
+	Returns:
+		str: The normalized text.
+	"""
+	if not value:
+		return ""
+	if value.isascii():
+		# Nothing to decompose, and casefold() equals lower() on ASCII
+		return _SPACES.sub(" ", value.lower()).strip()
+	decomposed = unicodedata.normalize("NFKD", value)
+	stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+	return _SPACES.sub(" ", stripped.casefold()).strip()
+
+
+def digitsOnly(value):
+	"""
+	Returns only the digits of a value, so that "(11) 2100-0000" and "1121000000" are equal.
+
+	Args:
+		value (str): Phone number, extension or any text.
+
+	Returns:
+		str: The digits, in order.
+	"""
+	if not value:
+		return ""
+	return _NON_DIGITS.sub("", value)
+
+
+def contactKey(secretaryOffice, landline, sector, extension):
+	"""
+	Returns the normalized identity of a contact.
+
+	Uses the same fields as findDuplicateRecords: two rows with the same
+	secretary office, landline, sector and extension are the same contact.
+	"""
+	return KEY_SEPARATOR.join(
+		(
+			normalizeText(secretaryOffice),
+			digitsOnly(landline),
+			normalizeText(sector),
+			digitsOnly(extension),
+		),
+	)
+
+
+@lru_cache(maxsize=65536)
+def phoneticKey(word):
+	"""
+	Returns the Portuguese sound of a word, so that "Luiz" and "Luís", "Thaís" and
+	"Taís" or "Souza" and "Sousa" have the same key.
+
+	A simplified Metaphone for Brazilian Portuguese: letters and digraphs with the
+	same sound are written alike, double letters are collapsed and the vowels
+	are reduced to a, i and u.
+
+	Args:
+		word (str): A single word.
+
+	Returns:
+		str: The key; empty if the word has no letters.
+	"""
+	# The cedilla is lost with the other accents, but "ç" always sounds like "s"
+	key = _NON_LETTERS.sub("", normalizeText(word.casefold().replace("ç", "s")))
+	for pattern, replacement in _PHONETIC_RULES:
+		key = pattern.sub(replacement, key)
+	return key
+
+
+def phoneticKeys(value):
+	"""
+	Returns the phonetic keys of the words of a text.
+
+	Returns:
+		list: One key per word with letters, in order.
+	"""
+	keys = (phoneticKey(word) for word in _WORDS.findall(value or ""))
+	return [key for key in keys if key]
@@ -0,0 +1,244 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Prewarm of the contact directory after NVDA starts.
+
+The first lookup of the day reads the database from the disk or the network
+share, runs the first queries and reads the frequent contacts into memory.
+When enabled in the settings, a daemon thread does that work once, a while
+after NVDA started, so the first lookup is answered like the following ones:
+
+- the database files are read through, which puts their pages in the cache of
+  the operating system (files above MAX_FILE_BYTES are left alone);
+- the row count and the first page of the contact list are read, which keeps
+  that page in memory (see controller.getRecordsPage; with federated search,
+  the cache of federation.py is filled instead);
+- the frequent contacts are read into memory (see usage.py).
+
+The thread runs in the background mode of Windows, which lowers its processor,
+disk and memory priority. Before each step it waits until the user is idle and
+the processor is not busy, twice as long each time, and gives up after
+GIVE_UP_AFTER seconds.
+"""
+
+import ctypes
+import os
+import threading
+import time
+
+import config
+from logHandler import log
+
+from .maintenance import idleSeconds
+from .model import getActiveDatabasePath, getDatabaseSources, isFederatedEnabled
+from .sqlLoader import sql
+from .varsConfig import ADDON_NAME
+
+# Seconds after the database is opened before the prewarm starts
+STARTUP_DELAY = 30
+
+# Seconds without user input for the prewarm to run
+IDLE_SECONDS = 10
+
+# Fraction of processor time in use above which the prewarm waits
+BUSY_RATIO = 0.5
+
+# Waits while the computer is busy, in seconds: the first one, doubled up to the last one
+FIRST_BACKOFF = 30
+MAX_BACKOFF = 600
+
+# Seconds after which a prewarm still waiting is abandoned
+GIVE_UP_AFTER = 2 * 3600
+
+# Largest database file read into the cache of the operating system
+MAX_FILE_BYTES = 256 * 1024 * 1024
+
+# Bytes read at a time; the user's activity is checked between reads
+READ_CHUNK = 1024 * 1024
+
+# Seconds stop() waits for the step in progress to end
+STOP_TIMEOUT = 5.0
+
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+THREAD_MODE_BACKGROUND_END = 0x00020000
+
+
+def isPrewarmEnabled():
+	"""Returns True when the contact directory is prepared after NVDA starts."""
+	return bool(config.conf.get(ADDON_NAME, {}).get("prewarm", False))
+
+
+class _FileTime(ctypes.Structure):
+	_fields_ = [("dwLowDateTime", ctypes.c_uint), ("dwHighDateTime", ctypes.c_uint)]
+
+
+def _systemTimes():
+	times = (_FileTime(), _FileTime(), _FileTime())
+	if not ctypes.windll.kernel32.GetSystemTimes(*(ctypes.byref(value) for value in times)):
+		return None
+	return [(value.dwHighDateTime << 32) | value.dwLowDateTime for value in times]
+
+
+def processorLoad(interval=1.0):
+	"""Returns the fraction of processor time in use over interval seconds (0 when unknown)."""
+	try:
+		before = _systemTimes()
+		time.sleep(interval)
+		after = _systemTimes()
+	except (AttributeError, OSError):
+		return 0.0
+	if before is None or after is None:
+		return 0.0
+	idle, kernel, user = (end - start for start, end in zip(before, after))
+	# The kernel time includes the idle time
+	total = kernel + user
+	if total <= 0:
+		return 0.0
+	return 1.0 - idle / total
+
+
+def _setBackgroundMode(enabled):
+	try:
+		kernel32 = ctypes.windll.kernel32
+		mode = THREAD_MODE_BACKGROUND_BEGIN if enabled else THREAD_MODE_BACKGROUND_END
+		kernel32.SetThreadPriority(kernel32.GetCurrentThread(), mode)
+	except (AttributeError, OSError):
+		pass
+
+
+def _databasePaths():
+	if isFederatedEnabled():
+		return list(getDatabaseSources().values())
+	return [getActiveDatabasePath()]
+
+
+class Prewarmer(object):
+	"""Prepares the contact directory once, in a daemon thread, while the computer is idle."""
+
+	def __init__(self):
+		super().__init__()
+		self._stop = threading.Event()
+		self._thread = None
+		self.done = False
+
+	def start(self, onFinished=None):
+		"""
+		Starts the prewarm, if enabled and not done yet.
+
+		Args:
+			onFinished (callable, optional): Called in the prewarm thread once every step ran.
+		"""
+		if self.done or not isPrewarmEnabled():
+			return
+		# Still running, or still ending a step after stop(): the event is only cleared once it has exited
+		if self._thread is not None and self._thread.is_alive():
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, args=(onFinished,), name="SIRAPrewarm", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		"""Stops the prewarm, waiting up to STOP_TIMEOUT seconds for the step in progress."""
+		self._stop.set()
+		thread = self._thread
+		if thread is not None and thread is not threading.current_thread():
+			thread.join(STOP_TIMEOUT)
+			if thread.is_alive():
+				log.warning(f"Prewarm still running {STOP_TIMEOUT} s after being stopped")
+
+	def _userActive(self):
+		return idleSeconds() < IDLE_SECONDS
+
+	def _waitUntilQuiet(self, deadline):
+		"""Waits until the computer is quiet; returns False when stopped or given up."""
+		backoff = FIRST_BACKOFF
+		while self._userActive() or processorLoad() > BUSY_RATIO:
+			if time.monotonic() + backoff > deadline:
+				return False
+			if self._stop.wait(backoff):
+				return False
+			backoff = min(backoff * 2, MAX_BACKOFF)
+		return not self._stop.is_set()
+
+	def _readFiles(self):
+		read = 0
+		for path in _databasePaths():
+			for name in (path, path + "-wal"):
+				try:
+					if os.path.getsize(name) > MAX_FILE_BYTES:
+						log.info(f"Prewarm: {name} is too large to be read ahead")
+						continue
+				except OSError:
+					continue
+				with open(name, "rb") as file:
+					while True:
+						if self._stop.is_set() or self._userActive():
+							return f"{read // 1024} KB read (interrupted)"
+						chunk = file.read(READ_CHUNK)
+						if not chunk:
+							break
+						read += len(chunk)
+		return f"{read // 1024} KB read"
+
+	def _readContactList(self):
+		# Imported here, as in the dialogs: the controller is not needed while NVDA starts
+		from . import controller as core
+		from .contactList import PAGE_SIZE
+
+		count = core.countRecords(allDatabases=True)
+		page = core.getRecordsPage(0, PAGE_SIZE)
+		return f"{count} contacts, {len(page)} in the first page"
+
+	def _readFrequentContacts(self):
+		from . import controller as core
+		from . import usage
+
+		usage.loadFrequent(core.getRecordsByKeys)
+		return f"{len(usage.frequentContacts() or [])} contacts"
+
+	def _run(self, onFinished):
+		if self._stop.wait(STARTUP_DELAY):
+			return
+		deadline = time.monotonic() + GIVE_UP_AFTER
+		steps = (
+			("page cache", self._readFiles),
+			("contact list", self._readContactList),
+			("frequent contacts", self._readFrequentContacts),
+		)
+		_setBackgroundMode(True)
+		try:
+			for name, step in steps:
+				if not self._waitUntilQuiet(deadline):
+					if not self._stop.is_set():
+						log.info(f"Prewarm given up: the computer was busy for {GIVE_UP_AFTER} s")
+					return
+				started = time.perf_counter()
+				try:
+					detail = step()
+				except (sql.Error, OSError) as e:
+					log.warning(f"Prewarm {name} failed: {e.__class__.__name__} - {e}")
+					continue
+				log.info(f"Prewarm {name}: {detail} in {time.perf_counter() - started:.3f}s")
+			self.done = True
+		finally:
+			_setBackgroundMode(False)
+		if onFinished is not None:
+			onFinished()
+
+
+prewarmer = Prewarmer()
@@ -0,0 +1,232 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Startup profiler of the add-on.
+
+When "profiling" is enabled in the settings, this module is the first one of
+the add-on imported with NVDA. It then records:
+
+- the time taken to run each module of the add-on and of the libraries of
+  lib/ or lib64/ when first imported, through a finder placed at the start of
+  sys.meta_path; the own time of a module excludes the modules of the add-on
+  it imports, but includes the other ones (the standard library, wx...);
+- the time of each phase marked with profilePhase: the steps of
+  GlobalPlugin.__init__, of the deferred initialization and the construction
+  of each dialog.
+
+writeProfile writes them to PROFILE_FILE in the data folder of the add-on,
+slowest first. The setting takes effect when NVDA is started again.
+"""
+
+import importlib.abc
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import config
+from logHandler import log
+
+from .libLoader import VENDORED_MODULES
+from .varsConfig import ADDON_NAME, ADDON_VERSION, IS64
+
+PROFILE_FILE = "startupProfile.txt"
+
+# Phases kept; later ones are not recorded
+MAX_PHASES = 500
+
+_lock = threading.Lock()
+# (module, total seconds, own seconds, thread name)
+_imports = []
+# (phase, seconds, thread name)
+_phases = []
+_finder = None
+_startedAt = None
+
+
+def isProfilingEnabled():
+	"""
+	Returns True when the startup profile of the add-on is recorded.
+
+	Read while the add-on is imported, when the value may still be the raw text
+	of nvda.ini ("False" is true for bool()), so it is parsed here.
+	"""
+	value = config.conf.get(ADDON_NAME, {}).get("profiling", False)
+	return str(value).strip().lower() in ("true", "1", "yes", "on")
+
+
+class _TimedLoader(object):
+	"""Runs a module through its loader, timing it; any other attribute is the loader's."""
+
+	def __init__(self, loader, finder):
+		super().__init__()
+		self._loader = loader
+		self._finder = finder
+
+	def create_module(self, spec):
+		return self._loader.create_module(spec)
+
+	def exec_module(self, module):
+		try:
+			self._finder.timeModule(module.__name__, self._loader.exec_module, module)
+		finally:
+			# The module keeps its own loader
+			module.__loader__ = self._loader
+			if getattr(module, "__spec__", None) is not None:
+				module.__spec__.loader = self._loader
+
+	def __getattr__(self, name):
+		return getattr(self._loader, name)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+	"""Meta path finder timing the first import of the modules of the add-on and of lib/."""
+
+	def __init__(self, package, vendored):
+		super().__init__()
+		self.package = package
+		self.vendored = frozenset(vendored)
+		self._local = threading.local()
+
+	def isTimed(self, fullname):
+		if fullname == self.package or fullname.startswith(self.package + "."):
+			return True
+		return fullname.partition(".")[0] in self.vendored
+
+	def find_spec(self, fullname, path=None, target=None):
+		if not self.isTimed(fullname):
+			return None
+		# The spec the next finders would return, with its loader timed
+		for finder in sys.meta_path:
+			if finder is self or not hasattr(finder, "find_spec"):
+				continue
+			spec = finder.find_spec(fullname, path, target)
+			if spec is not None:
+				break
+		else:
+			return None
+		if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+			spec.loader = _TimedLoader(spec.loader, self)
+		return spec
+
+	def timeModule(self, name, execute, module):
+		"""Runs execute(module), recording its total time and the part not spent in nested timed imports."""
+		stack = self._local.__dict__.setdefault("stack", [])
+		# Time of the timed imports made by this module
+		nested = [0.0]
+		stack.append(nested)
+		start = time.perf_counter()
+		try:
+			execute(module)
+		finally:
+			total = time.perf_counter() - start
+			stack.pop()
+			if stack:
+				stack[-1][0] += total
+			with _lock:
+				_imports.append((name, total, total - nested[0], threading.current_thread().name))
+
+
+def startProfiling():
+	"""Starts timing the imports; called when this module is imported, if profiling is enabled."""
+	global _finder, _startedAt
+	if _finder is None:
+		_finder = ImportTimer(__package__, VENDORED_MODULES)
+		_startedAt = datetime.now()
+	if _finder not in sys.meta_path:
+		sys.meta_path.insert(0, _finder)
+
+
+def stopProfiling():
+	"""Stops timing the imports (the times recorded are kept)."""
+	if _finder in sys.meta_path:
+		sys.meta_path.remove(_finder)
+
+
+@contextmanager
+def profilePhase(name):
+	"""
+	Records the time taken by the block it surrounds, when profiling.
+
+	Args:
+		name (str): Name of the phase in the report.
+	"""
+	if _finder is None:
+		yield
+		return
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		elapsed = time.perf_counter() - start
+		with _lock:
+			if len(_phases) < MAX_PHASES:
+				_phases.append((name, elapsed, threading.current_thread().name))
+
+
+def _reportLines():
+	with _lock:
+		imports = sorted(_imports, key=lambda item: item[2], reverse=True)
+		phases = sorted(_phases, key=lambda item: item[1], reverse=True)
+	lines = [
+		f"{ADDON_NAME} {ADDON_VERSION} startup profile",
+		f"NVDA started on {_startedAt:%d/%m/%Y %H:%M:%S}, report written on {datetime.now():%d/%m/%Y %H:%M:%S}",
+		f"Python {platform.python_version()}, {'64' if IS64 else '32'}-bit",
+		"",
+		f"Phases ({len(phases)}, slowest first)",
+		f"{'ms':>10}  {'phase':<40} thread",
+	]
+	lines.extend(f"{seconds * 1000:10.1f}  {name:<40} {thread}" for name, seconds, thread in phases)
+	lines += [
+		"",
+		f"Imports ({len(imports)} modules, {sum(item[2] for item in imports) * 1000:.1f} ms; slowest own time first)",
+		f"{'own ms':>10}{'total ms':>10}  {'module':<50} thread",
+	]
+	lines.extend(
+		f"{own * 1000:10.1f}{total * 1000:10.1f}  {name:<50} {thread}" for name, total, own, thread in imports
+	)
+	return lines
+
+
+def writeProfile():
+	"""
+	Writes the times recorded so far to PROFILE_FILE, replacing the previous report.
+
+	Returns:
+		str: The path of the report, or None when not profiling or it could not be written.
+	"""
+	if _finder is None:
+		return None
+	# Imported here, so the profiler is loaded before the other modules of the add-on
+	from .model import ADDON_DATA_DIR
+
+	path = os.path.join(ADDON_DATA_DIR, PROFILE_FILE)
+	try:
+		with open(path, "w", encoding="utf-8") as file:
+			file.write("\n".join(_reportLines()) + "\n")
+	except OSError as e:
+		log.warning(f"Startup profile not written to {path}: {e}")
+		return None
+	return path
+
+
+if isProfilingEnabled():
+	startProfiling()
@@ -0,0 +1,399 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Offline-first replica of the shared contact database.
+
+When the "offlineReplica" option is enabled, every Section opens a local copy of
+the configured database stored in the SIRA data directory. This module keeps
+that copy and the shared database in step, in both directions, using the
+per-row metadata maintained by the triggers created in model.migrateSchema.
+
+Delta sync: each database has a strictly increasing change counter (changeSeq).
+The replica remembers the last counter it pushed and the last remote counter it
+pulled, so a sync only reads rows and tombstones changed since then.
+
+Conflict resolution, applied row by row and matched by uid:
+	1. The side with the higher version wins.
+	2. Same version but different content (both sides edited the same row):
+		the most recent modifiedAt wins; on an exact tie the shared database wins.
+		The winning content is written with version + 1 so both sides converge.
+	3. A tombstone beats a row whose version is lower than the tombstone's;
+		a row edited after the deletion (higher or equal version) is resurrected,
+		on both sides.
+"""
+
+import os
+import threading
+import time
+
+from logHandler import log
+
+from .model import REPLICA_DIR, Section, db, getReplicaPath, isReplicaEnabled
+from .sqlLoader import sql
+
+# Content columns copied between databases
+CONTACT_FIELDS = (
+	"secretaryOffice",
+	"landline",
+	"sector",
+	"responsible",
+	"extension",
+	"cell",
+	"email",
+)
+
+# Number of uids looked up per query when comparing batches of rows
+LOOKUP_CHUNK = 500
+
+# Delay used to group several local writes into a single sync
+CHANGE_DEBOUNCE = 2.0
+
+# Seconds stop() waits for a sync in progress to end
+STOP_TIMEOUT = 5.0
+
+
+def _isReachable(path):
+	"""Cheap check that the folder of a database is reachable before opening it."""
+	folder = os.path.dirname(path)
+	return not folder or os.path.isdir(folder)
+
+
+def _readState(trans, key, default=0):
+	trans.execute("SELECT value FROM syncState WHERE key = ?", (key,))
+	row = trans.cursor.fetchone()
+	return row["value"] if row else default
+
+
+def _writeState(trans, key, value):
+	trans.execute("INSERT OR REPLACE INTO syncState (key, value) VALUES (?, ?)", (key, value))
+
+
+def _currentSeq(trans):
+	trans.execute("SELECT changeSeq FROM syncMeta WHERE id = 1")
+	return trans.cursor.fetchone()["changeSeq"]
+
+
+def _fetchChanges(trans, sinceSeq, upToSeq):
+	"""
+	Returns the rows and tombstones changed after sinceSeq, up to upToSeq.
+
+	upToSeq is read before the changes: a write committed in between is left
+	for the next sync instead of being counted as synced without being read.
+	"""
+	trans.execute(
+		"SELECT * FROM contacts WHERE changeSeq > ? AND changeSeq <= ? ORDER BY changeSeq",
+		(sinceSeq, upToSeq),
+	)
+	rows = trans.fetchall()
+	trans.execute(
+		"SELECT * FROM tombstones WHERE changeSeq > ? AND changeSeq <= ? ORDER BY changeSeq",
+		(sinceSeq, upToSeq),
+	)
+	tombstones = trans.fetchall()
+	return rows, tombstones
+
+
+def _lookup(trans, table, uids):
+	"""Returns {uid: row} for the given uids, querying in chunks."""
+	found = {}
+	for start in range(0, len(uids), LOOKUP_CHUNK):
+		chunk = uids[start : start + LOOKUP_CHUNK]
+		placeholders = ",".join(["?"] * len(chunk))
+		trans.execute(f"SELECT * FROM {table} WHERE uid IN ({placeholders})", chunk)
+		for row in trans.fetchall():
+			found[row["uid"]] = row
+	return found
+
+
+def _sameContent(a, b):
+	return all((a[field] or "") == (b[field] or "") for field in CONTACT_FIELDS)
+
+
+def _incomingRowWins(incoming, existing, incomingIsShared):
+	"""
+	Decides whether an incoming row replaces the existing one (rules 1 and 2).
+
+	Returns:
+		int or None: The version to write, or None to keep the existing row.
+	"""
+	if incoming["version"] > existing["version"]:
+		return incoming["version"]
+	if incoming["version"] < existing["version"] or _sameContent(incoming, existing):
+		return None
+
+	incomingTime = incoming["modifiedAt"] or 0
+	existingTime = existing["modifiedAt"] or 0
+	if incomingTime > existingTime or (incomingTime == existingTime and incomingIsShared):
+		return incoming["version"] + 1
+	return None
+
+
+def _applyChanges(trans, rows, tombstones, incomingIsShared):
+	"""
+	Applies rows and tombstones coming from the other side of the sync.
+
+	Args:
+		trans (Section): Open section on the target database, inside a transaction.
+		rows (list): Changed contact rows from the source database.
+		tombstones (list): Tombstones from the source database.
+		incomingIsShared (bool): True when the source is the shared database.
+
+	Returns:
+		int: Number of rows inserted, updated or deleted.
+	"""
+	applied = 0
+	uids = [row["uid"] for row in rows] + [stone["uid"] for stone in tombstones]
+	existingRows = _lookup(trans, "contacts", uids)
+	existingStones = _lookup(trans, "tombstones", uids)
+
+	columns = ", ".join(CONTACT_FIELDS)
+	assignments = ", ".join(f"{field} = ?" for field in CONTACT_FIELDS)
+
+	for row in rows:
+		values = [row[field] for field in CONTACT_FIELDS]
+		existing = existingRows.get(row["uid"])
+		if existing is None:
+			stone = existingStones.get(row["uid"])
+			if stone is not None and stone["version"] > row["version"]:
+				continue  # Deleted here after the incoming edit (rule 3)
+			trans.execute(
+				f"""INSERT INTO contacts ({columns}, uid, version, modifiedAt)
+				VALUES ({", ".join(["?"] * len(CONTACT_FIELDS))}, ?, ?, ?)""",
+				values + [row["uid"], row["version"], row["modifiedAt"]],
+			)
+			applied += 1
+			continue
+
+		version = _incomingRowWins(row, existing, incomingIsShared)
+		if version is None:
+			continue
+		trans.execute(
+			f"UPDATE contacts SET {assignments}, version = ?, modifiedAt = ? WHERE uid = ?",
+			values + [version, row["modifiedAt"], row["uid"]],
+		)
+		applied += 1
+
+	for stone in tombstones:
+		existing = existingRows.get(stone["uid"])
+		if existing is not None:
+			if existing["version"] >= stone["version"]:
+				continue  # Edited here after the deletion: resurrect
+			trans.execute("DELETE FROM contacts WHERE uid = ?", (stone["uid"],))
+			applied += 1
+		known = existingStones.get(stone["uid"])
+		if existing is None and known is not None and known["version"] >= stone["version"]:
+			continue
+		trans.execute(
+			"""INSERT OR REPLACE INTO tombstones (uid, version, deletedAt, changeSeq)
+			VALUES (?, ?, ?, (SELECT changeSeq FROM syncMeta WHERE id = 1))""",
+			(stone["uid"], stone["version"], stone["deletedAt"]),
+		)
+
+	return applied
+
+
+class ReplicaSync(object):
+	"""
+	Keeps the local replica and the shared database synchronized.
+
+	A daemon thread runs a sync every `interval` seconds; syncNow() runs one
+	immediately and notifyLocalChange() schedules one shortly after a write.
+	Only one sync runs at a time.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.interval = 300
+		self.online = None
+		self.lastSyncAt = None
+		self._lock = threading.Lock()
+		self._wake = threading.Event()
+		self._stop = threading.Event()
+		self._thread = None
+		# Guards _thread, which the scheduler thread clears when it stops
+		self._threadLock = threading.Lock()
+		self._dueAt = None
+
+	# PUBLIC API
+
+	def start(self, interval=None):
+		"""Starts the background scheduler (no-op when already running)."""
+		if interval:
+			self.interval = max(60, int(interval))
+		with self._threadLock:
+			if self._thread is not None:
+				# Still running, or still ending a sync after stop(): keep that thread
+				self._stop.clear()
+				return
+		# The replica is on the local disk: make it usable right away, even offline
+		try:
+			os.makedirs(REPLICA_DIR, exist_ok=True)
+			Section.initDB(getReplicaPath(db.getCurrentDatabasePath()))
+		except (sql.Error, OSError) as e:
+			log.error(f"Unable to prepare the local replica: {e}")
+		with self._threadLock:
+			self._stop.clear()
+			if self._thread is None:
+				self._dueAt = time.monotonic()
+				self._thread = threading.Thread(target=self._run, name="SIRAReplicaSync", daemon=True)
+				self._thread.start()
+
+	def stop(self):
+		"""Stops the background scheduler, waiting up to STOP_TIMEOUT seconds for a sync in progress."""
+		self._stop.set()
+		self._wake.set()
+		thread = self._thread
+		if thread is not None and thread is not threading.current_thread():
+			thread.join(STOP_TIMEOUT)
+			if thread.is_alive():
+				log.warning(f"Replica sync still running {STOP_TIMEOUT} s after being stopped")
+
+	def requestSync(self, delay=0.0):
+		"""Asks the scheduler to sync after `delay` seconds."""
+		dueAt = time.monotonic() + delay
+		if self._dueAt is None or dueAt < self._dueAt:
+			self._dueAt = dueAt
+		self._wake.set()
+
+	def notifyLocalChange(self):
+		"""Called after a local write so the change reaches the shared database soon."""
+		if isReplicaEnabled() and self._thread is not None:
+			self.requestSync(CHANGE_DEBOUNCE)
+
+	def syncNow(self):
+		"""
+		Runs one bidirectional sync in the calling thread.
+
+		Returns:
+			bool: True when the sync completed, False when the shared database was unreachable or failed.
+		"""
+		if not isReplicaEnabled():
+			return False
+
+		with self._lock:
+			remotePath = db.getCurrentDatabasePath()
+			localPath = getReplicaPath(remotePath)
+			started = time.perf_counter()
+
+			if not _isReachable(remotePath):
+				self._setOnline(False, remotePath)
+				return False
+
+			try:
+				pushed, pulled = self._sync(remotePath, localPath)
+			except (sql.Error, OSError) as e:
+				log.warning(f"Replica sync with {remotePath} failed: {e.__class__.__name__} - {e}")
+				self._setOnline(False, remotePath)
+				return False
+
+			self._setOnline(True, remotePath)
+			self.lastSyncAt = time.time()
+			log.debug(
+				f"Replica sync with {remotePath}: pushed {pushed}, pulled {pulled} "
+				f"in {time.perf_counter() - started:.3f}s",
+			)
+			return True
+
+	# INTERNAL METHODS
+
+	def _stopping(self):
+		"""Returns True when stopped, forgetting this thread so start() creates a new one."""
+		with self._threadLock:
+			if not self._stop.is_set():
+				return False
+			if self._thread is threading.current_thread():
+				self._thread = None
+			return True
+
+	def _run(self):
+		while not self._stopping():
+			timeout = None if self._dueAt is None else max(0.0, self._dueAt - time.monotonic())
+			self._wake.wait(timeout)
+			self._wake.clear()
+			if self._stopping():
+				break
+			if self._dueAt is None or time.monotonic() < self._dueAt:
+				continue
+			self._dueAt = time.monotonic() + self.interval
+			if not isReplicaEnabled():
+				continue
+			try:
+				self.syncNow()
+			except Exception as e:
+				log.error(f"Unexpected error in replica sync: {e}", exc_info=True)
+
+	def _setOnline(self, online, remotePath):
+		if online != self.online:
+			if online:
+				log.info(f"Shared database reachable again: {remotePath}")
+			else:
+				log.warning(f"Shared database unreachable, working from the local replica: {remotePath}")
+		self.online = online
+
+	def _sync(self, remotePath, localPath):
+		os.makedirs(REPLICA_DIR, exist_ok=True)
+		Section.initDB(localPath)
+		Section.initDB(remotePath)
+
+		with Section(localPath) as local, Section(remotePath) as remote:
+			local.execute(
+				"CREATE TABLE IF NOT EXISTS syncState(key TEXT PRIMARY KEY, value)",
+			)
+			local.persist()
+			lastPush = _readState(local, "lastPush")
+			lastPull = _readState(local, "lastPull")
+
+			# 1. Push local changes to the shared database
+			pushedUpTo = _currentSeq(local)
+			rows, tombstones = _fetchChanges(local, lastPush, pushedUpTo)
+			local.persist()
+			pushed = 0
+			if rows or tombstones:
+				remote.execute("BEGIN IMMEDIATE")
+				try:
+					pushed = _applyChanges(remote, rows, tombstones, incomingIsShared=False)
+					remote.persist()
+				except Exception:
+					remote.connect.rollback()
+					raise
+
+			# 2. Pull remote changes (including the echo of our own push, which is a no-op)
+			pulledUpTo = _currentSeq(remote)
+			remoteRows, remoteTombstones = _fetchChanges(remote, lastPull, pulledUpTo)
+			remote.persist()
+
+			local.execute("BEGIN IMMEDIATE")
+			try:
+				seqBeforePull = _currentSeq(local)
+				pulled = _applyChanges(local, remoteRows, remoteTombstones, incomingIsShared=True)
+				# Rows written by the pull must not be pushed back, unless an operator
+				# wrote to the replica between the two phases.
+				if seqBeforePull == pushedUpTo:
+					pushedUpTo = _currentSeq(local)
+				_writeState(local, "lastPush", pushedUpTo)
+				_writeState(local, "lastPull", pulledUpTo)
+				local.persist()
+			except Exception:
+				local.connect.rollback()
+				raise
+
+		return pushed, pulled
+
+
+# Shared scheduler used by the plugin and by the controller write functions
+replicaSync = ReplicaSync()
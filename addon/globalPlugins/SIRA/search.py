@@ -0,0 +1,236 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Search-as-you-type.
+
+Searches run in a background thread, one at a time: while one is running, only
+the latest request is kept and the ones typed in between are never run.
+
+The searched column of every row is read once per database content into a
+snapshot of (folded value, list key) rows, and each keystroke filters it in
+memory the way LIKE '%keyword%' would. When a keyword contains the previous one,
+every row it can match is already in the previous result, so only that result
+is filtered. The records themselves are read a page at a time as they are shown.
+"""
+
+import threading
+import time
+
+import wx
+from logHandler import log
+
+from . import controller as core
+from .contactList import KeyedRowSource, ListRowSource
+from .model import getActiveDatabasePath, getDatabaseSources, getDatabaseVersion, isFederatedEnabled
+from .searchIndex import phoneticSearch, searchIndexer
+from .structuredQuery import isStructuredQuery, structuredSearch
+
+# Wildcards of LIKE; keywords containing them are always sent to the database
+_LIKE_WILDCARDS = ("%", "_")
+
+
+def likeFold(value):
+	"""Returns a value folded the way LIKE compares it."""
+	return (value or "").translate(core.ASCII_LOWER)
+
+
+def _dataVersion():
+	"""Identifies the current content of the databases being searched."""
+	if isFederatedEnabled():
+		return tuple(getDatabaseVersion(path) for path in getDatabaseSources().values())
+	return getDatabaseVersion(getActiveDatabasePath())
+
+
+def usesSearchIndex(filterChoice, keyword):
+	"""Returns True when a search runs on the token index (see searchIndex.py) rather than the contacts."""
+	return (
+		isStructuredQuery(keyword)
+		or core.phoneticColumn(filterChoice) is not None
+		or core.searchColumn(filterChoice) is None
+	)
+
+
+def sortedRowSource(source, sort):
+	"""
+	Returns the rows of a row source sorted as the contact list (see main.SIRA.sortBy).
+
+	Args:
+		source: Row source of the contact list.
+		sort (tuple): (column, ascending), or None to keep the order of the source.
+	"""
+	if sort is None:
+		return source
+	column, ascending = sort
+	started = time.perf_counter()
+	key = core.recordSortKey(column)
+	records = sorted(source.allRecords(), key=key, reverse=not ascending)
+	log.debug(f"{len(records)} results sorted by {column} in {(time.perf_counter() - started) * 1000:.0f} ms")
+	return ListRowSource(records, key=key, reverse=not ascending)
+
+
+class IncrementalSearch(object):
+	"""Runs the searches typed in the search field of the contact list."""
+
+	def __init__(self):
+		super().__init__()
+		self._lock = threading.Lock()
+		self._generation = 0
+		self._pending = None
+		self._running = False
+		self._snapshotLock = threading.Lock()
+		# ((column, data version), rows of core.getSearchColumn)
+		self._snapshot = None
+		# ((column, data version), folded keyword, matching rows); the search
+		# thread and the GUI thread both use it, through _previousLock
+		self._previousLock = threading.Lock()
+		self._previous = None
+
+	def reset(self):
+		"""Forgets the snapshot and the previous result."""
+		self._snapshot = None
+		self._setPrevious(None)
+
+	def _setPrevious(self, previous):
+		with self._previousLock:
+			self._previous = previous
+
+	def _columnSnapshot(self, column, version):
+		with self._snapshotLock:
+			snapshot = self._snapshot
+			if snapshot is None or snapshot[0] != (column, version):
+				started = time.perf_counter()
+				rows = core.getSearchColumn(column)
+				snapshot = self._snapshot = ((column, version), rows)
+				log.debug(
+					f"Search snapshot of {column}: {len(rows)} rows "
+					f"in {(time.perf_counter() - started) * 1000:.0f} ms",
+				)
+			return snapshot[1]
+
+	def isIndexBehind(self, filterChoice, keyword):
+		"""Returns True when the results of a search may miss contacts not indexed yet."""
+		return usesSearchIndex(filterChoice, keyword) and searchIndexer.isBuilding()
+
+	def prepare(self, filterChoice):
+		"""Reads the column searched by a filter option ahead, in the background."""
+
+		def run():
+			try:
+				column = core.searchColumn(filterChoice)
+				# Searches by sound and of every field use the token index instead
+				if column is not None and core.phoneticColumn(filterChoice) is None:
+					self._columnSnapshot(column, _dataVersion())
+			except Exception as e:
+				log.debug(f"Search snapshot not prepared: {e}")
+
+		threading.Thread(target=run, name="SIRASearchPrepare", daemon=True).start()
+
+	def run(self, filterChoice, keyword, sort=None):
+		"""
+		Searches synchronously, narrowing the previous result when possible.
+
+		Args:
+			filterChoice (str): Option of the search combo box.
+			keyword (str): Text typed.
+			sort (tuple, optional): (column, ascending) chosen in the list; None keeps the list order.
+
+		Returns:
+			Row source of the contact list with the results.
+		"""
+		return sortedRowSource(self._search(filterChoice, keyword), sort)
+
+	def _search(self, filterChoice, keyword):
+		if isStructuredQuery(keyword):
+			# "field:value" terms: one query through the token index, whatever the filter
+			self._setPrevious(None)
+			return KeyedRowSource(structuredSearch(keyword), core.getRecordsByKeys)
+
+		column = core.phoneticColumn(filterChoice)
+		if column is not None:
+			self._setPrevious(None)
+			return KeyedRowSource(phoneticSearch(column, keyword), core.getRecordsByKeys)
+
+		column = core.searchColumn(filterChoice)
+		if column is None:
+			# "All fields": ranked through the token index
+			self._setPrevious(None)
+			return ListRowSource(core.searchRecords(filterChoice, keyword), ordered=False)
+
+		folded = likeFold(keyword)
+		if any(wildcard in folded for wildcard in _LIKE_WILDCARDS):
+			self._setPrevious(None)
+			return ListRowSource(core.searchRecords(filterChoice, keyword))
+
+		version = _dataVersion()
+		with self._previousLock:
+			previous = self._previous
+		if previous is not None and previous[0] == (column, version) and previous[1] in folded:
+			candidates = previous[2]
+		else:
+			candidates = self._columnSnapshot(column, version)
+		matches = [row for row in candidates if folded in row[0]]
+		self._setPrevious(((column, version), folded, matches))
+		# The rest of each row is its list key
+		return KeyedRowSource([row[1:] for row in matches], core.getRecordsByKeys)
+
+	def request(self, filterChoice, keyword, onResults, sort=None):
+		"""
+		Searches in the background.
+
+		Args:
+			filterChoice (str): Option of the search combo box.
+			keyword (str): Text typed.
+			sort (tuple, optional): As for run; the results are sorted in the search thread.
+			onResults (callable): Called in the GUI thread as onResults(results, error, seconds),
+				only if no newer search was requested meanwhile.
+		"""
+		with self._lock:
+			self._generation += 1
+			self._pending = (self._generation, filterChoice, keyword, sort, onResults)
+			if self._running:
+				return
+			self._running = True
+		threading.Thread(target=self._work, name="SIRASearch", daemon=True).start()
+
+	def cancel(self):
+		"""Drops the pending search and the result of the running one."""
+		with self._lock:
+			self._generation += 1
+			self._pending = None
+
+	def _work(self):
+		while True:
+			with self._lock:
+				if self._pending is None:
+					self._running = False
+					return
+				generation, filterChoice, keyword, sort, onResults = self._pending
+				self._pending = None
+			started = time.perf_counter()
+			results, error = None, None
+			try:
+				results = self.run(filterChoice, keyword, sort)
+			except Exception as e:
+				log.error(f"Error searching for {keyword!r}: {e}", exc_info=True)
+				error = e
+			wx.CallAfter(self._deliver, generation, onResults, results, error, time.perf_counter() - started)
+
+	def _deliver(self, generation, onResults, results, error, seconds):
+		if generation != self._generation:
+			return
+		onResults(results, error, seconds)
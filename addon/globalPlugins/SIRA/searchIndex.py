@@ -0,0 +1,452 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Token index of the "All fields" search.
+
+Every field of a contact is split into normalized tokens (see normalization.py)
+stored in the searchTokens table of the same database. The index follows the
+contacts through the sync metadata: rows whose changeSeq is newer than the last
+indexed one are tokenized again and tombstones remove the tokens of deleted
+rows, whichever program made the change.
+
+A query is split the same way; each of its tokens must match a token of the
+contact, exactly or as a prefix, and the contact is ranked by the sum of the
+best match of each query token, weighted by field, plus optionally a boost
+for the contacts used most (see usage.py).
+
+The phoneticKeys table holds the sound (normalization.phoneticKey) of each word
+of the sector and responsible fields and is kept in step with the tokens.
+
+Searches never write: they use the index as it stands and, when it is behind
+the contacts, ask searchIndexer to catch up in a daemon thread, in short
+batches, so the shared database is only locked for a moment at a time. The
+idle maintenance (see maintenance.py) catches up as well. Until the index has
+caught up, the contact list tells the user recent changes may be missing.
+"""
+
+import re
+import threading
+import time
+
+from logHandler import log
+
+from .federation import ensureSchema
+from .model import PHONETIC_FIELDS, Section, getActiveDatabasePath, getDatabaseSources, isFederatedEnabled
+from .normalization import digitsOnly, normalizeText, phoneticKeys
+from .sqlLoader import sql
+from .usage import isUsageBoostEnabled, usageBoost
+
+# Weight of a match in each field
+FIELD_WEIGHTS = {
+	"extension": 10,
+	"responsible": 8,
+	"secretaryOffice": 7,
+	"sector": 6,
+	"landline": 5,
+	"cell": 5,
+	"email": 3,
+}
+
+# Multipliers of the match quality
+EXACT_MATCH = 10
+PREFIX_MATCH = 5
+
+# Shorter query tokens only match whole tokens
+MIN_PREFIX_LENGTH = 2
+
+# Query tokens used and results returned
+MAX_QUERY_TOKENS = 8
+RESULT_LIMIT = 100
+
+# Matches reranked per result when the usage boost is on
+BOOST_CANDIDATES = 3
+
+# Contacts tokenized per transaction while catching up; fewer rows per
+# transaction cost more in total but keep each one short
+INDEX_BATCH = 20000
+
+# Matching tokens counted to find the most selective query token
+SELECTIVITY_SAMPLE = 5000
+
+# Page cache used while catching up, in KiB
+INDEX_CACHE_KB = 65536
+
+# Contacts per transaction of the background catch-up, seconds of work before
+# each pause, and the pause, which lets other hosts write to the database
+BACKGROUND_BATCH = 2000
+BACKGROUND_STEP = 0.2
+BACKGROUND_PAUSE = 0.1
+
+_WORDS = re.compile(r"\w+")
+_PHONE_FIELDS = ("landline", "extension", "cell")
+
+
+def tokenize(value):
+	"""
+	Splits a text into normalized tokens.
+
+	Args:
+		value (str): Any field or query text.
+
+	Returns:
+		list: Tokens in order, without accents and case folded.
+	"""
+	return _WORDS.findall(normalizeText(value))
+
+
+def contactTokens(row):
+	"""
+	Returns the (token, field) pairs of a contact.
+
+	Phone fields also get their digits as a single token, so "(11) 2100-0000"
+	is found by "1121000000" as well as by "2100".
+	"""
+	pairs = set()
+	for field in FIELD_WEIGHTS:
+		value = row.get(field)
+		if not value:
+			continue
+		for token in tokenize(value):
+			pairs.add((token, field))
+		if field in _PHONE_FIELDS:
+			digits = digitsOnly(value)
+			if digits:
+				pairs.add((digits, field))
+	return pairs
+
+
+def updateSearchIndex(trans, deadline=None, batchSize=INDEX_BATCH):
+	"""
+	Brings the token index of a database up to date.
+
+	Works in batches of INDEX_BATCH contacts, each in its own transaction, so a
+	first backfill of a large database can be spread over several calls.
+
+	Args:
+		trans (Section): An open section on the database.
+		deadline (float, optional): time.perf_counter() value after which no new batch is started.
+		batchSize (int): Contacts per transaction.
+
+	Returns:
+		bool: True when the index is up to date.
+	"""
+	trans.execute("PRAGMA cache_size")
+	cacheSize = trans.cursor.fetchone()["cache_size"]
+	try:
+		return _catchUp(trans, deadline, batchSize)
+	finally:
+		trans.execute(f"PRAGMA cache_size = {cacheSize}")
+
+
+def _indexedSeq(trans):
+	"""Returns (last indexed change, last change) of a database."""
+	trans.execute("SELECT changeSeq FROM searchIndexState WHERE id = 1")
+	indexedSeq = trans.cursor.fetchone()["changeSeq"]
+	trans.execute("SELECT changeSeq FROM syncMeta WHERE id = 1")
+	return indexedSeq, trans.cursor.fetchone()["changeSeq"]
+
+
+def isSearchIndexCurrent(trans):
+	"""Returns True when the token index of a database follows its last change."""
+	indexedSeq, changeSeq = _indexedSeq(trans)
+	return changeSeq <= indexedSeq
+
+
+def _catchUp(trans, deadline, batchSize):
+	while True:
+		indexedSeq, changeSeq = _indexedSeq(trans)
+		if changeSeq <= indexedSeq:
+			return True
+		if deadline is not None and time.perf_counter() > deadline:
+			return False
+		# Each batch touches pages all over the token tree; keep them in memory
+		trans.execute(f"PRAGMA cache_size = -{INDEX_CACHE_KB}")
+
+		trans.execute("BEGIN IMMEDIATE")
+		try:
+			trans.execute(
+				f"""SELECT id, uid, changeSeq, {", ".join(FIELD_WEIGHTS)} FROM contacts
+				WHERE changeSeq > ? ORDER BY changeSeq LIMIT ?""",
+				(indexedSeq, batchSize),
+			)
+			rows = trans.fetchall()
+			if len(rows) == batchSize:
+				upTo = rows[-1]["changeSeq"]
+			else:
+				# Last batch: everything up to the current change counter
+				trans.execute("SELECT changeSeq FROM syncMeta WHERE id = 1")
+				upTo = trans.cursor.fetchone()["changeSeq"]
+
+			trans.execute(
+				"SELECT uid FROM tombstones WHERE changeSeq > ? AND changeSeq <= ?",
+				(indexedSeq, upTo),
+			)
+			removed = [(row["uid"],) for row in trans.fetchall()]
+			# Tokens under the id previously indexed for the uid (deleted, or
+			# deleted and inserted again under a new id), then under the current id
+			for table in ("searchTokens", "phoneticKeys"):
+				trans.executemany(
+					f"DELETE FROM {table} WHERE contactId = (SELECT contactId FROM searchDocs WHERE uid = ?)",
+					removed + [(row["uid"],) for row in rows],
+				)
+				trans.executemany(f"DELETE FROM {table} WHERE contactId = ?", [(row["id"],) for row in rows])
+			trans.executemany("DELETE FROM searchDocs WHERE uid = ?", removed)
+			trans.executemany(
+				"INSERT OR REPLACE INTO searchDocs (uid, contactId) VALUES (?, ?)",
+				[(row["uid"], row["id"]) for row in rows],
+			)
+			# Inserting in key order keeps the B-tree writes local
+			trans.executemany(
+				"INSERT OR IGNORE INTO searchTokens (token, contactId, field) VALUES (?, ?, ?)",
+				sorted((token, row["id"], field) for row in rows for token, field in contactTokens(row)),
+			)
+			trans.executemany(
+				"INSERT OR IGNORE INTO phoneticKeys (key, contactId, field) VALUES (?, ?, ?)",
+				sorted(
+					{
+						(key, row["id"], field)
+						for row in rows
+						for field in PHONETIC_FIELDS
+						for key in phoneticKeys(row[field])
+					},
+				),
+			)
+			trans.execute("UPDATE searchIndexState SET changeSeq = ? WHERE id = 1", (upTo,))
+			trans.persist()
+		except Exception:
+			trans.connect.rollback()
+			raise
+		log.debug(f"Search index: {len(rows)} contacts indexed, {len(removed)} removed")
+
+
+def _tokenCondition(token, alias):
+	"""Returns the WHERE condition and parameters matching a query token."""
+	if len(token) >= MIN_PREFIX_LENGTH:
+		return f"{alias}.token >= ? AND {alias}.token < ?", [token, token + "\uffff"]
+	return f"{alias}.token = ?", [token]
+
+
+def _bySelectivity(trans, tokens):
+	"""Sorts query tokens from the one matching fewest index entries."""
+	counts = {}
+	for token in tokens:
+		condition, params = _tokenCondition(token, "t")
+		trans.execute(
+			f"SELECT COUNT(*) AS n FROM (SELECT 1 FROM searchTokens AS t WHERE {condition} LIMIT ?)",
+			params + [SELECTIVITY_SAMPLE],
+		)
+		counts[token] = trans.cursor.fetchone()["n"]
+	return sorted(tokens, key=counts.get)
+
+
+def _rankedQuery(tokens):
+	"""
+	Builds the ranking query of a list of query tokens, most selective first.
+
+	Only the first token is looked up in the token order; the others are only
+	checked on the contacts it matched, through the contactId index.
+	"""
+	fieldWeight = "CASE t.field {} END".format(
+		" ".join(f"WHEN '{field}' THEN {weight}" for field, weight in FIELD_WEIGHTS.items()),
+	)
+	matches = []
+	params = []
+	for index, token in enumerate(tokens):
+		condition, conditionParams = _tokenCondition(token, "t")
+		source = (
+			"searchTokens AS t" if index == 0 else "m0 JOIN searchTokens AS t ON t.contactId = m0.contactId"
+		)
+		matches.append(
+			f"""m{index} AS (
+				SELECT t.contactId,
+					MAX(CASE WHEN t.token = ? THEN {EXACT_MATCH} ELSE {PREFIX_MATCH} END * {fieldWeight}) AS score
+				FROM {source} WHERE {condition} GROUP BY t.contactId)""",
+		)
+		params += [token] + conditionParams
+	joins = " ".join(f"JOIN m{index} USING (contactId)" for index in range(1, len(tokens)))
+	score = " + ".join(f"m{index}.score" for index in range(len(tokens)))
+	query = f"""WITH {", ".join(matches)}
+		SELECT c.*, {score} AS score, u.score AS usageScore, u.lastAccess AS usageLastAccess FROM m0 {joins}
+		JOIN contacts AS c ON c.id = m0.contactId
+		LEFT JOIN contactUsage AS u ON u.contactId = c.id
+		ORDER BY score DESC, c.secretaryOffice, c.id LIMIT ?"""
+	return query, params
+
+
+class SearchIndexer(object):
+	"""Brings the token index of the databases searched up to date in a daemon thread."""
+
+	def __init__(self):
+		super().__init__()
+		self._lock = threading.Lock()
+		# Databases waiting, in the order asked (dict used as an ordered set)
+		self._pending = {}
+		self._stop = threading.Event()
+		self._thread = None
+
+	def request(self, path):
+		"""Asks for the index of a database to be brought up to date."""
+		with self._lock:
+			self._pending[path] = None
+			self._stop.clear()
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name="SIRASearchIndex", daemon=True)
+				self._thread.start()
+
+	def stop(self):
+		"""Stops after the batch in progress; the databases waiting are left behind."""
+		self._stop.set()
+
+	def isBuilding(self):
+		"""Returns True while an index is being brought up to date, when searches may miss recent changes."""
+		with self._lock:
+			return self._thread is not None
+
+	def _next(self):
+		with self._lock:
+			if self._stop.is_set() or not self._pending:
+				self._pending.clear()
+				self._thread = None
+				return None
+			path = next(iter(self._pending))
+			del self._pending[path]
+			return path
+
+	def _run(self):
+		while True:
+			path = self._next()
+			if path is None:
+				return
+			started = time.perf_counter()
+			try:
+				with Section(path) as trans:
+					while not updateSearchIndex(
+						trans,
+						deadline=time.perf_counter() + BACKGROUND_STEP,
+						batchSize=BACKGROUND_BATCH,
+					):
+						if self._stop.wait(BACKGROUND_PAUSE):
+							break
+			except (sql.Error, OSError) as e:
+				log.warning(f"Search index of {path} not updated: {e.__class__.__name__} - {e}")
+				continue
+			log.debug(f"Search index of {path} caught up in {time.perf_counter() - started:.3f}s")
+
+
+# Shared indexer used by the searches
+searchIndexer = SearchIndexer()
+
+
+def queryIndexedDatabases(action):
+	"""
+	Runs a query on each database searched, on its token index as it stands.
+
+	An index behind its contacts is brought up to date by searchIndexer; the
+	contacts changed since then are found once it has caught up, and until then
+	searchIndexer.isBuilding() is True, so the user can be told.
+
+	Args:
+		action (callable): action(trans, path) returning a list of rows (dictionaries).
+
+	Returns:
+		list: The rows of every database, each with its "source" ("" when federated search is off).
+	"""
+	if isFederatedEnabled():
+		sources = getDatabaseSources()
+	else:
+		sources = {"": getActiveDatabasePath()}
+
+	results = []
+	for source, path in sources.items():
+		try:
+			ensureSchema(path)
+			with Section(path) as trans:
+				if not isSearchIndexCurrent(trans):
+					searchIndexer.request(path)
+				rows = action(trans, path)
+		except (sql.Error, OSError) as e:
+			if not source or source == "primary":
+				raise
+			log.warning(f"Alternate database left out of the search: {e}")
+			continue
+		for row in rows:
+			row["source"] = source
+		results.extend(rows)
+	return results
+
+
+def rankedSearch(text, limit=RESULT_LIMIT):
+	"""
+	Searches every field and returns the best matches first.
+
+	Args:
+		text (str): Words to look for, in any field and order.
+		limit (int): Maximum number of results.
+
+	Returns:
+		list: Contact rows (dictionaries with "source" and "score"), best first.
+	"""
+	tokens = list(dict.fromkeys(tokenize(text)))[:MAX_QUERY_TOKENS]
+	if not tokens:
+		return []
+	boost = isUsageBoostEnabled()
+	# The usage boost is added afterwards; it reorders a wider set of the best matches
+	candidates = limit * BOOST_CANDIDATES if boost else limit
+
+	def action(trans, path):
+		query, params = _rankedQuery(_bySelectivity(trans, tokens) if len(tokens) > 1 else tokens)
+		trans.execute(query, params + [candidates])
+		return trans.fetchall()
+
+	results = queryIndexedDatabases(action)
+	if boost:
+		for row in results:
+			row["score"] += usageBoost(row["usageScore"], row["usageLastAccess"])
+	results.sort(key=lambda row: (-row["score"], row["secretaryOffice"] or "", row["source"], row["id"]))
+	return results[:limit]
+
+
+def phoneticSearch(column, text):
+	"""
+	Finds the contacts with a word sounding like each word of a text in a field.
+
+	Args:
+		column (str): One of model.PHONETIC_FIELDS.
+		text (str): Words as heard, for example "Luis Sousa".
+
+	Returns:
+		list: List keys (see contactList.listKey) of the matching contacts, in list order.
+	"""
+	keys = list(dict.fromkeys(phoneticKeys(text)))[:MAX_QUERY_TOKENS]
+	if not keys:
+		return []
+	condition = " AND ".join(
+		["id IN (SELECT contactId FROM phoneticKeys WHERE key = ? AND field = ?)"] * len(keys),
+	)
+	params = [value for key in keys for value in (key, column)]
+
+	def action(trans, path):
+		trans.execute(
+			f"""SELECT secretaryOffice IS NOT NULL AS hasOffice, IFNULL(secretaryOffice, '') AS office, id
+			FROM contacts WHERE {condition}""",
+			params,
+		)
+		return trans.fetchall()
+
+	rows = queryIndexedDatabases(action)
+	return sorted((row["hasOffice"], row["office"], row["source"], row["id"]) for row in rows)
@@ -17,20 +17,15 @@ All AI-generated code was manually reviewed and tested by the author.
 Created on: 19/02/2026
 """
 
-import os
 import sys
 from typing import Any
 
 from logHandler import log
 
-from .varsConfig import ADDON_PATH, IS64
+from .libLoader import installVendoredFinder
 
-libFolder = "lib64" if IS64 else "lib"
-libPath = os.path.join(ADDON_PATH, libFolder)
-
-# Adding library path to sys.path
-if os.path.isdir(libPath) and libPath not in sys.path:
-	sys.path.insert(0, libPath)
+# The libraries of lib/ are imported through a finder (see libLoader.py)
+installVendoredFinder()
 
 # We initialize the sql variable to None to help the linter
 sql: Any = None
@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Structured search queries, for example:
+
+	sector:farmacia ext:21* responsible:"ana maria"
+	ext:2100..2199 central
+
+Each term is "field:value" or a free word matched against every field; all
+terms must match. Values are compared without accents or case. A plain text
+value matches words starting with it, a quoted one whole words only. Phone
+fields compare digits: "ext:2100" matches the number or one of its parts,
+"ext:21*" numbers starting with 21 and "ext:2100..2199" a numeric range of
+extensions (either end may be left out).
+
+The whole query becomes a single parameterized SQL statement. Text and digit
+terms are looked up in the token index (searchIndex.py) and extension ranges
+use the index on the numeric value of the extension.
+"""
+
+import re
+from collections import namedtuple
+
+import addonHandler
+
+from .model import SQL_EXTENSION_NUMBER, sqlDigits
+from .normalization import digitsOnly, normalizeText
+from .searchIndex import MIN_PREFIX_LENGTH, queryIndexedDatabases, tokenize
+
+# Initialize translation support
+addonHandler.initTranslation()
+
+# Names accepted before the colon, per column (compared without accents or case)
+FIELD_ALIASES = {
+	"secretaryOffice": ("office", "secretary", "secretaryoffice", "secretaria"),
+	"sector": ("sector", "setor"),
+	"responsible": ("responsible", "resp", "name", "responsavel", "nome"),
+	"extension": ("extension", "ext", "ramal"),
+	"landline": ("landline", "phone", "tel", "telefone"),
+	"cell": ("cell", "mobile", "celular"),
+	"email": ("email", "mail"),
+}
+
+_FIELDS_BY_ALIAS = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+_DIGIT_FIELDS = ("extension", "landline", "cell")
+
+# field:"quoted value" (closing quote optional while typing), field:value or a free word
+_TERM = re.compile(r'(?:(?P<field>[^\s:"]+):)?(?:"(?P<quoted>[^"]*)"?|(?P<plain>\S+))')
+
+Term = namedtuple("Term", ("field", "kind", "value"))
+
+
+def _fieldFor(name):
+	return _FIELDS_BY_ALIAS.get(normalizeText(name)) if name else None
+
+
+def isStructuredQuery(text):
+	"""Returns True when the text has at least one known "field:" prefix."""
+	return any(_fieldFor(match.group("field")) for match in _TERM.finditer(text or ""))
+
+
+def _parseNumber(value):
+	try:
+		return int(value) if value else None
+	except ValueError:
+		raise ValueError(_("Invalid number in range: {}").format(value))
+
+
+def parseQuery(text):
+	"""
+	Splits a query into terms.
+
+	Returns:
+		list: Term tuples (field or None, kind, value). Kinds are "prefix" and
+			"exact" (value is a token), and "range" (value is a (low, high) tuple).
+
+	Raises:
+		ValueError: For a range on a field other than the extension, or a bad number.
+	"""
+	terms = []
+	for match in _TERM.finditer(text or ""):
+		field = _fieldFor(match.group("field"))
+		quoted = match.group("quoted")
+		value = quoted if quoted is not None else match.group("plain")
+		if match.group("field") and field is None:
+			# Not a known field: the whole "name:value" is ordinary text
+			value = match.group(0)
+
+		if field in _DIGIT_FIELDS and quoted is None and ".." in value:
+			if field != "extension":
+				raise ValueError(_("Ranges are only supported for extensions."))
+			low, high = (_parseNumber(digitsOnly(part) if part else "") for part in value.split("..", 1))
+			if low is None and high is None:
+				raise ValueError(_("Empty range: {}").format(value))
+			terms.append(Term(field, "range", (low, high)))
+			continue
+
+		explicitPrefix = quoted is None and value.endswith("*")
+		value = value.rstrip("*") if quoted is None else value
+		if field in _DIGIT_FIELDS:
+			digits = digitsOnly(value)
+			if digits:
+				terms.append(Term(field, "prefix" if explicitPrefix else "exact", digits))
+			elif value:
+				raise ValueError(_("Only digits can be searched in this field: {}").format(value))
+			continue
+
+		for token in tokenize(value):
+			if quoted is not None or (len(token) < MIN_PREFIX_LENGTH and not explicitPrefix):
+				terms.append(Term(field, "exact", token))
+			else:
+				terms.append(Term(field, "prefix", token))
+	return terms
+
+
+def compileQuery(terms):
+	"""
+	Builds the WHERE clause of a list of terms.
+
+	Returns:
+		tuple: (condition, parameters).
+	"""
+	conditions = []
+	params = []
+	for term in terms:
+		if term.kind == "range":
+			low, high = term.value
+			condition = f"{sqlDigits('extension')} <> ''"
+			if low is not None:
+				condition += f" AND {SQL_EXTENSION_NUMBER} >= ?"
+				params.append(low)
+			if high is not None:
+				condition += f" AND {SQL_EXTENSION_NUMBER} <= ?"
+				params.append(high)
+			conditions.append(condition)
+			continue
+
+		if term.kind == "exact":
+			tokenCondition = "token = ?"
+			params.append(term.value)
+		else:
+			tokenCondition = "token >= ? AND token < ?"
+			params += [term.value, term.value + "\uffff"]
+		if term.field:
+			tokenCondition += " AND field = ?"
+			params.append(term.field)
+		conditions.append(f"id IN (SELECT contactId FROM searchTokens WHERE {tokenCondition})")
+		if term.kind == "prefix" and term.field in _DIGIT_FIELDS:
+			# The token may be one part of the number ("21" of "23-21"); the prefix is of all its digits
+			conditions.append(f"{sqlDigits(term.field)} LIKE ?")
+			params.append(term.value + "%")
+	return " AND ".join(conditions) or "1", params
+
+
+def structuredSearch(text):
+	"""
+	Runs a structured query.
+
+	Args:
+		text (str): The query.
+
+	Returns:
+		list: List keys (see contactList.listKey) of the matching contacts, in list order.
+
+	Raises:
+		ValueError: If the query is invalid.
+	"""
+	terms = parseQuery(text)
+	if not terms:
+		return []
+	condition, params = compileQuery(terms)
+
+	def action(trans, path):
+		trans.execute(
+			f"""SELECT secretaryOffice IS NOT NULL AS hasOffice, IFNULL(secretaryOffice, '') AS office, id
+			FROM contacts WHERE {condition}""",
+			params,
+		)
+		return trans.fetchall()
+
+	rows = queryIndexedDatabases(action)
+	return sorted((row["hasOffice"], row["office"], row["source"], row["id"]) for row in rows)
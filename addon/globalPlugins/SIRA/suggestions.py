@@ -0,0 +1,239 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+"Did you mean" suggestions for searches that found nothing.
+
+The vocabulary is the set of tokens of the secretary office, sector and
+responsible fields, read from the token index (searchIndex.py) into a BK-tree
+per database. The tree is filled once and then only receives the tokens of the
+contacts indexed since, so it follows every write. Words of deleted contacts
+stay in the tree; candidates are checked against the index before being
+suggested.
+
+Edit distances are computed bit-parallel (Myers' algorithm, as formulated by
+Hyyrö), one pass of integer operations per character of the compared word.
+"""
+
+import threading
+
+from .searchIndex import MAX_QUERY_TOKENS, queryIndexedDatabases, tokenize
+from .structuredQuery import FIELD_ALIASES, isStructuredQuery
+
+# Fields whose words are suggested
+SUGGESTION_FIELDS = ("secretaryOffice", "sector", "responsible")
+
+# Largest number of edits between a typed word and a suggestion
+MAX_DISTANCE = 2
+
+# (change counter indexed, BK-tree) per database path
+_vocabularies = {}
+_vocabularyLock = threading.Lock()
+
+
+def editDistance(word):
+	"""
+	Prepares the Levenshtein distance from a word.
+
+	Args:
+		word (str): The word every other one is compared with.
+
+	Returns:
+		callable: distance(other) returning the number of edits between word and other.
+	"""
+	length = len(word)
+	if not length:
+		return len
+	masks = {}
+	for position, char in enumerate(word):
+		masks[char] = masks.get(char, 0) | (1 << position)
+	full = (1 << length) - 1
+	last = 1 << (length - 1)
+
+	def distance(other):
+		positive, negative, score = full, 0, length
+		for char in other:
+			equal = masks.get(char, 0)
+			vertical = equal | negative
+			horizontal = (((equal & positive) + positive) ^ positive) | equal
+			up = negative | (~(horizontal | positive) & full)
+			down = positive & horizontal
+			if up & last:
+				score += 1
+			elif down & last:
+				score -= 1
+			up = ((up << 1) | 1) & full
+			down = (down << 1) & full
+			positive = down | (~(vertical | up) & full)
+			negative = up & vertical
+		return score
+
+	return distance
+
+
+class BKTree(object):
+	"""Burkhard-Keller tree of words under the edit distance."""
+
+	def __init__(self):
+		super().__init__()
+		# Nodes are (word, {distance: child node})
+		self._root = None
+		self._size = 0
+
+	def __len__(self):
+		return self._size
+
+	def add(self, word):
+		"""Adds a word; words already present are ignored."""
+		if self._root is None:
+			self._root = (word, {})
+			self._size = 1
+			return
+		distance = editDistance(word)
+		node = self._root
+		while True:
+			edits = distance(node[0])
+			if edits == 0:
+				return
+			child = node[1].get(edits)
+			if child is None:
+				node[1][edits] = (word, {})
+				self._size += 1
+				return
+			node = child
+
+	def search(self, word, maxDistance=MAX_DISTANCE):
+		"""
+		Finds the words close to a word.
+
+		Returns:
+			list: (distance, word) tuples, nearest first.
+		"""
+		if self._root is None:
+			return []
+		distance = editDistance(word)
+		found = []
+		pending = [self._root]
+		while pending:
+			nodeWord, children = pending.pop()
+			edits = distance(nodeWord)
+			if edits <= maxDistance:
+				found.append((edits, nodeWord))
+			# Triangle inequality: only these subtrees can hold words close enough
+			for childEdits, child in children.items():
+				if edits - maxDistance <= childEdits <= edits + maxDistance:
+					pending.append(child)
+		return sorted(found)
+
+
+def _fieldCondition(fields):
+	return f"field IN ({', '.join('?' * len(fields))})", list(fields)
+
+
+def _vocabulary(trans, path):
+	"""Returns the BK-tree of a database, adding the words indexed since the last call."""
+	trans.execute("SELECT changeSeq FROM searchIndexState WHERE id = 1")
+	indexedSeq = trans.cursor.fetchone()["changeSeq"]
+	condition, params = _fieldCondition(SUGGESTION_FIELDS)
+	entry = _vocabularies.get(path)
+	if entry is not None and entry[0] == indexedSeq:
+		return entry[1]
+
+	if entry is None or entry[0] > indexedSeq:
+		# First use, or the file was replaced by an older one
+		tree = BKTree()
+		trans.execute(f"SELECT DISTINCT token FROM searchTokens WHERE {condition}", params)
+	else:
+		tree = entry[1]
+		trans.execute(
+			f"""SELECT DISTINCT token FROM searchTokens
+			WHERE contactId IN (SELECT id FROM contacts WHERE changeSeq > ?) AND {condition}""",
+			[entry[0]] + params,
+		)
+	for row in trans.fetchall():
+		# Numbers are not misspelled words
+		if not row["token"].isdigit():
+			tree.add(row["token"])
+	_vocabularies[path] = (indexedSeq, tree)
+	return tree
+
+
+def suggestCorrection(column, keyword):
+	"""
+	Suggests a corrected search for a keyword that found nothing.
+
+	Args:
+		column (str): Column searched, or None for every field.
+		keyword (str): The text searched.
+
+	Returns:
+		str: The corrected search (words of column written as "field:word" terms,
+			see structuredQuery.py), or None when no word looks misspelled.
+	"""
+	if isStructuredQuery(keyword) or (column is not None and column not in SUGGESTION_FIELDS):
+		return None
+	tokens = [token for token in dict.fromkeys(tokenize(keyword)) if not token.isdigit()][:MAX_QUERY_TOKENS]
+	if not tokens:
+		return None
+	condition, params = _fieldCondition(SUGGESTION_FIELDS if column is None else (column,))
+	known = set()
+	# {token: {suggestion: [distance, occurrences]}}
+	candidates = {token: {} for token in tokens}
+
+	def action(trans, path):
+		with _vocabularyLock:
+			tree = _vocabulary(trans, path)
+		for token in tokens:
+			trans.execute(
+				f"SELECT 1 FROM searchTokens WHERE token >= ? AND token < ? AND {condition} LIMIT 1",
+				[token, token + "\uffff"] + params,
+			)
+			if trans.cursor.fetchone() is not None:
+				known.add(token)
+				continue
+			for edits, word in tree.search(token):
+				trans.execute(
+					f"SELECT COUNT(*) AS n FROM searchTokens WHERE token = ? AND {condition}",
+					[word] + params,
+				)
+				occurrences = trans.cursor.fetchone()["n"]
+				if occurrences:
+					candidate = candidates[token].setdefault(word, [edits, 0])
+					candidate[1] += occurrences
+		return []
+
+	queryIndexedDatabases(action)
+
+	words = []
+	corrected = False
+	for token in tokenize(keyword):
+		options = candidates.get(token)
+		if options and token not in known:
+			# Fewest edits, then the same first letter (rarely the one misheard), then the most used word
+			token = min(
+				options,
+				key=lambda word: (options[word][0], word[0] != token[0], -options[word][1], word),
+			)
+			corrected = True
+		words.append(token)
+	if not corrected:
+		return None
+	if column is None:
+		return " ".join(words)
+	# Accents and case matter to the column search, so search the index of the field
+	alias = FIELD_ALIASES[column][0]
+	return " ".join(f"{alias}:{word}" for word in words)
@@ -0,0 +1,283 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Author: Edilberto Fonseca <edilberto.fonseca@outlook.com>
+Copyright: (C) 2025 - 2026 Edilberto Fonseca
+
+This file is covered by the GNU General Public License.
+See the file COPYING for more details or visit:
+https://www.gnu.org/licenses/gpl-2.0.html
+
+-------------------------------------------------------------------------
+AI DISCLOSURE / NOTA DE IA:
+This project utilizes AI for code refactoring and logic suggestions.
+All AI-generated code was manually reviewed and tested by the author.
+-------------------------------------------------------------------------
+
+Created on: 19/10/2026
+
+Contact usage: how often and how recently each contact is looked up.
+
+Every lookup counts one access. Accesses are gathered in memory and written in
+one batch per database to the contactUsage table a few seconds later, from a
+background thread. The score of a contact is its number of accesses, each
+worth half as much every HALF_LIFE seconds, so contacts that stop being used
+fade out.
+
+The most used contacts are kept in memory with their records, so the
+"frequent contacts" view opens without querying the database. The same scores
+can raise the rank of frequently used contacts in "All fields" searches.
+
+Pending accesses are kept by database path, so they are written to the database
+the contact was looked up in. The frequent contacts belong to the databases
+searched when they were read: once another database is selected, or the
+replica or the federated search is switched, they are read again.
+"""
+
+import math
+import threading
+import time
+
+import config
+from logHandler import log
+
+from .model import Section, getActiveDatabasePath, getDatabaseSources, isFederatedEnabled
+from .sqlLoader import sql
+from .varsConfig import ADDON_NAME
+
+# Time for an access to lose half of its weight, in seconds (two weeks)
+HALF_LIFE = 14 * 24 * 3600
+
+# Seconds accesses are gathered before being written
+FLUSH_DELAY = 15.0
+
+# Contacts in the "frequent contacts" view
+FREQUENT_LIMIT = 30
+
+# Points added to the rank of an "All fields" result per doubling of its usage score
+USAGE_BOOST = 8
+
+_lock = threading.Lock()
+# {(database path, id): [accesses, last access]} not written yet
+_pending = {}
+_flushTimer = None
+# {(source, id): [score, last access, record]} of the most used contacts; None until loaded
+_frequent = None
+# ((source, database path), ...) searched when _frequent was read
+_frequentView = None
+
+
+def isUsageBoostEnabled():
+	"""Returns True when frequently used contacts rank higher in "All fields" searches."""
+	return bool(config.conf.get(ADDON_NAME, {}).get("usageBoost", False))
+
+
+def decayedScore(score, lastAccess, now=None):
+	"""
+	Returns a usage score as of now.
+
+	Args:
+		score (float): The score at the time of the last access.
+		lastAccess (float): time.time() of the last access.
+		now (float, optional): The time to compute the score for; the current time by default.
+	"""
+	if now is None:
+		now = time.time()
+	return score * 0.5 ** (max(now - lastAccess, 0) / HALF_LIFE)
+
+
+def usageBoost(score, lastAccess):
+	"""Returns the points added to a search rank for a usage score (0 without usage)."""
+	if not score:
+		return 0
+	return USAGE_BOOST * math.log2(1 + decayedScore(score, lastAccess))
+
+
+def _databasePath(source):
+	return getDatabaseSources()[source] if source else getActiveDatabasePath()
+
+
+def _searchedSources():
+	if isFederatedEnabled():
+		return list(getDatabaseSources())
+	return [""]
+
+
+def _currentView():
+	"""Returns the (source, database path) pairs searched now."""
+	return tuple((source, _databasePath(source)) for source in _searchedSources())
+
+
+def _frequentIsCurrent(view):
+	"""Forgets the frequent contacts read from other databases (called with the lock held)."""
+	global _frequent, _frequentView
+	if _frequent is not None and _frequentView != view:
+		_frequent = None
+		_frequentView = None
+	return _frequent is not None
+
+
+def recordAccess(record):
+	"""
+	Counts a lookup of a contact.
+
+	Args:
+		record: The record looked up (see controller.convertResults).
+	"""
+	global _flushTimer
+	key = (record.source, record.id)
+	now = time.time()
+	view = _currentView()
+	with _lock:
+		pending = _pending.setdefault((_databasePath(record.source), record.id), [0, now])
+		pending[0] += 1
+		pending[1] = now
+		if _frequentIsCurrent(view):
+			entry = _frequent.get(key)
+			score = 1 if entry is None else decayedScore(entry[0], entry[1], now) + 1
+			_frequent[key] = [score, now, record]
+			_trimFrequent(now)
+		if _flushTimer is None:
+			_flushTimer = threading.Timer(FLUSH_DELAY, flush)
+			_flushTimer.daemon = True
+			_flushTimer.start()
+
+
+def _trimFrequent(now):
+	"""Keeps the FREQUENT_LIMIT best contacts in memory (called with the lock held)."""
+	if len(_frequent) <= FREQUENT_LIMIT:
+		return
+	ranked = sorted(
+		_frequent,
+		key=lambda key: decayedScore(_frequent[key][0], _frequent[key][1], now),
+		reverse=True,
+	)
+	for key in ranked[FREQUENT_LIMIT:]:
+		del _frequent[key]
+
+
+def flush():
+	"""Writes the pending accesses, one transaction per database."""
+	global _flushTimer
+	with _lock:
+		pending = dict(_pending)
+		_pending.clear()
+		_flushTimer = None
+	if not pending:
+		return
+
+	byPath = {}
+	for (path, id), (accesses, lastAccess) in pending.items():
+		byPath.setdefault(path, []).append((id, accesses, lastAccess))
+
+	for path, accesses in byPath.items():
+		try:
+			with Section(path) as trans:
+				ids = [id for id, count, lastAccess in accesses]
+				trans.execute(
+					f"SELECT contactId, score, lastAccess, accessCount FROM contactUsage "
+					f"WHERE contactId IN ({', '.join('?' * len(ids))})",
+					ids,
+				)
+				stored = {row["contactId"]: row for row in trans.fetchall()}
+				rows = []
+				for id, count, lastAccess in accesses:
+					previous = stored.get(id)
+					if previous is None:
+						rows.append((id, count, lastAccess, count))
+					else:
+						score = decayedScore(previous["score"], previous["lastAccess"], lastAccess) + count
+						rows.append((id, score, lastAccess, previous["accessCount"] + count))
+				trans.executemany(
+					"INSERT OR REPLACE INTO contactUsage (contactId, score, lastAccess, accessCount) VALUES (?, ?, ?, ?)",
+					rows,
+				)
+				trans.persist()
+		except (sql.Error, OSError) as e:
+			# Usage is a convenience; a read-only or missing database just loses these accesses
+			log.warning(f"Contact usage not saved: {e}")
+
+
+def loadFrequent(fetchRecords):
+	"""
+	Reads the most used contacts into memory, if not done yet for the databases searched.
+
+	Args:
+		fetchRecords (callable): fetchRecords(keys) returning a dict from (source, id)
+			to record, as controller.getRecordsByKeys.
+	"""
+	global _frequent, _frequentView
+	view = _currentView()
+	with _lock:
+		if _frequentIsCurrent(view):
+			return
+	now = time.time()
+	scores = {}
+	for source, path in view:
+		try:
+			with Section(path) as trans:
+				trans.execute("SELECT contactId, score, lastAccess FROM contactUsage")
+				for row in trans.fetchall():
+					scores[(source, row["contactId"])] = (row["score"], row["lastAccess"])
+		except (sql.Error, OSError) as e:
+			log.warning(f"Contact usage not read: {e}")
+
+	best = sorted(scores, key=lambda key: decayedScore(*scores[key], now), reverse=True)[:FREQUENT_LIMIT]
+	# fetchRecords takes list keys; only their last two items are used
+	records = fetchRecords(best)
+	sources = {path: source for source, path in view}
+	with _lock:
+		if _frequentIsCurrent(view):
+			return
+		_frequent = {key: [*scores[key], records[key]] for key in best if key in records}
+		_frequentView = view
+		# Accesses counted before the list was loaded
+		for (path, id), (accesses, lastAccess) in _pending.items():
+			if path not in sources:
+				continue
+			entry = _frequent.get((sources[path], id))
+			if entry is not None:
+				entry[0] = decayedScore(entry[0], entry[1], lastAccess) + accesses
+				entry[1] = lastAccess
+
+
+def frequentContacts():
+	"""
+	Returns the most used contacts, most used first, or None if loadFrequent was not called yet
+	for the databases searched.
+	"""
+	now = time.time()
+	view = _currentView()
+	with _lock:
+		if not _frequentIsCurrent(view):
+			return None
+		ranked = sorted(
+			_frequent.values(),
+			key=lambda entry: decayedScore(entry[0], entry[1], now),
+			reverse=True,
+		)
+	return [entry[2] for entry in ranked]
+
+
+def recordChanged(record):
+	"""Shows the new content of an edited contact in the frequent contacts."""
+	with _lock:
+		if _frequent is not None and (record.source, record.id) in _frequent:
+			_frequent[(record.source, record.id)][2] = record
+
+
+def recordRemoved(record):
+	"""Forgets a deleted contact (its stored usage is removed by a trigger)."""
+	path = _databasePath(record.source)
+	with _lock:
+		_pending.pop((path, record.id), None)
+		if _frequent is not None:
+			_frequent.pop((record.source, record.id), None)
+
+
+def reset():
+	"""Forgets the contacts in memory, for instance after the database changed."""
+	global _frequent, _frequentView
+	with _lock:
+		_frequent = None
+		_frequentView = None
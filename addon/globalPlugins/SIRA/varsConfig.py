@@ -60,6 +60,18 @@ def initConfiguration():
 		"path": 'string(default="")',
 		"altPath": 'string(default="")',
 		"databaseIndex": "integer(default=0)",
+		"offlineReplica": "boolean(default=False)",
+		"replicaSyncInterval": "integer(default=5, min=1)",
+		"federatedSearch": "boolean(default=False)",
+		"autoSnapshot": "boolean(default=True)",
+		"snapshotInterval": "integer(default=24, min=1)",
+		"snapshotCount": "integer(default=7, min=1)",
+		"snapshotCompress": "boolean(default=False)",
+		"idleMaintenance": "boolean(default=True)",
+		"liveSearch": "boolean(default=True)",
+		"usageBoost": "boolean(default=False)",
+		"prewarm": "boolean(default=False)",
+		"profiling": "boolean(default=False)",
 	}
 	config.conf.spec[ADDON_NAME] = confspec
 